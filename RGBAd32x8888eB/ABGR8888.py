@@ -1,43 +1,143 @@
-import struct
+import os
+
 import numpy as np
 from PIL import Image
 
+import mipmap
+import profiling
+
 
 class ABGR8888:
     @staticmethod
+    def _map(file_path, width, height):
+        """
+        只读映射文件中的像素数据，返回 (height, width, 4) 的 uint8 视图。
+        每个像素是小端 ABGR，即内存中的字节顺序正好为 R, G, B, A。
+        """
+        size = width * height * 4
+        if os.path.getsize(file_path) < size:
+            raise EOFError(f"{file_path}: expected {size} bytes of ABGR8888 data")
+        return np.memmap(file_path, dtype=np.uint8, mode='r', shape=(height, width, 4))
+
+    @staticmethod
+    @profiling.instrument("abgr8888.read_array")
+    def read_array(file_path, width, height):
+        """
+        读取 ABGR8888 文件，返回 (height, width, 4) 的 RGBA uint8 数组，不创建 PIL 图像。
+        返回的是文件的只读映射视图，没有任何拷贝；需要修改时请自行 copy()。
+        """
+        return ABGR8888._map(file_path, width, height)
+
+    @staticmethod
+    def iter_rows(file_path, width, height, band=64):
+        """
+        按从上到下的顺序逐个产出 (rows, width, 4) 的 RGBA uint8 行带，用于不持有整张图像的流式导出。
+        每个行带是映射的只读视图，没有拷贝；只有当前行带所在的页面会被读入。
+        """
+        pixels = ABGR8888._map(file_path, width, height)
+        for y in range(0, height, band):
+            yield pixels[y:y + band]
+
+    @staticmethod
+    @profiling.instrument("abgr8888.read")
     def read(file_path, width, height):
         """
         从二进制文件读取 ABGR8888 格式图像数据并返回 PIL 图像
         """
-        with open(file_path, 'rb') as f:
-            data = f.read(width * height * 4)
+        # 映射的页面在 decode 拷贝进图像时才被读入
+        return ABGR8888.decode(ABGR8888._map(file_path, width, height), width, height)
 
-        pixels = []
-        for i in range(0, len(data), 4):
-            temp = struct.unpack('<I', data[i:i+4])[0]
-            r = temp & 0xFF
-            g = (temp >> 8) & 0xFF
-            b = (temp >> 16) & 0xFF
-            a = (temp >> 24) & 0xFF
-            pixels.append((r, g, b, a))
+    @staticmethod
+    def _view(buffer, width, height):
+        view = memoryview(buffer).cast('B')
+        size = width * height * 4
+        if len(view) < size:
+            raise EOFError(f"Expected {size} bytes of ABGR8888 data, got {len(view)}")
+        return view[:size]
 
-        img = Image.new("RGBA", (width, height))
-        img.putdata(pixels)
-        return img
+    @staticmethod
+    def decode_array(buffer, width, height):
+        """
+        从内存中的 ABGR8888 数据（bytes、bytearray、memoryview、mmap 等）解码，
+        返回 (height, width, 4) 的 RGBA uint8 数组。返回的是缓冲区的视图，没有任何拷贝。
+        """
+        return np.frombuffer(ABGR8888._view(buffer, width, height), dtype=np.uint8).reshape(height, width, 4)
 
     @staticmethod
-    def write(image: Image.Image, file_path):
+    def decode(buffer, width, height):
+        """
+        从内存中的 ABGR8888 数据解码为 PIL 图像，不经过文件系统。
+        缓冲区按 memoryview 切片读取，数据已经是 RGBA 顺序，唯一的拷贝是写入图像。
         """
-        将 PIL 图像保存为 ABGR8888 二进制格式
+        pixels = ABGR8888._view(buffer, width, height)
+        with profiling.stage("image.frombytes", bytes=len(pixels)):
+            return Image.frombytes("RGBA", (width, height), pixels)
+
+    @staticmethod
+    def _to_rgba(image):
+        """
+        把 PIL 图像或 (height, width, 4) 的 RGBA 数组统一为 uint8 数组。
+        """
+        if isinstance(image, Image.Image):
+            if image.mode != "RGBA":
+                image = image.convert("RGBA")
+            return np.asarray(image)
+        rgba = np.asarray(image, dtype=np.uint8)
+        if rgba.ndim != 3 or rgba.shape[2] != 4:
+            raise ValueError(f"Expected an (height, width, 4) RGBA array, got shape {rgba.shape}")
+        return rgba
+
+    @staticmethod
+    def encode(image):
+        """
+        把 PIL 图像或 (height, width, 4) 的 RGBA 数组编码为 ABGR8888 字节，不经过文件系统。
+        """
+        # 小端 ABGR 的字节顺序正好是 R, G, B, A
+        return np.ascontiguousarray(ABGR8888._to_rgba(image)).tobytes()
+
+    @staticmethod
+    def read_mips(file_path, levels=None):
+        """
+        读取 write(..., mips=True) 写出的 mipmap 容器，层尺寸来自文件头，返回各层的 PIL 图像列表。
+        levels 为要解码的层号，默认全部。
+        """
+        fmt, _ = mipmap.read_mip_header(file_path)
+        if fmt != "abgr8888":
+            raise ValueError(f"{file_path}: mipmap container holds {fmt!r}, not ABGR8888")
+
+        return mipmap.read_mips(file_path, ABGR8888.decode, levels)
+
+    @staticmethod
+    @profiling.instrument("abgr8888.write")
+    def write(image, file_path, mips=False, mip_filter="box", workers=1):
+        """
+        将图像保存为 ABGR8888 二进制格式，返回写入的字节数。
+
+        image 可以是 PIL 图像或 (height, width, 4) 的 RGBA uint8 数组。
+        file_path 可以是文件路径、已打开的二进制文件对象（写入当前位置），
+        或长度不小于 width * height * 4 的可写缓冲区（bytearray、memoryview、numpy 数组等），
+        后者会直接在缓冲区开头就地写入，便于拼进更大的容器而不经过临时文件。
+
+        mips=True 时生成完整的 mipmap 链（mip_filter 为 "box" 或 "lanczos"），
+        由 workers 个进程并行编码各层，写成带层表的 mipmap 容器（见 mipmap.py），此时 file_path 须为路径或文件对象。
         """
-        if image.mode != "RGBA":
-            image = image.convert("RGBA")
-        pixels = list(image.getdata())
+        # 小端 ABGR 的字节顺序正好是 R, G, B, A，不需要重排通道
+        rgba = np.ascontiguousarray(ABGR8888._to_rgba(image))
+        if mips:
+            levels = mipmap.write_mips(file_path, "abgr8888", rgba, ABGR8888.encode, workers, mip_filter)
+            return levels[-1].offset + levels[-1].size
+        size = rgba.size
 
-        with open(file_path, 'wb') as f:
-            for r, g, b, a in pixels:
-                packed = (a << 24) | (b << 16) | (g << 8) | r
-                f.write(struct.pack('<I', packed))
+        with profiling.stage("io.write", bytes=size):
+            if hasattr(file_path, 'write'):
+                file_path.write(rgba)
+            elif isinstance(file_path, (str, bytes, os.PathLike)):
+                with open(file_path, 'wb') as f:
+                    f.write(rgba)
+            else:
+                out = np.frombuffer(file_path, dtype=np.uint8, count=size)
+                out[:] = rgba.reshape(-1)
+        return size
 
 
 
@@ -54,7 +154,7 @@ if __name__ == "__main__":
     ptx_path = "/content/UI_SEEDPACKETS_1536_00.PTX"
     output_path = 'UI_SEEDPACKETS.png'
     width  = 2048      # 2048
-    height = 4096      # 4096  # 你需要确认高度！
+    height = 4096      # 4096  # 你需要确认高度！可用 python mobiletexture.py info 文件 按长度推测
     # 解码并保存为 PNG
     image = ABGR8888.read(ptx_path, width, height)
     image.save(output_path)
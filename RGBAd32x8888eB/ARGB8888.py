@@ -1,38 +1,145 @@
+import os
+
+import numpy as np
 from PIL import Image
-import struct
+
+import mipmap
+import profiling
+
 
 class ARGB8888:
     @staticmethod
+    def _map(file_path, width, height):
+        """
+        只读映射文件中的像素数据，返回 (height, width, 4) 的 uint8 视图。
+        每个像素是小端 ARGB，即内存中的字节顺序为 B, G, R, A。
+        """
+        size = width * height * 4
+        if os.path.getsize(file_path) < size:
+            raise EOFError(f"{file_path}: expected {size} bytes of ARGB8888 data")
+        return np.memmap(file_path, dtype=np.uint8, mode='r', shape=(height, width, 4))
+
+    @staticmethod
+    @profiling.instrument("argb8888.read_array")
+    def read_array(file_path, width, height):
+        """
+        读取 ARGB8888 文件，返回 (height, width, 4) 的 RGBA uint8 数组，不创建 PIL 图像。
+        B, G, R, A 无法用步长视图重排为 R, G, B, A，因此这里有唯一一次通道重排拷贝。
+        """
+        return ARGB8888._map(file_path, width, height)[..., [2, 1, 0, 3]]
+
+    @staticmethod
+    def iter_rows(file_path, width, height, band=64):
+        """
+        按从上到下的顺序逐个产出 (rows, width, 4) 的 RGBA uint8 行带，用于不持有整张图像的流式导出。
+        每个行带是重排通道后的拷贝；只有当前行带所在的页面会被读入。
+        """
+        pixels = ARGB8888._map(file_path, width, height)
+        for y in range(0, height, band):
+            yield pixels[y:y + band][..., [2, 1, 0, 3]]
+
+    @staticmethod
+    @profiling.instrument("argb8888.read")
     def read(file_path, width, height):
-        with open(file_path, 'rb') as f:
-            data = f.read(width * height * 4)
+        # 映射的页面在 decode 拷贝进图像时才被读入
+        return ARGB8888.decode(ARGB8888._map(file_path, width, height), width, height)
+
+    @staticmethod
+    def _view(buffer, width, height):
+        view = memoryview(buffer).cast('B')
+        size = width * height * 4
+        if len(view) < size:
+            raise EOFError(f"Expected {size} bytes of ARGB8888 data, got {len(view)}")
+        return view[:size]
 
-        pixels = []
-        for i in range(0, len(data), 4):
-            temp = struct.unpack('<I', data[i:i+4])[0]
-            a = (temp >> 24) & 0xFF
-            r = (temp >> 16) & 0xFF
-            g = (temp >> 8) & 0xFF
-            b = temp & 0xFF
-            pixels.append((r, g, b, a))  # PIL expects RGBA
+    @staticmethod
+    def decode_array(buffer, width, height):
+        """
+        从内存中的 ARGB8888 数据（bytes、bytearray、memoryview、mmap 等）解码，
+        返回 (height, width, 4) 的 RGBA uint8 数组，不经过文件系统。
+        """
+        pixels = np.frombuffer(ARGB8888._view(buffer, width, height), dtype=np.uint8).reshape(height, width, 4)
+        return pixels[..., [2, 1, 0, 3]]
+
+    @staticmethod
+    def decode(buffer, width, height):
+        """
+        从内存中的 ARGB8888 数据解码为 PIL 图像，不经过文件系统。
+        缓冲区按 memoryview 切片读取，唯一的拷贝是写入图像。
+        """
+        pixels = ARGB8888._view(buffer, width, height)
+        # PIL 的 BGRA 原始模式在拷贝进图像时完成通道重排
+        with profiling.stage("image.frombytes", bytes=len(pixels)):
+            return Image.frombytes('RGBA', (width, height), pixels, 'raw', 'BGRA')
 
-        img = Image.new('RGBA', (width, height))
-        img.putdata(pixels)
-        return img
     @staticmethod
-    def write(image: Image.Image, file_path: str):
-        if image.mode != 'RGBA':
-            image = image.convert('RGBA')
+    def _to_rgba(image):
+        """
+        把 PIL 图像或 (height, width, 4) 的 RGBA 数组统一为 uint8 数组。
+        """
+        if isinstance(image, Image.Image):
+            if image.mode != 'RGBA':
+                image = image.convert('RGBA')
+            return np.asarray(image)
+        rgba = np.asarray(image, dtype=np.uint8)
+        if rgba.ndim != 3 or rgba.shape[2] != 4:
+            raise ValueError(f"Expected an (height, width, 4) RGBA array, got shape {rgba.shape}")
+        return rgba
+
+    @staticmethod
+    def encode(image):
+        """
+        把 PIL 图像或 (height, width, 4) 的 RGBA 数组编码为 ARGB8888 字节，不经过文件系统。
+        """
+        # 小端 ARGB 的字节顺序为 B, G, R, A
+        return np.take(ARGB8888._to_rgba(image), [2, 1, 0, 3], axis=2).tobytes()
+
+    @staticmethod
+    def read_mips(file_path, levels=None):
+        """
+        读取 write(..., mips=True) 写出的 mipmap 容器，层尺寸来自文件头，返回各层的 PIL 图像列表。
+        levels 为要解码的层号，默认全部。
+        """
+        fmt, _ = mipmap.read_mip_header(file_path)
+        if fmt != 'argb8888':
+            raise ValueError(f"{file_path}: mipmap container holds {fmt!r}, not ARGB8888")
+
+        return mipmap.read_mips(file_path, ARGB8888.decode, levels)
+
+    @staticmethod
+    @profiling.instrument("argb8888.write")
+    def write(image, file_path, mips=False, mip_filter="box", workers=1):
+        """
+        将图像保存为 ARGB8888 二进制格式，返回写入的字节数。
+
+        image 可以是 PIL 图像或 (height, width, 4) 的 RGBA uint8 数组。
+        file_path 可以是文件路径、已打开的二进制文件对象（写入当前位置），
+        或长度不小于 width * height * 4 的可写缓冲区（bytearray、memoryview、numpy 数组等），
+        后者会直接在缓冲区开头就地写入，便于拼进更大的容器而不经过临时文件。
 
-        pixels = list(image.getdata())
-        data = bytearray()
+        mips=True 时生成完整的 mipmap 链（mip_filter 为 "box" 或 "lanczos"），
+        由 workers 个进程并行编码各层，写成带层表的 mipmap 容器（见 mipmap.py），此时 file_path 须为路径或文件对象。
+        """
+        rgba = ARGB8888._to_rgba(image)
+        if mips:
+            levels = mipmap.write_mips(file_path, "argb8888", rgba, ARGB8888.encode, workers, mip_filter)
+            return levels[-1].offset + levels[-1].size
+        size = rgba.size
 
-        for r, g, b, a in pixels:
-            argb = (a << 24) | (r << 16) | (g << 8) | b
-            data.extend(struct.pack('<I', argb))
+        if not isinstance(file_path, (str, bytes, os.PathLike)) and not hasattr(file_path, 'write'):
+            # 小端 ARGB 的字节顺序为 B, G, R, A，一次 take 直接重排进目标缓冲区
+            out = np.frombuffer(file_path, dtype=np.uint8, count=size).reshape(rgba.shape)
+            np.take(rgba, [2, 1, 0, 3], axis=2, out=out)
+            return size
 
-        with open(file_path, 'wb') as f:
-            f.write(data)
+        data = np.take(rgba, [2, 1, 0, 3], axis=2)
+        with profiling.stage("io.write", bytes=size):
+            if hasattr(file_path, 'write'):
+                file_path.write(data)
+            else:
+                with open(file_path, 'wb') as f:
+                    f.write(data)
+        return size
 
 
 # 编码示例：
@@ -48,7 +155,7 @@ if __name__ == "__main__":
     ptx_path = "/content/UI_SEEDPACKETS_1536_00.PTX"
     output_path = 'UI_SEEDPACKETS.png'
     width  = 2048      # 2048
-    height = 4096      # 4096  # 你需要确认高度！
+    height = 4096      # 4096  # 你需要确认高度！可用 python mobiletexture.py info 文件 按长度推测
     # 解码并保存为 PNG
     image = ARGB8888.read(ptx_path, width, height)
     image.save(output_path)
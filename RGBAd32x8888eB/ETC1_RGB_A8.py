@@ -1,178 +1,536 @@
+import functools
+import mmap
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
 from PIL import Image
-def read_etc1_rgb_a8(file_path, width, height):
+
+import mipmap
+import profiling
+from etc1 import ETC1
+
+# Alpha plane layouts that follow the ETC1 RGB blocks
+ALPHA_A8 = "a8"      # one raw byte per pixel
+ALPHA_ETC1 = "etc1"  # a second ETC1 stream encoding alpha as grayscale
+ALPHA_NONE = "none"  # no alpha plane, the ETC1 blocks alone; decodes as opaque
+ALPHA_FORMATS = (ALPHA_A8, ALPHA_ETC1, ALPHA_NONE)
+# Format names stored in mipmap containers, one per alpha layout
+MIP_FORMATS = {ALPHA_A8: "etc1_rgb_a8", ALPHA_ETC1: "etc1_rgb_etc1a", ALPHA_NONE: "etc1_rgb"}
+
+
+def _alpha_size(width, height, alpha_format):
+    if alpha_format == ALPHA_A8:
+        return width * height
+    if alpha_format == ALPHA_ETC1:
+        return ((width + 3) // 4) * ((height + 3) // 4) * 8
+    if alpha_format == ALPHA_NONE:
+        return 0
+    raise ValueError(f"Unknown alpha format {alpha_format!r}, expected one of {ALPHA_FORMATS}")
+
+
+def _decode_alpha(alpha_bytes, width, height, alpha_format):
+    """
+    Returns the (height, width) uint8 alpha plane.
     """
-    Reads ETC1 RGB data and separate A8 alpha data from a specified file,
+    if alpha_format == ALPHA_ETC1:
+        # Grayscale blocks decode to r == g == b
+        return ETC1.decode_etc1_blocks(alpha_bytes, width, height)[..., 1]
+    if alpha_format == ALPHA_NONE:
+        return np.full((height, width), 255, dtype=np.uint8)
+    return np.frombuffer(alpha_bytes, dtype=np.uint8, count=width * height).reshape(height, width)
+
+
+@profiling.instrument("etc1_rgb_a8.read")
+def read_etc1_rgb_a8(file_path, width, height, alpha_format=ALPHA_A8):
+    """
+    Reads ETC1 RGB data and separate alpha data from a specified file,
     then reconstructs an RGBA image.
 
     Args:
         file_path (str): The path to the input file.
         width (int): The width of the image.
         height (int): The height of the image.
+        alpha_format (str): ALPHA_A8 for raw A8 alpha bytes, ALPHA_ETC1 for
+            alpha stored as a second grayscale ETC1 stream, or ALPHA_NONE for
+            plain ETC1 blocks without alpha (decoded as opaque).
 
     Returns:
         Image.Image: The reconstructed Pillow Image object in RGBA format.
     """
-    with open(file_path, 'rb') as f:
-        # Initialize img_data with placeholders.
-        # This will store (R, G, B, A) tuples.
-        img_data = [[(0, 0, 0, 0) for _ in range(width)] for _ in range(height)]
-
-        # --- Read ETC1 RGB blocks ---
-        # Calculate padded dimensions as the ETC1 data will be stored based on them
-        padded_width = (width + 3) // 4 * 4
-        padded_height = (height + 3) // 4 * 4
-
-        for by in range(0, padded_height, 4):
-            for bx in range(0, padded_width, 4):
-                block_bytes = f.read(8)
-                if not block_bytes:
-                    raise EOFError(f"Unexpected end of file while reading ETC1 block at {bx},{by}")
-                
-                # Convert the 8 bytes to a 64-bit integer
-                etc1_block_val = int.from_bytes(block_bytes, 'big')
-                
-                # Use ETC1.decode_etc1 to get the 16 Color objects for this block
-                # We don't pass an alpha value here, as alpha is stored separately (A8)
-                decoded_pixels_etc1 = ETC1.decode_etc1(etc1_block_val)
-
-                # Map the decoded RGB values back to the img_data structure
-                # The decoded_pixels_etc1 list is 1D (16 elements), ordered row by row (0,0), (0,1)...(3,3)
-                for i in range(4): # row in block
-                    for j in range(4): # col in block
-                        x = bx + j
-                        y = by + i
-                        
-                        if x < width and y < height:
-                            # Get the Color object from the decoded block
-                            color_obj = decoded_pixels_etc1[i * 4 + j]
-                            # Store R, G, B, and a placeholder alpha (0) for now.
-                            # The actual alpha will be read in the next step.
-                            img_data[y][x] = (color_obj.Red, color_obj.Green, color_obj.Blue, 0)
-        
-        # --- Read Alpha (A8) data ---
-        for y in range(height):
-            for x in range(width):
-                alpha_byte = f.read(1)
-                if not alpha_byte:
-                    raise EOFError(f"Unexpected end of file while reading alpha byte at {x},{y}")
-                
-                # Get the previously stored RGB values
-                r, g, b, _ = img_data[y][x]
-                # Update the pixel with the actual alpha value
-                img_data[y][x] = (r, g, b, alpha_byte[0])
-
-        # Create a Pillow Image object from the reconstructed pixel data
-        image = Image.new("RGBA", (width, height))
-        
-        # Flatten the 2D list of tuples into a 1D list of tuples for putdata
-        flat_pixels = [pixel for row in img_data for pixel in row]
-        
-        image.putdata(flat_pixels)
-        return image
+    size = _etc1_size(width, height) + _alpha_size(width, height, alpha_format)
+    with open(file_path, 'rb') as f, profiling.stage("io.read", bytes=size):
+        data = f.read(size)
+    return decode_etc1_rgb_a8(data, width, height, alpha_format)
+
+
+def _etc1_size(width, height):
+    # The ETC1 data is stored for the dimensions padded to multiples of 4
+    return ((width + 3) // 4) * ((height + 3) // 4) * 8
+
+
+def decode_etc1_rgb_a8(buffer, width, height, alpha_format=ALPHA_A8):
+    """
+    Decodes ETC1_RGB_A8 data that is already in memory, without touching the
+    filesystem. Both planes are read through memoryview slices of buffer, so
+    nothing is copied before decoding.
+
+    Args:
+        buffer (bytes | bytearray | memoryview | mmap.mmap): The file contents.
+        width (int): The width of the image.
+        height (int): The height of the image.
+        alpha_format (str): ALPHA_A8, ALPHA_ETC1 or ALPHA_NONE, see read_etc1_rgb_a8.
+
+    Returns:
+        Image.Image: The reconstructed Pillow Image object in RGBA format.
+    """
+    etc1_size = _etc1_size(width, height)
+    alpha_size = _alpha_size(width, height, alpha_format)
+    view = memoryview(buffer).cast('B')
+
+    # --- ETC1 RGB blocks, then alpha data (A8 or ETC1) ---
+    if len(view) < etc1_size:
+        raise EOFError(f"Unexpected end of data while reading ETC1 blocks ({len(view)} of {etc1_size} bytes)")
+    if len(view) < etc1_size + alpha_size:
+        raise EOFError(f"Unexpected end of data while reading alpha data "
+                       f"({len(view) - etc1_size} of {alpha_size} bytes)")
+    return _decode_planes(view[:etc1_size], view[etc1_size:etc1_size + alpha_size], width, height, alpha_format)
+
+
+def _decode_planes(etc1_bytes, alpha_bytes, width, height, alpha_format):
+    # Decode every block at once, then attach the alpha plane as the fourth channel
+    rgba = np.empty((height, width, 4), dtype=np.uint8)
+    rgba[..., :3] = ETC1.decode_etc1_blocks(etc1_bytes, width, height)
+    with profiling.stage("alpha.decode"):
+        rgba[..., 3] = _decode_alpha(alpha_bytes, width, height, alpha_format)
+    with profiling.stage("image.fromarray", bytes=rgba.nbytes):
+        return Image.fromarray(rgba)
+
+
+def read_etc1_rgb_a8_mips(file_path, levels=None):
+    """
+    Reads a mipmap container written by write_etc1_rgb_a8(..., mips=True).
+    Level sizes and the alpha layout come from the container header.
+
+    Args:
+        file_path (str): The path to the input file.
+        levels (list[int]): Mip levels to decode, all of them by default.
+
+    Returns:
+        list[Image.Image]: One RGBA image per requested level, largest first.
+    """
+    fmt, _ = mipmap.read_mip_header(file_path)
+    alpha_formats = {name: alpha_format for alpha_format, name in MIP_FORMATS.items()}
+    if fmt not in alpha_formats:
+        raise ValueError(f"{file_path}: mipmap container holds {fmt!r}, not ETC1_RGB_A8")
+    alpha_format = alpha_formats[fmt]
+
+    return mipmap.read_mips(file_path, functools.partial(decode_etc1_rgb_a8, alpha_format=alpha_format), levels)
+
+
+def iter_etc1_rgb_a8_rows(file_path, width, height, band=4, alpha_format=ALPHA_A8):
+    """
+    Streams an ETC1_RGB_A8 file as horizontal RGBA bands.
+
+    Only the ETC1 block rows and the alpha rows of the current band are read
+    (through a read-only mmap), so peak memory is proportional to
+    width * band instead of the whole image.
+
+    Args:
+        file_path (str): The path to the input file.
+        width (int): The width of the image.
+        height (int): The height of the image.
+        band (int): Rows per band, a positive multiple of 4 (one ETC1 block row).
+        alpha_format (str): ALPHA_A8, ALPHA_ETC1 or ALPHA_NONE, see read_etc1_rgb_a8.
+
+    Yields:
+        numpy.ndarray: A (rows, width, 4) uint8 RGBA array for each band, top to
+        bottom. rows equals band except possibly for the last band.
+    """
+    if band <= 0 or band % 4:
+        raise ValueError(f"band must be a positive multiple of 4, got {band}")
+
+    padded_width = (width + 3) // 4 * 4
+    padded_height = (height + 3) // 4 * 4
+    blocks_x = padded_width // 4
+    etc1_size = blocks_x * (padded_height // 4) * 8
+    total_size = etc1_size + _alpha_size(width, height, alpha_format)
+
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if len(mapped) < total_size:
+            raise EOFError(f"Unexpected end of file: expected {total_size} bytes, got {len(mapped)}")
+
+        for y in range(0, height, band):
+            rows = min(band, height - y)
+            block_count = (rows + 3) // 4 * blocks_x
+            rgba = np.empty((rows, width, 4), dtype=np.uint8)
+
+            # ETC1 block row(s) covering this band start at block (y / 4) * (padded_width / 4)
+            blocks = np.frombuffer(mapped, dtype='>u8', count=block_count, offset=(y // 4) * blocks_x * 8)
+            rgba[..., :3] = ETC1.decode_etc1_blocks(blocks, width, rows)
+            # The alpha plane follows all ETC1 blocks: A8 rows of one byte per pixel,
+            # or a second block grid laid out like the RGB one
+            if alpha_format == ALPHA_ETC1:
+                alpha = np.frombuffer(mapped, dtype='>u8', count=block_count,
+                                      offset=etc1_size + (y // 4) * blocks_x * 8)
+            elif alpha_format == ALPHA_NONE:
+                alpha = None
+            else:
+                alpha = np.frombuffer(mapped, dtype=np.uint8, count=rows * width, offset=etc1_size + y * width)
+            rgba[..., 3] = _decode_alpha(alpha, width, rows, alpha_format)
+            # Drop the views into the mapping before handing the band out, so the map can be closed
+            del blocks, alpha
+            yield rgba
+
+
+class BlockCache:
+    """
+    LRU cache of decoded 4x4 blocks shared by read_region calls.
+
+    Entries are keyed by (file identity, plane, block index); the file identity
+    includes the size and modification time, so rewritten files never hit stale
+    blocks. Each entry is a compact copy that shares no memory with the decoded
+    batch, so max_blocks really bounds memory: about 400 bytes per cached block
+    (48 bytes of pixels, or 16 for an alpha block, plus the array header, the
+    key and the dict entry).
+    """
+
+    def __init__(self, max_blocks=1 << 16):
+        self.max_blocks = max_blocks
+        self.hits = 0
+        self.misses = 0
+        self._blocks = OrderedDict()
+
+    def lookup(self, keys, decode):
+        """
+        Returns the decoded block for every key, calling decode(missing_keys)
+        once for all misses; decode returns an array with one block per key.
+        Blocks are copied out of that array before being cached, so evicting
+        them actually releases memory.
+        """
+        blocks = self._blocks
+        result = [None] * len(keys)
+        missing = []
+        for i, key in enumerate(keys):
+            block = blocks.get(key)
+            if block is None:
+                missing.append(i)
+            else:
+                blocks.move_to_end(key)
+                result[i] = block
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            decoded = decode([keys[i] for i in missing])
+            for i, block in zip(missing, decoded):
+                result[i] = block
+            # Earlier misses would be evicted again by the later ones, so only
+            # the last max_blocks are stored; the dict never grows past the bound
+            stored = missing[-self.max_blocks:] if self.max_blocks > 0 else []
+            for i in stored:
+                blocks[keys[i]] = result[i].copy()
+                if len(blocks) > self.max_blocks:
+                    blocks.popitem(last=False)
+        return result
+
+    def info(self):
+        return {"hits": self.hits, "misses": self.misses, "blocks": len(self._blocks),
+                "max_blocks": self.max_blocks}
+
+    def clear(self):
+        self._blocks.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# Default cache for read_region
+REGION_CACHE = BlockCache()
+
+
+@profiling.instrument("etc1_rgb_a8.read_region")
+def read_region(file_path, width, height, x, y, w, h, alpha_format=ALPHA_A8, cache=REGION_CACHE):
+    """
+    Decodes the rectangle (x, y, w, h) of an ETC1_RGB_A8 file.
+
+    Only the ETC1 blocks overlapping the rectangle and the alpha bytes (or alpha
+    blocks) it covers are read, through a read-only mmap. Block (bx, by) sits at
+    offset ((by / 4) * (padded_w / 4) + bx / 4) * 8 and the A8 byte of pixel
+    (x, y) at padded_blocks * 8 + y * width + x. Decoded blocks are kept in an
+    LRU cache, so repeated lookups on the same atlas skip the decoder entirely.
+
+    Args:
+        file_path (str): The path to the input file.
+        width (int): The width of the whole image.
+        height (int): The height of the whole image.
+        x, y, w, h (int): The rectangle to decode, in pixels.
+        alpha_format (str): ALPHA_A8, ALPHA_ETC1 or ALPHA_NONE, see read_etc1_rgb_a8.
+        cache (BlockCache): Cache of decoded blocks, None to disable caching.
+
+    Returns:
+        Image.Image: A w x h RGBA image.
+    """
+    if w <= 0 or h <= 0 or x < 0 or y < 0 or x + w > width or y + h > height:
+        raise ValueError(f"Region ({x}, {y}, {w}, {h}) is outside the {width}x{height} image")
+
+    blocks_x = (width + 3) // 4
+    etc1_size = blocks_x * ((height + 3) // 4) * 8
+    total_size = etc1_size + _alpha_size(width, height, alpha_format)
+    bx0, bx1 = x // 4, (x + w + 3) // 4
+    by0, by1 = y // 4, (y + h + 3) // 4
+
+    stat = os.stat(file_path)
+    identity = (os.path.realpath(file_path), stat.st_size, stat.st_mtime_ns)
+    rgba = np.empty(((by1 - by0) * 4, (bx1 - bx0) * 4, 4), dtype=np.uint8)
+
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if len(mapped) < total_size:
+            raise EOFError(f"Unexpected end of file: expected {total_size} bytes, got {len(mapped)}")
 
+        planes = [(0, 0, slice(0, 3))]
+        if alpha_format == ALPHA_ETC1:
+            planes.append((1, etc1_size, slice(3, 4)))
+        for plane, offset, channels in planes:
+            all_blocks = np.frombuffer(mapped, dtype='>u8', count=etc1_size // 8, offset=offset)
 
+            def decode(keys):
+                # Only the pages holding the missing blocks are touched
+                indices = np.fromiter((key[2] for key in keys), dtype=np.intp, count=len(keys))
+                pixels = ETC1._decode_blocks(all_blocks[indices])
+                return pixels if plane == 0 else pixels[..., 1:2]
 
-def write_etc1_rgb_a8(file_path, width, height, image: Image.Image):
+            keys = [(identity, plane, by * blocks_x + bx) for by in range(by0, by1) for bx in range(bx0, bx1)]
+            if cache is None:
+                decoded = decode(keys)
+            else:
+                decoded = cache.lookup(keys, decode)
+            for i, block in enumerate(decoded):
+                row, column = divmod(i, bx1 - bx0)
+                rgba[row * 4:row * 4 + 4, column * 4:column * 4 + 4, channels] = block
+            del all_blocks, decode
+
+        rgba = rgba[y - by0 * 4:y - by0 * 4 + h, x - bx0 * 4:x - bx0 * 4 + w]
+        if alpha_format == ALPHA_A8:
+            alpha = np.frombuffer(mapped, dtype=np.uint8, count=h * width, offset=etc1_size + y * width)
+            rgba[..., 3] = alpha.reshape(h, width)[:, x:x + w]
+            del alpha
+        elif alpha_format == ALPHA_NONE:
+            rgba[..., 3] = 255
+    return Image.fromarray(rgba)
+
+
+def _encode_band(shm_name, shape, first_row, last_row, encode):
+    """
+    在子进程中编码共享内存里第 first_row 到 last_row（不含）个块行，返回大端块数据。
+    encode 为可 pickle 的批量编码函数，接受 (N, 4, 4, 4) 的块，返回 uint64 块值数组。
     """
-    将 RGBA 图像编码为 ETC1 RGB 数据，并分离 A8 alpha 数据，
+    # 共享内存由父进程创建并负责 unlink，子进程只挂载和关闭
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        padded = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        blocks = ETC1.image_to_blocks(padded[first_row * 4:last_row * 4])
+        del padded
+        return encode(blocks).astype('>u8').tobytes()
+    finally:
+        shm.close()
+
+
+def _encode_parallel(rgba, workers, encode):
+    """
+    把补齐后的块网格按块行切成若干条带，交给进程池用 encode 并行编码。
+    像素通过共享内存传给子进程，结果按条带顺序拼接，与串行结果逐字节相同。
+    """
+    height, width = rgba.shape[:2]
+    padded_width = (width + 3) // 4 * 4
+    padded_height = (height + 3) // 4 * 4
+    block_rows = padded_height // 4
+    shape = (padded_height, padded_width, 4)
+    if block_rows == 0 or padded_width == 0:
+        # 空图像没有块可编码, 与串行路径一样返回空数据 (也不能创建大小为 0 的共享内存)
+        return b""
+
+    # 条带数取进程数的数倍，以便各进程负载均衡
+    band_count = min(block_rows, workers * 4)
+    bounds = [block_rows * i // band_count for i in range(band_count + 1)]
+
+    shm = shared_memory.SharedMemory(create=True, size=padded_height * padded_width * 4)
+    try:
+        padded = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        padded[:] = 0
+        padded[:height, :width] = rgba
+        del padded
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            bands = executor.map(_encode_band, [shm.name] * band_count, [shape] * band_count,
+                                 bounds[:-1], bounds[1:], [encode] * band_count)
+            return b"".join(bands)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def encode_etc1_rgb_a8(image, workers=1, quality="fast", alpha_format=ALPHA_A8, cache=None):
+    """
+    将图像编码为 ETC1_RGB_A8 数据并以 bytes 返回，不经过文件系统，
+    结果与 write_etc1_rgb_a8 写出的文件内容逐字节相同。
+
+    参数：
+        image：Pillow 图像对象，或 (height, width, 4) 的 RGBA uint8 数组。
+        workers (int)：编码使用的进程数，1 为串行，None 表示使用全部 CPU 核心。
+        quality (str)：ETC1 编码质量，见 write_etc1_rgb_a8。
+        alpha_format (str)：alpha 的存储方式，ALPHA_A8、ALPHA_ETC1 或 ALPHA_NONE。
+        cache (ETC1EncodeCache)：跨调用复用编码结果并累计命中统计，见 etc1.ETC1EncodeCache。
+            缓存只在当前进程内有效，给出时在当前进程中编码，忽略 workers。
+    """
+    if isinstance(image, Image.Image):
+        if image.mode != "RGBA":
+            image = image.convert("RGBA")
+    rgba = np.asarray(image, dtype=np.uint8)
+    if rgba.ndim != 3 or rgba.shape[2] != 4:
+        raise ValueError(f"Expected an (height, width, 4) RGBA array, got shape {rgba.shape}")
+    _alpha_size(rgba.shape[1], rgba.shape[0], alpha_format)
+    if cache is not None:
+        workers = 1
+    elif workers is None:
+        workers = os.cpu_count() or 1
+
+    # 补齐到 4 的倍数并切成 4x4 块后一次性压缩，超出范围的像素用透明黑色填充
+    encode = functools.partial(ETC1.gen_etc1_blocks, quality=quality, cache=cache)
+    # 作为标准 ETC1 纹理上传 GPU 的数据 (无 alpha 的 RGB 与 ETC1 alpha 平面) 不能含差分溢出的块
+    portable = functools.partial(ETC1.gen_portable_etc1_blocks, quality=quality, cache=cache)
+
+    def encode_image(pixels, encode=encode):
+        if workers > 1:
+            # 子进程中的阶段不会被记录, 这里只能看到并行编码的总耗时
+            with profiling.stage("etc1.encode_parallel", blocks=pixels.shape[0] * pixels.shape[1] // 16):
+                return _encode_parallel(pixels, workers, encode)
+        return encode(ETC1.image_to_blocks(pixels)).astype('>u8').tobytes()
+
+    if alpha_format == ALPHA_NONE:
+        # 不存储 alpha 时解码结果不透明，按不透明编码，使透明像素的 RGB 同样计入编码误差
+        opaque = rgba.copy()
+        opaque[..., 3] = 255
+        return encode_image(opaque, portable)
+
+    etc1_data = encode_image(rgba)
+
+    # --- Alpha 通道处理 ---
+    if alpha_format == ALPHA_ETC1:
+        # alpha 复制到 RGB 三个通道，并设为不透明，使每个像素都计入编码误差
+        gray = np.empty(rgba.shape, dtype=np.uint8)
+        gray[..., :3] = rgba[..., 3:]
+        gray[..., 3] = 255
+        alpha_data = encode_image(gray, portable)
+    else:
+        alpha_data = np.ascontiguousarray(rgba[..., 3]).tobytes()
+    return etc1_data + alpha_data
+
+
+@profiling.instrument("etc1_rgb_a8.write")
+def write_etc1_rgb_a8(file_path, width, height, image: Image.Image, workers=1, quality="fast",
+                      alpha_format=ALPHA_A8, mips=False, mip_filter="box", cache=None):
+    """
+    将 RGBA 图像编码为 ETC1 RGB 数据，并分离 alpha 数据，
     然后将其写入指定文件
 
     参数：
-        file_path (str)：输出文件的路径。
+        file_path (str)：输出文件的路径，或已打开的二进制文件对象（如 BytesIO，写入当前位置）。
         width (int)：图像的宽度。
         height (int)：图像的高度。
         image (Image.Image)：RGBA 格式的 Pillow 图像对象。
+        workers (int)：编码使用的进程数，1 为串行，None 表示使用全部 CPU 核心。
+            输出与进程数无关，总是与串行结果逐字节相同。
+        quality (str)：ETC1 编码质量，"fast" 为原有的启发式，"high" 为逐子块穷举修正表与基色，
+            误差更小但耗时约为 fast 的数倍，见 ETC1.gen_etc1_blocks。
+        alpha_format (str)：alpha 的存储方式，ALPHA_A8 为每像素 1 字节的原始 A8，
+            ALPHA_ETC1 把 alpha 作为灰度图再编码为一组 ETC1 块（每像素 0.5 字节），编码质量同 quality，
+            ALPHA_NONE 只写 ETC1 块、不存储 alpha（即标准的 ETC1 RGB 数据，解码为不透明）。
+        mips (bool)：为 True 时生成完整的 mipmap 链，各层由 workers 个进程并行编码，
+            写成带层表的 mipmap 容器（见 mipmap.py），用 read_etc1_rgb_a8_mips 读取。
+        mip_filter (str)：mipmap 的缩小滤波器，"box" 或 "lanczos"。
+        cache (ETC1EncodeCache)：跨调用（多张纹理、mipmap 各层）复用编码结果，stats() 给出命中率。
+            缓存只在当前进程内有效，给出时所有块与各层都在当前进程中编码，忽略 workers。
     """
+    # 在编码前校验 alpha_format
+    _alpha_size(width, height, alpha_format)
+
     # 确保图像为 RGBA 格式
-    if image.mode != "RGBA":
-        image = image.convert("RGBA")
-    
-    img_data = list(image.getdata())
+    with profiling.stage("image.convert"):
+        if image.mode != "RGBA":
+            image = image.convert("RGBA")
+        rgba = np.asarray(image)[:height, :width]
+    if cache is not None:
+        workers = 1
+    elif workers is None:
+        workers = os.cpu_count() or 1
 
-    # 对于 ETC1 块处理，Pad 图像尺寸应为 4 的倍数
-    padded_width = (width + 3) // 4 * 4
-    padded_height = (height + 3) // 4 * 4
+    if mips:
+        encode = functools.partial(encode_etc1_rgb_a8, quality=quality, alpha_format=alpha_format, cache=cache)
+        mipmap.write_mips(file_path, MIP_FORMATS[alpha_format], rgba, encode, workers=workers, filter=mip_filter)
+        return
 
-    etc1_blocks = []
-    alpha_data = bytearray() # To store alpha bytes
-
-    # --- ETC1区块处理 ---
-    # Iterate through 4x4 blocks
-    for by in range(0, padded_height, 4):
-        for bx in range(0, padded_width, 4):
-            block_pixels_etc1 = [] # For ETC1 RGB compression
-            
-            # 提取当前 4x4 块的像素
-            for y in range(4):
-                for x in range(4):
-                    ix = bx + x
-                    iy = by + y
-                    
-                    if ix < width and iy < height:
-                        # 像素为 (R, G, B, A)，来自 PIL
-                        # 为 ETC1 处理创建自定义颜色对象
-                        r, g, b, a = img_data[iy * width + ix]
-                        block_pixels_etc1.append(Color(a, r, g, b))
-                    else:
-                        # 用透明黑色/无色填充超出范围的像素
-                        # ETC1 只关心 RGB，因此这里的 alpha 主要是一个占位符
-                        block_pixels_etc1.append(Color(0, 0, 0, 0))
-            
-            # 调用 gen_etc1 压缩 4x4 块
-            # 这将返回一个 64 位（8 字节）整数，表示压缩块
-            etc1_block_val = ETC1.gen_etc1(block_pixels_etc1)
-            
-            # 附加 ETC1 块的 8 个字节（ETC1 文件中常用的小端字节序）
-            etc1_blocks.append(etc1_block_val.to_bytes(8, 'big'))
-
-    # --- Alpha 通道处理 (A8) ---
-    # 遍历每个像素以提取其 alpha 值
-    for iy in range(height):
-        for ix in range(width):
-            # img_data 已经是 (R, G, B, A)
-            alpha = img_data[iy * width + ix][3]
-            alpha_data.append(alpha)
+    data = encode_etc1_rgb_a8(rgba, workers, quality, alpha_format, cache)
 
     # --- 写入文件 ---
-    with open(file_path, 'wb') as f:
-        # 首先写入ETC1 RGB块
-        for block_bytes in etc1_blocks:
-            f.write(block_bytes)
-
-        # 然后写入A8 alpha数据
-        f.write(alpha_data)
+    # ETC1 RGB 块（大端字节序）在前，alpha 数据在后
+    with profiling.stage("io.write", bytes=len(data)):
+        if hasattr(file_path, 'write'):
+            file_path.write(data)
+        else:
+            with open(file_path, 'wb') as f:
+                f.write(data)
 
 # === 主程序入口 ===
 # === Main Program Entry ===
-def compress_png_to_etc1_rgb_a8(input_png_path, output_ptx_path):
+def compress_png_to_etc1_rgb_a8(input_png_path, output_ptx_path, workers=1, quality="fast", alpha_format=ALPHA_A8):
     """
     Compresses a PNG image to ETC1 RGB and A8 alpha format, saving it to a .ptx file.
 
     Args:
         input_png_path (str): Path to the input PNG image.
         output_ptx_path (str): Path for the output .ptx file.
+        workers (int): Number of encoder processes, None for all CPU cores.
+        quality (str): ETC1 encoder quality, "fast" or "high".
+        alpha_format (str): ALPHA_A8, ALPHA_ETC1 or ALPHA_NONE, see write_etc1_rgb_a8.
     """
     try:
         image = Image.open(input_png_path).convert("RGBA")
         width, height = image.size
         
-        write_etc1_rgb_a8(output_ptx_path, width, height, image)
+        write_etc1_rgb_a8(output_ptx_path, width, height, image, workers=workers, quality=quality,
+                          alpha_format=alpha_format)
         print(f"Compression complete. Output saved to: {output_ptx_path}")
     except FileNotFoundError:
         print(f"Error: Input PNG file not found at '{input_png_path}'")
     except Exception as e:
         print(f"An error occurred during compression: {e}")
 
-# 编码示例：
-# if __name__ == "__main__":
-#     compress_png_to_etc1_rgb_a8("/content/***.png", "output.ptx")
-
-# 解码示例：
+# 使用示例（在仓库根目录运行）：
+#   编码：python -m RGBAd32x8888eB.ETC1_RGB_A8 input.png output.ptx --workers 8
+#   解码：python -m RGBAd32x8888eB.ETC1_RGB_A8 input.PTX output.png --width 1024 --height 2048
 if __name__ == "__main__":
-    ptx_path = '/content/DELAYLOAD_BACKGROUND_FRONTLAWN_SUMMERNIGHTS_768_00.PTX'
-    output_path = 'DELAYLOAD_BACKGROUND_FRONTLAWN_SUMMERNIGHTS_768.png'
-    width  = 1024      # 2048
-    height = 2048      # 4096  # 你需要确认宽高！
-    image = read_etc1_rgb_a8(ptx_path, width, height)
-    image.save(output_path)
-    print(f"PTX 转换完成，保存为：{output_path}")
+    import argparse
+
+    parser = argparse.ArgumentParser(description="ETC1_RGB_A8 PTX 与 PNG 互转")
+    parser.add_argument("input", help="输入文件，.png 为编码，其余按 PTX 解码")
+    parser.add_argument("output", help="输出文件")
+    parser.add_argument("--width", type=int, help="解码时的图像宽度")
+    parser.add_argument("--height", type=int, help="解码时的图像高度")  # 你需要确认宽高！
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="编码使用的进程数，0 表示使用全部 CPU 核心")
+    parser.add_argument("--quality", choices=("fast", "high"), default="fast", help="ETC1 编码质量")
+    parser.add_argument("--alpha", choices=ALPHA_FORMATS, default=ALPHA_A8,
+                        help="alpha 存储方式：a8 为原始字节，etc1 为第二组 ETC1 块，none 为不存储")
+    args = parser.parse_args()
+
+    if args.input.lower().endswith(".png"):
+        compress_png_to_etc1_rgb_a8(args.input, args.output, workers=args.workers or None,
+                                    quality=args.quality, alpha_format=args.alpha)
+    else:
+        if args.width is None or args.height is None:
+            parser.error("解码 PTX 需要 --width 和 --height")
+        image = read_etc1_rgb_a8(args.input, args.width, args.height, alpha_format=args.alpha)
+        image.save(args.output)
+        print(f"PTX 转换完成，保存为：{args.output}")
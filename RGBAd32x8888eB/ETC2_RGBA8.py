@@ -0,0 +1,186 @@
+import functools
+import os
+
+import numpy as np
+from PIL import Image
+
+import mipmap
+import profiling
+from etc1 import ETC1
+from etc2 import ETC2
+from RGBAd32x8888eB.ETC1_RGB_A8 import _encode_parallel
+
+
+def _block_bytes(width, height, block_size):
+    return ((width + 3) // 4) * ((height + 3) // 4) * block_size
+
+
+def _read_blocks(file_path, size):
+    with open(file_path, 'rb') as f, profiling.stage("io.read", bytes=size):
+        data = f.read(size)
+    if len(data) < size:
+        raise EOFError(f"Unexpected end of file while reading ETC2 blocks ({len(data)} of {size} bytes)")
+    return data
+
+
+@profiling.instrument("etc2_rgba8.read")
+def read_etc2_rgba8(file_path, width, height):
+    """
+    Reads ETC2 RGBA8 (EAC alpha + ETC2 RGB, 16 bytes per 4x4 block) data from a
+    specified file and reconstructs an RGBA image.
+
+    Args:
+        file_path (str): The path to the input file.
+        width (int): The width of the image.
+        height (int): The height of the image.
+
+    Returns:
+        Image.Image: The reconstructed Pillow Image object in RGBA format.
+    """
+    return decode_etc2_rgba8(_read_blocks(file_path, _block_bytes(width, height, 16)), width, height)
+
+
+@profiling.instrument("etc2_rgb8.read")
+def read_etc2_rgb8(file_path, width, height):
+    """
+    Reads ETC2 RGB8 data (8 bytes per 4x4 block) from a specified file.
+
+    Args:
+        file_path (str): The path to the input file.
+        width (int): The width of the image.
+        height (int): The height of the image.
+
+    Returns:
+        Image.Image: The reconstructed Pillow Image object in RGB format.
+    """
+    return decode_etc2_rgb8(_read_blocks(file_path, _block_bytes(width, height, 8)), width, height)
+
+
+def decode_etc2_rgba8(buffer, width, height):
+    """
+    Decodes ETC2 RGBA8 data already in memory (bytes, memoryview, mmap, ...)
+    into an RGBA image, without touching the filesystem.
+    """
+    return Image.fromarray(ETC2.decode_etc2_rgba8_blocks(buffer, width, height))
+
+
+def decode_etc2_rgb8(buffer, width, height):
+    """
+    Decodes ETC2 RGB8 data already in memory into an RGB image.
+    """
+    return Image.fromarray(ETC2.decode_etc2_blocks(buffer, width, height))
+
+
+def read_etc2_mips(file_path, levels=None):
+    """
+    Reads a mipmap container written by write_etc2_rgba8 / write_etc2_rgb8 with
+    mips=True. Level sizes and the format come from the container header.
+
+    Args:
+        file_path (str): The path to the input file.
+        levels (list[int]): Mip levels to decode, all of them by default.
+
+    Returns:
+        list[Image.Image]: One image per requested level, largest first.
+    """
+    fmt, _ = mipmap.read_mip_header(file_path)
+    decoders = {"etc2_rgba8": decode_etc2_rgba8, "etc2_rgb8": decode_etc2_rgb8}
+    if fmt not in decoders:
+        raise ValueError(f"{file_path}: mipmap container holds {fmt!r}, not ETC2")
+    return mipmap.read_mips(file_path, decoders[fmt], levels)
+
+
+def _encode_level(rgba, encode):
+    return encode(ETC1.image_to_blocks(rgba)).astype('>u8').tobytes()
+
+
+def _encode_etc2(file_path, width, height, image, workers, encode, fmt, mips, mip_filter):
+    with profiling.stage("image.convert"):
+        if image.mode != "RGBA":
+            image = image.convert("RGBA")
+        rgba = np.asarray(image)[:height, :width]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if mips:
+        mipmap.write_mips(file_path, fmt, rgba, functools.partial(_encode_level, encode=encode),
+                          workers=workers, filter=mip_filter)
+        return
+    if workers > 1:
+        data = _encode_parallel(rgba, workers, encode)
+    else:
+        data = _encode_level(rgba, encode)
+
+    with profiling.stage("io.write", bytes=len(data)):
+        if hasattr(file_path, 'write'):
+            file_path.write(data)
+        else:
+            with open(file_path, 'wb') as f:
+                f.write(data)
+
+
+@profiling.instrument("etc2_rgba8.write")
+def write_etc2_rgba8(file_path, width, height, image: Image.Image, workers=1, mips=False, mip_filter="box"):
+    """
+    将 RGBA 图像编码为 ETC2 RGBA8 数据（每个块为 EAC alpha 块加 ETC2 RGB 块，共 16 字节），
+    然后将其写入指定文件
+
+    参数：
+        file_path (str)：输出文件的路径，或已打开的二进制文件对象。
+        width (int)：图像的宽度。
+        height (int)：图像的高度。
+        image (Image.Image)：RGBA 格式的 Pillow 图像对象。
+        workers (int)：编码使用的进程数，1 为串行，None 表示使用全部 CPU 核心。
+        mips (bool)：为 True 时生成完整的 mipmap 链并写成 mipmap 容器（见 mipmap.py），用 read_etc2_mips 读取。
+        mip_filter (str)：mipmap 的缩小滤波器，"box" 或 "lanczos"。
+    """
+    _encode_etc2(file_path, width, height, image, workers, ETC2.gen_etc2_rgba8_blocks, "etc2_rgba8",
+                 mips, mip_filter)
+
+
+@profiling.instrument("etc2_rgb8.write")
+def write_etc2_rgb8(file_path, width, height, image: Image.Image, workers=1, mips=False, mip_filter="box"):
+    """
+    将图像编码为 ETC2 RGB8 数据（每个块 8 字节），alpha 只用于忽略透明像素的颜色误差，
+    然后将其写入指定文件
+
+    参数：
+        file_path (str)：输出文件的路径，或已打开的二进制文件对象。
+        width (int)：图像的宽度。
+        height (int)：图像的高度。
+        image (Image.Image)：Pillow 图像对象。
+        workers (int)：编码使用的进程数，1 为串行，None 表示使用全部 CPU 核心。
+        mips (bool)：为 True 时生成完整的 mipmap 链并写成 mipmap 容器（见 mipmap.py），用 read_etc2_mips 读取。
+        mip_filter (str)：mipmap 的缩小滤波器，"box" 或 "lanczos"。
+    """
+    _encode_etc2(file_path, width, height, image, workers, ETC2.gen_etc2_blocks, "etc2_rgb8",
+                 mips, mip_filter)
+
+
+# 使用示例（在仓库根目录运行）：
+#   编码：python -m RGBAd32x8888eB.ETC2_RGBA8 input.png output.ptx --workers 8
+#   解码：python -m RGBAd32x8888eB.ETC2_RGBA8 input.PTX output.png --width 1024 --height 2048
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="ETC2 RGBA8 / RGB8 PTX 与 PNG 互转")
+    parser.add_argument("input", help="输入文件，.png 为编码，其余按 PTX 解码")
+    parser.add_argument("output", help="输出文件")
+    parser.add_argument("--width", type=int, help="解码时的图像宽度")
+    parser.add_argument("--height", type=int, help="解码时的图像高度")
+    parser.add_argument("--rgb", action="store_true", help="使用不带 alpha 的 ETC2 RGB8")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="编码使用的进程数，0 表示使用全部 CPU 核心")
+    args = parser.parse_args()
+
+    if args.input.lower().endswith(".png"):
+        image = Image.open(args.input).convert("RGBA")
+        writer = write_etc2_rgb8 if args.rgb else write_etc2_rgba8
+        writer(args.output, image.width, image.height, image, workers=args.workers or None)
+        print(f"Compression complete. Output saved to: {args.output}")
+    else:
+        if args.width is None or args.height is None:
+            parser.error("解码 PTX 需要 --width 和 --height")
+        reader = read_etc2_rgb8 if args.rgb else read_etc2_rgba8
+        reader(args.input, args.width, args.height).save(args.output)
+        print(f"PTX 转换完成，保存为：{args.output}")
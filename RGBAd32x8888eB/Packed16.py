@@ -0,0 +1,257 @@
+"""
+16 位打包格式: RGB565、RGBA4444 与 RGBA5551, 每种都有小端 (_le) 与大端 (_be) 两种字节序.
+
+每个像素是一个 16 位整数, 通道从高位到低位依次为 R, G, B, (A), 与 GL 的 GL_UNSIGNED_SHORT_5_6_5 /
+GL_UNSIGNED_SHORT_4_4_4_4 / GL_UNSIGNED_SHORT_5_5_5_1 相同; 小端即 GL 在小端设备上直接上传的内存布局.
+RGB565 不存储 alpha, 解码为不透明.
+
+编解码都是对整张数组的 NumPy 位运算. 解码时 n 位的值 v 按查找表扩展为 round(v * 255 / (2^n - 1)),
+编码时不抖动则取最接近的量化值, 二者互为逆运算. 编码可选抖动以避免渐变上的色带:
+    ordered     8x8 Bayer 有序抖动, 逐像素独立, 结果与图像位置有关但不随内容扩散
+    diffusion   Floyd-Steinberg 误差扩散. 沿 x + 2y 相同的斜线推进, 同一条斜线上的像素互不依赖,
+                每条斜线一次向量化处理, 结果与逐像素的串行实现相同
+只有 1 位的通道 (RGBA5551 的 alpha) 不抖动, 按 128 为阈值取舍, 避免透明边缘出现噪点.
+
+与 ARGB8888 的接口相同, 只是这里是实例: RGB565_LE.read(path, w, h)、RGB565_LE.write(image, path) 等.
+"""
+import functools
+import os
+
+import numpy as np
+from PIL import Image
+
+import mipmap
+import profiling
+
+DITHER_MODES = ("none", "ordered", "diffusion")
+
+# 8x8 Bayer 矩阵, 阈值为 (值 + 0.5) / 64
+_BAYER8 = np.array([
+    [0, 32, 8, 40, 2, 34, 10, 42],
+    [48, 16, 56, 24, 50, 18, 58, 26],
+    [12, 44, 4, 36, 14, 46, 6, 38],
+    [60, 28, 52, 20, 62, 30, 54, 22],
+    [3, 35, 11, 43, 1, 33, 9, 41],
+    [51, 19, 59, 27, 49, 17, 57, 25],
+    [15, 47, 7, 39, 13, 45, 5, 37],
+    [63, 31, 55, 23, 61, 29, 53, 21],
+], dtype=np.float32)
+_BAYER8_THRESHOLD = (_BAYER8 + 0.5) / 64
+
+
+def _diffuse(values, levels):
+    """
+    对 (H, W, C) 的 float32 值 (0..255) 做 Floyd-Steinberg 误差扩散, levels 为各通道的最大量化值,
+    返回 (H, W, C) 的量化值.
+
+    像素 (x, y) 只依赖 (x-1, y)、(x+1, y-1)、(x, y-1)、(x-1, y-1) 处已扩散的误差, 它们所在斜线的
+    t = x + 2y 都更小, 所以按 t 递增逐条处理斜线即可. 同一条斜线上两个像素的某些邻居会重合,
+    每个扩散方向分开累加, 单次赋值内的下标互不相同.
+    """
+    height, width, channels = values.shape
+    levels = np.asarray(levels, dtype=np.float32)
+    scale = levels / 255
+    # 左右各补一列、下方补一行, 扩散到图像外的误差落在补出的格子里被丢弃
+    work = np.zeros((height + 1, width + 2, channels), dtype=np.float32)
+    work[:height, 1:width + 1] = values
+    quantized = np.empty((height, width, channels), dtype=np.uint16)
+    for t in range(width + 2 * (height - 1)):
+        ys = np.arange(max(0, (t - width + 2) // 2), min(height - 1, t // 2) + 1)
+        xs = t - 2 * ys + 1
+        old = work[ys, xs]
+        level = np.clip(np.rint(old * scale), 0, levels)
+        quantized[ys, xs - 1] = level
+        error = old - level / scale
+        work[ys, xs + 1] += error * (7 / 16)
+        work[ys + 1, xs - 1] += error * (3 / 16)
+        work[ys + 1, xs] += error * (5 / 16)
+        work[ys + 1, xs + 1] += error * (1 / 16)
+    return quantized
+
+
+class Packed16:
+    """
+    一种 16 位打包格式. bits 为 (R, G, B, A) 的位数, 按此顺序从高位排到低位; byteorder 为 "<" 或 ">".
+    """
+
+    def __init__(self, name, bits, byteorder):
+        self.name = name
+        self.bits = bits
+        self.dtype = np.dtype(byteorder + "u2")
+        self.shifts = tuple(sum(bits[i + 1:]) for i in range(4))
+        self.levels = tuple((1 << n) - 1 for n in bits)
+        # n 位的值 -> 8 位, 0 位的通道 (RGB565 的 alpha) 恒为 255
+        self.luts = tuple(np.round(np.arange(level + 1) * 255 / level).astype(np.uint8) if level
+                          else np.full(1, 255, dtype=np.uint8) for level in self.levels)
+
+    def __repr__(self):
+        return f"Packed16({self.name!r})"
+
+    def __reduce__(self):
+        # 进程池中按名字取回模块级的实例
+        return _by_name, (self.name,)
+
+    def _map(self, file_path, width, height):
+        """
+        只读映射文件中的像素数据，返回 (height, width) 的 16 位视图。
+        """
+        size = width * height * 2
+        if os.path.getsize(file_path) < size:
+            raise EOFError(f"{file_path}: expected {size} bytes of {self.name} data")
+        return np.memmap(file_path, dtype=self.dtype, mode='r', shape=(height, width))
+
+    def _unpack(self, packed):
+        packed = packed.astype(np.uint16)
+        rgba = np.empty(packed.shape + (4,), dtype=np.uint8)
+        for channel, (shift, level, lut) in enumerate(zip(self.shifts, self.levels, self.luts)):
+            rgba[..., channel] = lut[(packed >> shift) & level] if level else 255
+        return rgba
+
+    def read_array(self, file_path, width, height):
+        """
+        读取文件，返回 (height, width, 4) 的 RGBA uint8 数组，不创建 PIL 图像。
+        """
+        with profiling.stage(f"{self.name}.read_array", bytes=width * height * 2):
+            return self._unpack(self._map(file_path, width, height))
+
+    def iter_rows(self, file_path, width, height, band=64):
+        """
+        按从上到下的顺序逐个产出 (rows, width, 4) 的 RGBA uint8 行带，用于不持有整张图像的流式导出。
+        """
+        packed = self._map(file_path, width, height)
+        for y in range(0, height, band):
+            yield self._unpack(packed[y:y + band])
+
+    def read(self, file_path, width, height):
+        """
+        从二进制文件读取图像数据并返回 PIL 图像
+        """
+        with profiling.stage(f"{self.name}.read", bytes=width * height * 2):
+            return Image.fromarray(self._unpack(self._map(file_path, width, height)), "RGBA")
+
+    def _view(self, buffer, width, height):
+        view = memoryview(buffer).cast('B')
+        size = width * height * 2
+        if len(view) < size:
+            raise EOFError(f"Expected {size} bytes of {self.name} data, got {len(view)}")
+        return view[:size]
+
+    def decode_array(self, buffer, width, height):
+        """
+        从内存中的数据（bytes、bytearray、memoryview、mmap 等）解码，
+        返回 (height, width, 4) 的 RGBA uint8 数组，不经过文件系统。
+        """
+        packed = np.frombuffer(self._view(buffer, width, height), dtype=self.dtype).reshape(height, width)
+        return self._unpack(packed)
+
+    def decode(self, buffer, width, height):
+        """
+        从内存中的数据解码为 PIL 图像，不经过文件系统。
+        """
+        return Image.fromarray(self.decode_array(buffer, width, height), "RGBA")
+
+    @staticmethod
+    def _to_rgba(image):
+        """
+        把 PIL 图像或 (height, width, 4) 的 RGBA 数组统一为 uint8 数组。
+        """
+        if isinstance(image, Image.Image):
+            if image.mode != "RGBA":
+                image = image.convert("RGBA")
+            return np.asarray(image)
+        rgba = np.asarray(image, dtype=np.uint8)
+        if rgba.ndim != 3 or rgba.shape[2] != 4:
+            raise ValueError(f"Expected an (height, width, 4) RGBA array, got shape {rgba.shape}")
+        return rgba
+
+    def quantize(self, image, dither="none"):
+        """
+        返回 (height, width, 4) 的各通道量化值 (uint16)，dither 见模块说明。
+        """
+        if dither not in DITHER_MODES:
+            raise ValueError(f"Unknown dither mode {dither!r}, expected one of {DITHER_MODES}")
+        rgba = self._to_rgba(image)
+        levels = np.array(self.levels, dtype=np.uint32)
+        # 四舍五入到最接近的量化值
+        quantized = ((rgba * levels + 127) // 255).astype(np.uint16)
+        dithered = [channel for channel, n in enumerate(self.bits) if n > 1]
+        if dither == "ordered":
+            height, width = rgba.shape[:2]
+            threshold = np.tile(_BAYER8_THRESHOLD, ((height + 7) // 8, (width + 7) // 8))[:height, :width, None]
+            scale = levels[dithered].astype(np.float32) / 255
+            values = np.floor(rgba[..., dithered] * scale + threshold)
+            quantized[..., dithered] = np.minimum(values, levels[dithered])
+        elif dither == "diffusion":
+            quantized[..., dithered] = _diffuse(rgba[..., dithered].astype(np.float32), levels[dithered])
+        return quantized
+
+    def encode(self, image, dither="none"):
+        """
+        把 PIL 图像或 (height, width, 4) 的 RGBA 数组编码为字节，不经过文件系统。
+        """
+        with profiling.stage(f"{self.name}.encode") as stage:
+            quantized = self.quantize(image, dither)
+            packed = np.zeros(quantized.shape[:2], dtype=np.uint16)
+            for channel, (shift, n) in enumerate(zip(self.shifts, self.bits)):
+                if n:
+                    packed |= quantized[..., channel] << shift
+            data = packed.astype(self.dtype).tobytes()
+            stage.add(bytes=len(data))
+        return data
+
+    def read_mips(self, file_path, levels=None):
+        """
+        读取 write(..., mips=True) 写出的 mipmap 容器，层尺寸来自文件头，返回各层的 PIL 图像列表。
+        levels 为要解码的层号，默认全部。
+        """
+        fmt, _ = mipmap.read_mip_header(file_path)
+        if fmt != self.name:
+            raise ValueError(f"{file_path}: mipmap container holds {fmt!r}, not {self.name}")
+        return mipmap.read_mips(file_path, self.decode, levels)
+
+    def write(self, image, file_path, mips=False, mip_filter="box", workers=1, dither="none"):
+        """
+        将图像保存为 16 位二进制格式，返回写入的字节数。
+
+        image 可以是 PIL 图像或 (height, width, 4) 的 RGBA uint8 数组。
+        file_path 可以是文件路径、已打开的二进制文件对象（写入当前位置），
+        或长度不小于 width * height * 2 的可写缓冲区（bytearray、memoryview、numpy 数组等）。
+        dither 为 "none"、"ordered" 或 "diffusion"，见模块说明。
+
+        mips=True 时生成完整的 mipmap 链（mip_filter 为 "box" 或 "lanczos"），
+        由 workers 个进程并行编码各层，写成带层表的 mipmap 容器（见 mipmap.py），此时 file_path 须为路径或文件对象。
+        """
+        rgba = self._to_rgba(image)
+        if mips:
+            encode = functools.partial(self.encode, dither=dither)
+            levels = mipmap.write_mips(file_path, self.name, rgba, encode, workers, mip_filter)
+            return levels[-1].offset + levels[-1].size
+        data = self.encode(rgba, dither)
+        size = len(data)
+
+        with profiling.stage("io.write", bytes=size):
+            if hasattr(file_path, 'write'):
+                file_path.write(data)
+            elif isinstance(file_path, (str, bytes, os.PathLike)):
+                with open(file_path, 'wb') as f:
+                    f.write(data)
+            else:
+                out = np.frombuffer(file_path, dtype=np.uint8, count=size)
+                out[:] = np.frombuffer(data, dtype=np.uint8)
+        return size
+
+
+RGB565_LE = Packed16("rgb565_le", (5, 6, 5, 0), "<")
+RGB565_BE = Packed16("rgb565_be", (5, 6, 5, 0), ">")
+RGBA4444_LE = Packed16("rgba4444_le", (4, 4, 4, 4), "<")
+RGBA4444_BE = Packed16("rgba4444_be", (4, 4, 4, 4), ">")
+RGBA5551_LE = Packed16("rgba5551_le", (5, 5, 5, 1), "<")
+RGBA5551_BE = Packed16("rgba5551_be", (5, 5, 5, 1), ">")
+
+# 格式名 (与 mobiletexture --format 相同) -> Packed16
+PACKED16_FORMATS = {fmt.name: fmt for fmt in (RGB565_LE, RGB565_BE, RGBA4444_LE, RGBA4444_BE, RGBA5551_LE,
+                                              RGBA5551_BE)}
+
+
+def _by_name(name):
+    return PACKED16_FORMATS[name]
@@ -0,0 +1,211 @@
+"""
+按误差预算为每张纹理自动选择格式.
+
+对图像做一次快速试编码 (ETC1.gen_etc1_blocks, quality="fast"), 用向量化的指标估计各候选格式的 PSNR 与最大误差,
+再按每像素字节数从小到大取第一个满足阈值的格式:
+
+    etc2_rgb8       0.5 字节    不存储 alpha, 只在 alpha 恒定时可选
+    etc1_rgb        0.5 字节    不存储 alpha, 只在 alpha 恒定时可选; 标准 ETC1 数据, GLES2 设备可用
+    etc1_rgb_etc1a  1 字节      alpha 以 ETC1 灰度块存储
+    etc2_rgba8      1 字节      alpha 以 EAC 块存储
+    etc1_rgb_a8     1.5 字节    alpha 为原始 A8, 无损
+    rgb565_le       2 字节      不存储 alpha, 只在 alpha 恒定时可选
+    rgba5551_le     2 字节      alpha 只有 1 位
+    rgba4444_le     2 字节
+    argb8888        4 字节      无损, 总是满足阈值
+
+不存储 alpha 的格式解码为不透明. alpha 恒为 255 以外的值时, 选中这些格式的 Selection 在 alpha_value 中记录该值,
+报告中同样写出, 解码时据此恢复 alpha; 因此它们的 alpha 按无损计算.
+
+16 位格式直接按不抖动的量化结果计算, 没有估计成分; 字节序不影响误差, 候选只列出小端.
+五种 ETC 格式的 RGB 误差都取 ETC1 快速模式的试编码结果: ETC2 编码器在 ETC1 高质量候选之外还会尝试 T / H / 平面模式,
+正式编码的误差通常只会更小, 所以这是一个偏保守的估计. alpha 各自试编码; A8 与 8888 的 alpha 无损.
+透明像素 (原图 alpha 为 0) 的 RGB 不计入误差, 与编码器的误差权重一致.
+
+select_format 返回的 Selection 带有全部候选的指标, to_report() 可直接写成 JSON 报告.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from etc1 import ETC1
+from etc2 import ETC2
+from RGBAd32x8888eB.Packed16 import PACKED16_FORMATS
+
+# 候选格式按每像素字节数排列; 同样大小时先列出的优先
+AUTO_FORMATS = ("etc2_rgb8", "etc1_rgb", "etc1_rgb_etc1a", "etc2_rgba8", "etc1_rgb_a8", "rgb565_le", "rgba5551_le",
+                "rgba4444_le", "argb8888", "abgr8888")
+LOSSLESS_FORMATS = ("argb8888", "abgr8888")
+# 格式 -> alpha 的存储方式; None 表示不存储 alpha
+ALPHA_STORAGE = {"etc2_rgb8": None, "etc1_rgb": None, "etc1_rgb_etc1a": "etc1", "etc2_rgba8": "eac",
+                 "etc1_rgb_a8": "a8"}
+# 不存储 alpha 的格式, 只在 alpha 恒定时可选
+NO_ALPHA_FORMATS = ("etc2_rgb8", "etc1_rgb", "rgb565_le")
+
+# 单个候选的指标; size 为字节数, psnr 为 RGBA 合计的 PSNR (dB, 无误差时为 inf), max_error 为单个通道的最大绝对误差
+Candidate = namedtuple("Candidate", ["format", "size", "psnr", "max_error", "alpha_psnr", "alpha_max_error",
+                                     "accepted"])
+
+
+class Selection(namedtuple("Selection", ["format", "width", "height", "alpha", "min_psnr", "max_error",
+                                         "candidates", "alpha_value"])):
+    """
+    select_format 的结果. alpha 为 "opaque" (恒为 255)、"constant" (恒为其他值) 或 "varying".
+    alpha_value 为所选格式不存储 alpha 而原图 alpha 恒为其他值时的该值, 解码后需要恢复; 其余情况为 None.
+    """
+    __slots__ = ()
+
+    @property
+    def chosen(self):
+        return next(candidate for candidate in self.candidates if candidate.format == self.format)
+
+    def to_report(self):
+        """
+        返回可写成 JSON 的字典; inf 记为 None.
+        """
+        def number(value):
+            return None if value is None or np.isinf(value) else round(float(value), 3)
+
+        return {
+            "format": self.format,
+            "width": self.width,
+            "height": self.height,
+            "size": self.chosen.size,
+            "alpha": self.alpha,
+            "alpha_value": self.alpha_value,
+            "min_psnr": self.min_psnr,
+            "max_error": self.max_error,
+            "candidates": [{"format": c.format, "size": c.size, "psnr": number(c.psnr), "max_error": c.max_error,
+                            "alpha_psnr": number(c.alpha_psnr), "alpha_max_error": c.alpha_max_error,
+                            "accepted": c.accepted}
+                           for c in self.candidates],
+        }
+
+
+def _psnr(squared_error, count):
+    if count == 0 or squared_error == 0:
+        return float("inf")
+    return float(10 * np.log10(255.0 ** 2 * count / squared_error))
+
+
+def measure(rgba, rgb, alpha):
+    """
+    比较原图与重建结果, 返回 (psnr, max_error, alpha_psnr, alpha_max_error).
+    rgba 为原图 (H, W, 4); rgb 为重建的 (H, W, 3); alpha 为重建的 (H, W), None 表示 alpha 无损.
+    原图 alpha 为 0 的像素不计 RGB 误差.
+    """
+    visible = rgba[..., 3] != 0
+    rgb_error = np.abs(rgb.astype(np.int16) - rgba[..., :3])[visible]
+    rgb_squared = float(np.square(rgb_error, dtype=np.int64).sum())
+    rgb_max = int(rgb_error.max()) if rgb_error.size else 0
+    if alpha is None:
+        alpha_squared, alpha_max = 0.0, 0
+    else:
+        alpha_error = np.abs(alpha.astype(np.int16) - rgba[..., 3])
+        alpha_squared = float(np.square(alpha_error, dtype=np.int64).sum())
+        alpha_max = int(alpha_error.max())
+    psnr = _psnr(rgb_squared + alpha_squared, rgb_error.size + rgba[..., 3].size)
+    return psnr, max(rgb_max, alpha_max), _psnr(alpha_squared, rgba[..., 3].size), alpha_max
+
+
+def alpha_kind(rgba):
+    """
+    返回 "opaque"、"constant" 或 "varying".
+    """
+    alpha = rgba[..., 3]
+    first = alpha.flat[0]
+    if not (alpha == first).all():
+        return "varying"
+    return "opaque" if first == 255 else "constant"
+
+
+def _trial_etc1_rgb(rgba):
+    height, width = rgba.shape[:2]
+    return ETC1.decode_etc1_blocks(ETC1.gen_portable_etc1_blocks(ETC1.image_to_blocks(rgba)), width, height)
+
+
+def _trial_alpha(rgba, storage):
+    height, width = rgba.shape[:2]
+    if storage == "etc1":
+        # 与 encode_etc1_rgb_a8 相同: alpha 作为不透明的灰度图编码
+        gray = np.empty(rgba.shape, dtype=np.uint8)
+        gray[..., :3] = rgba[..., 3:]
+        gray[..., 3] = 255
+        return _trial_etc1_rgb(gray)[..., 1]
+    # EAC
+    alpha_blocks = ETC1.image_to_blocks(rgba)[..., 3]
+    decoded = ETC2._decode_eac_blocks(ETC2.gen_eac_blocks(alpha_blocks))
+    return ETC2._blocks_to_image(decoded, width, height)
+
+
+def _trial_packed16(rgba, fmt):
+    packed = PACKED16_FORMATS[fmt]
+    height, width = rgba.shape[:2]
+    decoded = packed.decode_array(packed.encode(rgba), width, height)
+    # rgb565 只在 alpha 恒定时可选, 与 etc2_rgb8 相同不计 alpha
+    return decoded[..., :3], decoded[..., 3] if packed.bits[3] else None
+
+
+def format_size(fmt, width, height):
+    """
+    返回单层纹理的字节数 (块格式按 4 对齐).
+    """
+    blocks = ((width + 3) // 4) * ((height + 3) // 4)
+    if fmt in LOSSLESS_FORMATS:
+        return width * height * 4
+    if fmt in PACKED16_FORMATS:
+        return width * height * 2
+    if fmt == "etc1_rgb_a8":
+        return blocks * 8 + width * height
+    return blocks * (8 if fmt in ("etc2_rgb8", "etc1_rgb") else 16)
+
+
+def select_format(image, min_psnr=35.0, max_error=None, formats=AUTO_FORMATS):
+    """
+    为图像选择满足误差阈值的最小格式, 返回 Selection.
+
+    参数：
+        image：Pillow 图像对象，或 (height, width, 4) 的 RGBA uint8 数组。
+        min_psnr (float)：RGBA 合计 PSNR 的下限 (dB)。
+        max_error (int)：单个通道最大绝对误差的上限，None 表示不限制。
+        formats：允许的候选格式，例如面向 GLES2 设备时去掉 ETC2 格式。无损格式总是满足阈值，
+            候选中没有无损格式且都不满足时选择 PSNR 最高的格式。
+    """
+    if hasattr(image, "mode"):
+        image = image if image.mode == "RGBA" else image.convert("RGBA")
+    rgba = np.asarray(image, dtype=np.uint8)
+    if rgba.ndim != 3 or rgba.shape[2] != 4:
+        raise ValueError(f"Expected an (height, width, 4) RGBA array, got shape {rgba.shape}")
+    unknown = set(formats) - set(AUTO_FORMATS)
+    if unknown:
+        raise ValueError(f"Unknown formats {sorted(unknown)}, expected a subset of {AUTO_FORMATS}")
+    height, width = rgba.shape[:2]
+    alpha = alpha_kind(rgba)
+
+    formats = [fmt for fmt in AUTO_FORMATS if fmt in formats and (fmt not in NO_ALPHA_FORMATS or alpha != "varying")]
+    if not formats:
+        raise ValueError("No candidate format applies to this image")
+    rgb = None
+    candidates = []
+    for fmt in formats:
+        if fmt in LOSSLESS_FORMATS:
+            metrics = (float("inf"), 0, float("inf"), 0)
+        elif fmt in PACKED16_FORMATS:
+            metrics = measure(rgba, *_trial_packed16(rgba, fmt))
+        else:
+            if rgb is None:
+                rgb = _trial_etc1_rgb(rgba)
+            storage = ALPHA_STORAGE[fmt]
+            # 不存储 alpha 的格式只在 alpha 恒定时可选, alpha 由解码 (或 alpha_value) 原样恢复
+            trial_alpha = _trial_alpha(rgba, storage) if storage in ("etc1", "eac") else None
+            metrics = measure(rgba, rgb, trial_alpha)
+        accepted = metrics[0] >= min_psnr and (max_error is None or metrics[1] <= max_error)
+        candidates.append(Candidate(fmt, format_size(fmt, width, height), *metrics, accepted))
+
+    accepted = [c for c in candidates if c.accepted]
+    if accepted:
+        chosen = min(accepted, key=lambda c: c.size)
+    else:
+        chosen = max(candidates, key=lambda c: c.psnr)
+    alpha_value = int(rgba[0, 0, 3]) if alpha == "constant" and chosen.format in NO_ALPHA_FORMATS else None
+    return Selection(chosen.format, width, height, alpha, min_psnr, max_error, candidates, alpha_value)
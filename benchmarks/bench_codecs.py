@@ -0,0 +1,310 @@
+"""
+各编解码路径的吞吐量、峰值内存与 PSNR 基准, 可与上一次的 JSON 结果比较以发现性能回退.
+
+在仓库根目录运行:
+    python -m benchmarks.bench_codecs --output results.json
+    python -m benchmarks.bench_codecs --baseline results.json --threshold 0.1
+
+输入为合成纹理 (渐变 + 噪声 + 硬边 + alpha 渐变与全透明区域) 与 example 中的真实纹理 (缩放到目标尺寸),
+默认尺寸 256x256, 1024x1024, 2048x4096. 每个用例在独立的子进程中运行, 峰值 RSS 只反映该用例;
+计时取 --repeat 次中最快的一次. 标量接口 gen_etc1 / decode_etc1 只处理前 --scalar-blocks 个块.
+PSNR 按 alpha > 0 的像素的 RGB 计算 (ETC1_RGB_A8 的 alpha 为无损), null 表示输出与输入完全相同.
+16 位格式 (RGB565 等) 另有带抖动的写入用例.
+给出 --baseline 时, 任一用例的 MP/s 比基线低超过 --threshold 即以退出码 1 结束.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+from PIL import Image
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块, 不报告峰值内存
+    resource = None
+
+from etc1 import ETC1
+from RGBAd32x8888eB.ABGR8888 import ABGR8888
+from RGBAd32x8888eB.ARGB8888 import ARGB8888
+from RGBAd32x8888eB.ETC1_RGB_A8 import read_etc1_rgb_a8, write_etc1_rgb_a8
+from RGBAd32x8888eB.Packed16 import RGB565_LE, RGBA4444_BE, RGBA4444_LE
+
+DEFAULT_SIZES = ["256x256", "1024x1024", "2048x4096"]
+DEFAULT_IMAGE = os.path.join("example", "UI_SEEDPACKETS.png")
+
+
+def synthetic_texture(width, height, seed=0):
+    """
+    生成可复现的 RGBA 测试纹理: 平滑渐变上叠加噪声与几何硬边, alpha 从左到右渐变, 右下角全透明.
+    """
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    u, v = x / max(width - 1, 1), y / max(height - 1, 1)
+    rgba = np.empty((height, width, 4), dtype=np.float32)
+    rgba[..., 0] = 255 * u
+    rgba[..., 1] = 255 * v
+    rgba[..., 2] = 127.5 + 127.5 * np.sin(12 * math.pi * u * v)
+    rgba[..., :3] += rng.normal(0, 6, (height, width, 3))
+
+    # 棋盘格与圆形提供 ETC1 难以表示的硬边
+    checker = ((x // 32 + y // 32) % 2 == 0) & (v < 0.5)
+    rgba[checker, :3] = rgba[checker, :3] * 0.3 + 40
+    circle = (u - 0.7) ** 2 + (v - 0.3) ** 2 < 0.02
+    rgba[circle, :3] = (230, 40, 60)
+
+    rgba[..., 3] = 255 * np.clip(u * 1.5, 0, 1)
+    rgba[(u > 0.8) & (v > 0.8), 3] = 0
+    return np.clip(rgba, 0, 255).astype(np.uint8)
+
+
+def load_source(source, width, height, image_path):
+    if source == "synthetic":
+        return synthetic_texture(width, height)
+    image = Image.open(image_path).convert("RGBA")
+    if image.size != (width, height):
+        image = image.resize((width, height), Image.LANCZOS)
+    return np.asarray(image)
+
+
+def psnr(original, decoded, alpha=None):
+    """
+    original 与 decoded 的 PSNR; 给出 alpha 时只统计 alpha > 0 的像素, 全透明像素的颜色不可见.
+    """
+    error = (original.astype(np.float64) - decoded.astype(np.float64)) ** 2
+    if alpha is not None:
+        error = error[alpha > 0]
+    if error.size == 0:
+        return None
+    error = error.mean()
+    return None if error == 0 else round(10 * math.log10(255 ** 2 / error), 3)
+
+
+def _best_of(repeat, function):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _scalar_blocks(rgba, count):
+    blocks = ETC1.image_to_blocks(rgba)[:count]
+    return [block.reshape(16, 4) for block in blocks]
+
+
+def _case_gen_etc1(rgba, repeat, tmp, options):
+    blocks = _scalar_blocks(rgba, options["scalar_blocks"])
+    seconds, encoded = _best_of(repeat, lambda: [ETC1.gen_etc1(block) for block in blocks])
+    decoded = np.array([ETC1.decode_etc1_rgb(data) for data in encoded], dtype=np.uint8)
+    pixels = np.stack(blocks)
+    return seconds, len(blocks) * 16, psnr(pixels[..., :3], decoded, pixels[..., 3])
+
+
+def _case_decode_etc1(rgba, repeat, tmp, options):
+    blocks = _scalar_blocks(rgba, options["scalar_blocks"])
+    encoded = [int(data) for data in ETC1.gen_etc1_blocks(np.stack(blocks))]
+    seconds, _ = _best_of(repeat, lambda: [ETC1.decode_etc1(data) for data in encoded])
+    return seconds, len(blocks) * 16, None
+
+
+def _case_gen_etc1_blocks(rgba, repeat, tmp, options):
+    blocks = ETC1.image_to_blocks(rgba)
+    seconds, encoded = _best_of(repeat, lambda: ETC1.gen_etc1_blocks(blocks, quality=options["quality"]))
+    decoded = ETC1.decode_etc1_blocks(encoded.astype('>u8').tobytes(), rgba.shape[1], rgba.shape[0])
+    return seconds, rgba.shape[0] * rgba.shape[1], psnr(rgba[..., :3], decoded, rgba[..., 3])
+
+
+def _case_decode_etc1_blocks(rgba, repeat, tmp, options):
+    height, width = rgba.shape[:2]
+    data = ETC1.gen_etc1_blocks(ETC1.image_to_blocks(rgba)).astype('>u8').tobytes()
+    seconds, _ = _best_of(repeat, lambda: ETC1.decode_etc1_blocks(data, width, height))
+    return seconds, width * height, None
+
+
+def _case_write_etc1_rgb_a8(rgba, repeat, tmp, options):
+    height, width = rgba.shape[:2]
+    image = Image.fromarray(rgba)
+    path = os.path.join(tmp, "etc1_rgb_a8.ptx")
+    seconds, _ = _best_of(repeat, lambda: write_etc1_rgb_a8(path, width, height, image,
+                                                            workers=options["workers"],
+                                                            quality=options["quality"]))
+    decoded = np.asarray(read_etc1_rgb_a8(path, width, height))
+    return seconds, width * height, psnr(rgba[..., :3], decoded[..., :3], rgba[..., 3])
+
+
+def _case_read_etc1_rgb_a8(rgba, repeat, tmp, options):
+    height, width = rgba.shape[:2]
+    path = os.path.join(tmp, "etc1_rgb_a8.ptx")
+    write_etc1_rgb_a8(path, width, height, Image.fromarray(rgba))
+    seconds, _ = _best_of(repeat, lambda: read_etc1_rgb_a8(path, width, height))
+    return seconds, width * height, None
+
+
+def _write_raw(codec, **write_options):
+    def case(rgba, repeat, tmp, options):
+        height, width = rgba.shape[:2]
+        image = Image.fromarray(rgba)
+        path = os.path.join(tmp, "texture.ptx")
+        seconds, _ = _best_of(repeat, lambda: codec.write(image, path, **write_options))
+        decoded = np.asarray(codec.read(path, width, height))
+        return seconds, width * height, psnr(rgba[..., :3], decoded[..., :3], rgba[..., 3])
+    return case
+
+
+def _read_raw(codec):
+    def case(rgba, repeat, tmp, options):
+        height, width = rgba.shape[:2]
+        path = os.path.join(tmp, "texture.ptx")
+        codec.write(Image.fromarray(rgba), path)
+        seconds, _ = _best_of(repeat, lambda: codec.read(path, width, height))
+        return seconds, width * height, None
+    return case
+
+
+CASES = {
+    "gen_etc1": _case_gen_etc1,
+    "decode_etc1": _case_decode_etc1,
+    "gen_etc1_blocks": _case_gen_etc1_blocks,
+    "decode_etc1_blocks": _case_decode_etc1_blocks,
+    "write_etc1_rgb_a8": _case_write_etc1_rgb_a8,
+    "read_etc1_rgb_a8": _case_read_etc1_rgb_a8,
+    "write_argb8888": _write_raw(ARGB8888),
+    "read_argb8888": _read_raw(ARGB8888),
+    "write_abgr8888": _write_raw(ABGR8888),
+    "read_abgr8888": _read_raw(ABGR8888),
+    "write_rgb565_le": _write_raw(RGB565_LE),
+    "write_rgb565_le_ordered": _write_raw(RGB565_LE, dither="ordered"),
+    "write_rgba4444_le_diffusion": _write_raw(RGBA4444_LE, dither="diffusion"),
+    "read_rgb565_le": _read_raw(RGB565_LE),
+    "read_rgba4444_be": _read_raw(RGBA4444_BE),
+}
+
+
+def _peak_rss_mib():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KiB 计, macOS 以字节计
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def run_case(case, source, width, height, image_path, repeat, options):
+    """
+    在当前进程中运行一个用例, 返回结果字典. 由 main 放进独立的子进程调用.
+    """
+    rgba = load_source(source, width, height, image_path)
+    with tempfile.TemporaryDirectory() as tmp:
+        seconds, pixels, quality = CASES[case](rgba, repeat, tmp, options)
+    return {
+        "case": case,
+        "source": source,
+        "size": f"{width}x{height}",
+        "seconds": round(seconds, 6),
+        "megapixels": pixels / 1e6,
+        "mp_per_s": round(pixels / seconds / 1e6, 4),
+        "peak_rss_mib": _peak_rss_mib(),
+        "psnr": quality,
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _result_key(result):
+    return result["case"], result["source"], result["size"]
+
+
+def compare(results, baseline, threshold):
+    """
+    打印与基线的比较, 返回 MP/s 下降超过 threshold 的用例.
+    """
+    previous = {_result_key(result): result for result in baseline["results"]}
+    regressions = []
+    print(f"\ncompared with {baseline.get('revision') or 'baseline'} (threshold {threshold:.0%}):")
+    for result in results:
+        old = previous.get(_result_key(result))
+        if old is None:
+            continue
+        change = result["mp_per_s"] / old["mp_per_s"] - 1
+        regressed = change < -threshold
+        if regressed:
+            regressions.append(result)
+        print(f"{result['case']:>20} {result['source']:>9} {result['size']:>10} "
+              f"{old['mp_per_s']:>9.3f} -> {result['mp_per_s']:>9.3f} MP/s {change:>+8.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--sources", nargs="+", choices=["synthetic", "real"], default=["synthetic", "real"])
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="WIDTHxHEIGHT")
+    parser.add_argument("--image", default=DEFAULT_IMAGE, help="真实纹理的来源图像")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scalar-blocks", type=int, default=256, help="标量接口用例处理的块数")
+    parser.add_argument("--quality", choices=["fast", "high"], default="fast")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="write_etc1_rgb_a8 的进程数")
+    parser.add_argument("--output", help="将结果写入 JSON 文件")
+    parser.add_argument("--baseline", help="用于比较的上一次 JSON 结果")
+    parser.add_argument("--threshold", type=float, default=0.1, help="允许的 MP/s 下降比例")
+    args = parser.parse_args()
+
+    options = {"scalar_blocks": args.scalar_blocks, "quality": args.quality, "workers": args.workers}
+    sizes = [tuple(int(value) for value in size.lower().split("x")) for size in args.sizes]
+
+    results = []
+    print(f"{'case':>20} {'source':>9} {'size':>10} {'seconds':>9} {'MP/s':>9} {'RSS MiB':>8} {'PSNR':>7}")
+    for case in args.cases:
+        for source in args.sources:
+            for width, height in sizes:
+                # 每个用例一个新进程, ru_maxrss 才不会被之前的用例抬高
+                with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+                    result = executor.submit(run_case, case, source, width, height, args.image,
+                                             args.repeat, options).result()
+                results.append(result)
+                rss = "-" if result["peak_rss_mib"] is None else f"{result['peak_rss_mib']:.1f}"
+                quality = "-" if result["psnr"] is None else f"{result['psnr']:.2f}"
+                print(f"{case:>20} {source:>9} {result['size']:>10} {result['seconds']:>9.4f} "
+                      f"{result['mp_per_s']:>9.3f} {rss:>8} {quality:>7}")
+
+    report = {
+        "revision": _git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "cpu_count": os.cpu_count(),
+        "options": options,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} path(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
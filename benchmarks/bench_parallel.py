@@ -0,0 +1,64 @@
+"""
+ETC1_RGB_A8 并行编码吞吐量随进程数的变化.
+
+在仓库根目录运行:
+    python -m benchmarks.bench_parallel [--image example/UI_SEEDPACKETS.png] [--workers 1 2 4 8]
+
+每个进程数重复编码同一张图像, 输出 MP/s 与相对串行的加速比, 并校验输出与串行结果逐字节相同.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from PIL import Image
+
+from RGBAd32x8888eB.ETC1_RGB_A8 import write_etc1_rgb_a8
+
+
+def _default_worker_counts():
+    counts = []
+    n = 1
+    while n < (os.cpu_count() or 1):
+        counts.append(n)
+        n *= 2
+    counts.append(os.cpu_count() or 1)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--image", default=os.path.join("example", "UI_SEEDPACKETS.png"))
+    parser.add_argument("--workers", type=int, nargs="+", default=_default_worker_counts())
+    parser.add_argument("--repeat", type=int, default=3, help="每个进程数取最快的一次")
+    args = parser.parse_args()
+
+    image = Image.open(args.image).convert("RGBA")
+    width, height = image.size
+    megapixels = width * height / 1e6
+    print(f"{args.image}: {width}x{height}, {os.cpu_count()} CPU(s)")
+    print(f"{'workers':>8} {'seconds':>9} {'MP/s':>8} {'speedup':>8}  identical")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        reference_path = os.path.join(tmp, "serial.ptx")
+        write_etc1_rgb_a8(reference_path, width, height, image, workers=1)
+        with open(reference_path, 'rb') as f:
+            reference = f.read()
+
+        serial_time = None
+        for workers in args.workers:
+            output_path = os.path.join(tmp, f"workers_{workers}.ptx")
+            best = float('inf')
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                write_etc1_rgb_a8(output_path, width, height, image, workers=workers)
+                best = min(best, time.perf_counter() - start)
+            if serial_time is None:
+                serial_time = best
+            with open(output_path, 'rb') as f:
+                identical = f.read() == reference
+            print(f"{workers:>8} {best:>9.3f} {megapixels / best:>8.2f} {serial_time / best:>8.2f}  {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+校验 ETC1 快速模式各后端 (python / numpy / numba) 的输出逐位相同, 并比较吞吐量.
+
+在仓库根目录运行:
+    python -m benchmarks.check_backends [--image example/UI_SEEDPACKETS.png] [--blocks 4096]
+
+python 后端逐块调用 gen_etc1, 是参考实现; 其余后端对同一组块编码后与之逐块比较.
+块集合包括: 随机像素、随机像素加随机全透明、合成纹理与真实纹理中抽取的块, 以及纯色、全透明、
+两色硬边等边界情况. 每组同时比较各后端的逐块编码函数与 gen_etc1_blocks (含去重与纯色快速路径).
+没有安装 Numba 时跳过 numba 后端. 任一块不一致时打印前几个差异并以退出码 1 结束.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+import etc1_numba
+from benchmarks.bench_codecs import synthetic_texture
+from etc1 import ETC1
+
+DEFAULT_IMAGE = os.path.join("example", "UI_SEEDPACKETS.png")
+# 后端 -> 逐块编码函数
+ENCODERS = {
+    "python": ETC1._gen_python_blocks,
+    "numpy": ETC1._gen_fast_blocks,
+    "numba": ETC1._gen_numba_blocks,
+}
+
+
+def edge_blocks():
+    """
+    纯色、全透明、近乎透明、两色硬边、灰度渐变与通道饱和等边界情况.
+    """
+    blocks = np.zeros((8, 4, 4, 4), dtype=np.uint8)
+    blocks[1] = 255
+    blocks[2, ..., :3] = 255
+    blocks[3, :, :2] = (255, 0, 0, 255)
+    blocks[3, :, 2:] = (0, 0, 255, 255)
+    blocks[4, :2] = (0, 0, 0, 255)
+    blocks[4, 2:] = (255, 255, 255, 255)
+    blocks[5] = (0, 255, 0, 1)
+    blocks[6, ..., :3] = np.arange(16, dtype=np.uint8).reshape(4, 4, 1) * 17
+    blocks[6, ..., 3] = 255
+    blocks[7] = (255, 255, 0, 255)
+    blocks[7, 0, 0] = (0, 0, 255, 0)
+    return blocks
+
+
+def block_sets(image_path, count, seed=0):
+    rng = np.random.default_rng(seed)
+    noise = rng.integers(0, 256, (count, 4, 4, 4), dtype=np.uint8)
+    holes = noise.copy()
+    holes[..., 3] *= rng.integers(0, 2, (count, 4, 4), dtype=np.uint8)
+    synthetic = ETC1.image_to_blocks(synthetic_texture(256, 256, seed))
+    real = ETC1.image_to_blocks(np.asarray(Image.open(image_path).convert("RGBA")))
+    return {
+        "noise": noise,
+        "noise+transparent": holes,
+        "synthetic": synthetic[rng.choice(synthetic.shape[0], min(count, synthetic.shape[0]), replace=False)],
+        "real": real[rng.choice(real.shape[0], min(count, real.shape[0]), replace=False)],
+        "edge cases": edge_blocks(),
+    }
+
+
+def _report_mismatch(name, backend, reference, result, blocks):
+    mismatch = np.flatnonzero(reference != result)
+    print(f"  {name}: {backend} differs from python in {mismatch.size} of {reference.size} blocks")
+    for index in mismatch[:3]:
+        print(f"    block {index}: python {int(reference[index]):016x} {backend} {int(result[index]):016x}")
+        print(f"    pixels {blocks[index].reshape(16, 4).tolist()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--image", default=DEFAULT_IMAGE)
+    parser.add_argument("--blocks", type=int, default=4096, help="每组随机与抽样的块数")
+    args = parser.parse_args()
+
+    backends = [name for name in ENCODERS if name != "numba" or etc1_numba.available()]
+    if "numba" not in backends:
+        print("Numba is not installed, skipping the numba backend")
+    if "numba" in backends:
+        # 第一次调用时编译, 不计入计时
+        ENCODERS["numba"](edge_blocks())
+
+    failed = False
+    totals = dict.fromkeys(backends, 0.0)
+    block_total = 0
+    for name, blocks in block_sets(args.image, args.blocks).items():
+        blocks = np.ascontiguousarray(blocks)
+        block_total += blocks.shape[0]
+        reference = None
+        identical = True
+        for backend in backends:
+            start = time.perf_counter()
+            result = ENCODERS[backend](blocks)
+            totals[backend] += time.perf_counter() - start
+            batched = ETC1.gen_etc1_blocks(blocks, backend=backend)
+            if reference is None:
+                reference = result
+            if not np.array_equal(result, reference):
+                _report_mismatch(name, backend, reference, result, blocks)
+                identical = False
+            if not np.array_equal(batched, reference):
+                _report_mismatch(f"{name} (gen_etc1_blocks)", backend, reference, batched, blocks)
+                identical = False
+        failed |= not identical
+        print(f"{name:<20} {blocks.shape[0]:>6} blocks  {'identical' if identical else 'MISMATCH'}")
+
+    print(f"{'backend':<8} {'seconds':>9} {'blocks/s':>12}")
+    for backend in backends:
+        print(f"{backend:<8} {totals[backend]:>9.3f} {block_total / totals[backend]:>12.0f}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
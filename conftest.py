@@ -0,0 +1 @@
+# 测试从仓库根目录导入模块 (etc1, benchmarks 等), 与 "python -m benchmarks.xxx" 的运行方式一致
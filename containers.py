@@ -0,0 +1,459 @@
+"""
+自描述的纹理容器: PKM, KTX 1.1 与 KTX 2.0, 以及无文件头 PTX 的尺寸/格式推测.
+
+容器支持的格式名:
+    etc1        ETC1 RGB (不含 A8 平面; 带 alpha 的 ETC1_RGB_A8 请用 mipmap 容器或原始 PTX)
+    etc2_rgb8   ETC2 RGB8
+    etc2_rgba8  ETC2 RGBA8 (EAC)
+    argb8888    小端 ARGB, 即内存中的 B, G, R, A
+    abgr8888    小端 ABGR, 即内存中的 R, G, B, A
+
+read_info 只解析文件头与层表, 不解码像素; read_texture 解码指定的层.
+mobiletexture 的 mipmap 容器 (见 mipmap.py) 同样可以由 read_info 识别.
+"""
+import functools
+import os
+import struct
+from collections import namedtuple
+
+import numpy as np
+from PIL import Image
+
+import mipmap
+import profiling
+from etc1 import ETC1
+from etc2 import ETC2
+from mipmap import MipLevel
+from RGBAd32x8888eB.ABGR8888 import ABGR8888
+from RGBAd32x8888eB.ARGB8888 import ARGB8888
+from RGBAd32x8888eB.ETC1_RGB_A8 import ALPHA_ETC1, ALPHA_NONE, decode_etc1_rgb_a8
+from RGBAd32x8888eB.ETC2_RGBA8 import decode_etc2_rgb8, decode_etc2_rgba8
+from RGBAd32x8888eB.Packed16 import PACKED16_FORMATS
+
+PKM_MAGIC = b"PKM "
+KTX1_IDENTIFIER = b"\xabKTX 11\xbb\r\n\x1a\n"
+KTX2_IDENTIFIER = b"\xabKTX 20\xbb\r\n\x1a\n"
+KTX1_ENDIANNESS = 0x04030201
+
+# OpenGL 枚举
+GL_UNSIGNED_BYTE = 0x1401
+GL_RGB = 0x1907
+GL_RGBA = 0x1908
+GL_RGBA8 = 0x8058
+GL_BGRA_EXT = 0x80E1
+GL_BGRA8_EXT = 0x93A1
+GL_ETC1_RGB8_OES = 0x8D64
+GL_COMPRESSED_RGB8_ETC2 = 0x9274
+GL_COMPRESSED_RGBA8_ETC2_EAC = 0x9278
+
+# Vulkan 格式
+VK_FORMAT_R8G8B8A8_UNORM = 37
+VK_FORMAT_B8G8R8A8_UNORM = 44
+VK_FORMAT_ETC2_R8G8B8_UNORM_BLOCK = 147
+VK_FORMAT_ETC2_R8G8B8A8_UNORM_BLOCK = 151
+
+# Khronos Data Format 描述符中用到的枚举
+KHR_DF_MODEL_RGBSDA = 1
+KHR_DF_MODEL_ETC2 = 161
+KHR_DF_PRIMARIES_BT709 = 1
+KHR_DF_TRANSFER_LINEAR = 1
+KHR_DF_CHANNEL_ETC2_COLOR = 2
+KHR_DF_CHANNEL_ETC2_ALPHA = 15
+KHR_DF_CHANNEL_RGBSDA_ALPHA = 15
+
+# block 为每个 4x4 块的字节数, 未压缩格式为 None (每像素 4 字节)
+# gl 为 KTX1 的 (glType, glTypeSize, glFormat, glInternalFormat, glBaseInternalFormat)
+# pkm 为 PKM 的 (版本, 数据类型), 不支持 PKM 时为 None
+# dfd 为 KTX2 描述符的 (颜色模型, 每个采样的 (位偏移, 位长, 通道))
+TextureFormat = namedtuple("TextureFormat", ["name", "block", "gl", "vk", "pkm", "dfd"])
+
+FORMATS = {
+    "etc1": TextureFormat("etc1", 8, (0, 1, 0, GL_ETC1_RGB8_OES, GL_RGB), None, (b"10", 0), None),
+    "etc2_rgb8": TextureFormat("etc2_rgb8", 8, (0, 1, 0, GL_COMPRESSED_RGB8_ETC2, GL_RGB),
+                               VK_FORMAT_ETC2_R8G8B8_UNORM_BLOCK, (b"20", 1),
+                               (KHR_DF_MODEL_ETC2, [(0, 64, KHR_DF_CHANNEL_ETC2_COLOR)])),
+    "etc2_rgba8": TextureFormat("etc2_rgba8", 16, (0, 1, 0, GL_COMPRESSED_RGBA8_ETC2_EAC, GL_RGBA),
+                                VK_FORMAT_ETC2_R8G8B8A8_UNORM_BLOCK, (b"20", 3),
+                                (KHR_DF_MODEL_ETC2, [(0, 64, KHR_DF_CHANNEL_ETC2_ALPHA),
+                                                     (64, 64, KHR_DF_CHANNEL_ETC2_COLOR)])),
+    "argb8888": TextureFormat("argb8888", None, (GL_UNSIGNED_BYTE, 1, GL_BGRA_EXT, GL_BGRA8_EXT, GL_BGRA_EXT),
+                              VK_FORMAT_B8G8R8A8_UNORM, None,
+                              (KHR_DF_MODEL_RGBSDA, [(0, 8, 2), (8, 8, 1), (16, 8, 0),
+                                                     (24, 8, KHR_DF_CHANNEL_RGBSDA_ALPHA)])),
+    "abgr8888": TextureFormat("abgr8888", None, (GL_UNSIGNED_BYTE, 1, GL_RGBA, GL_RGBA8, GL_RGBA),
+                              VK_FORMAT_R8G8B8A8_UNORM, None,
+                              (KHR_DF_MODEL_RGBSDA, [(0, 8, 0), (8, 8, 1), (16, 8, 2),
+                                                     (24, 8, KHR_DF_CHANNEL_RGBSDA_ALPHA)])),
+}
+
+# mobiletexture 格式名 (同 mipmap 容器头中的格式名) -> 从内存解码的函数 (buffer, width, height), 返回 PIL 图像
+DECODERS = {
+    "etc1_rgb_a8": decode_etc1_rgb_a8,
+    "etc1_rgb_etc1a": functools.partial(decode_etc1_rgb_a8, alpha_format=ALPHA_ETC1),
+    "etc1_rgb": functools.partial(decode_etc1_rgb_a8, alpha_format=ALPHA_NONE),
+    "etc2_rgba8": decode_etc2_rgba8,
+    "etc2_rgb8": decode_etc2_rgb8,
+    "argb8888": ARGB8888.decode,
+    "abgr8888": ABGR8888.decode,
+    **{fmt: packed.decode for fmt, packed in PACKED16_FORMATS.items()},
+}
+
+# read_info 的结果; levels 为各层的 MipLevel (offset 从文件开头算起), 第 0 层为原图
+TextureInfo = namedtuple("TextureInfo", ["container", "format", "width", "height", "levels"])
+
+
+def level_size(fmt, width, height):
+    texture_format = FORMATS[fmt]
+    if texture_format.block is None:
+        return width * height * 4
+    return ((width + 3) // 4) * ((height + 3) // 4) * texture_format.block
+
+
+# ---- 编解码 ----
+
+def _encode_etc1(rgba):
+    """编码可移植的 ETC1 块, 差分溢出的块见 ETC1.gen_portable_etc1_blocks."""
+    return ETC1.gen_portable_etc1_blocks(ETC1.image_to_blocks(rgba)).astype('>u8').tobytes()
+
+
+def _encode_level(fmt, rgba):
+    if fmt == "etc1":
+        return _encode_etc1(rgba)
+    if fmt == "etc2_rgb8":
+        return ETC2.gen_etc2_blocks(ETC1.image_to_blocks(rgba)).astype('>u8').tobytes()
+    if fmt == "etc2_rgba8":
+        return ETC2.gen_etc2_rgba8_blocks(ETC1.image_to_blocks(rgba)).astype('>u8').tobytes()
+    if fmt == "argb8888":
+        return ARGB8888.encode(rgba)
+    return ABGR8888.encode(rgba)
+
+
+def _decode_level(fmt, data, width, height):
+    if fmt == "etc1":
+        return Image.fromarray(ETC1.decode_etc1_blocks(data, width, height))
+    if fmt == "etc2_rgb8":
+        return Image.fromarray(ETC2.decode_etc2_blocks(data, width, height))
+    if fmt == "etc2_rgba8":
+        return Image.fromarray(ETC2.decode_etc2_rgba8_blocks(data, width, height))
+    if fmt == "argb8888":
+        return ARGB8888.decode(data, width, height)
+    return ABGR8888.decode(data, width, height)
+
+
+def _levels(image, mips, mip_filter):
+    if mips:
+        return mipmap.build_mip_chain(image, mip_filter)
+    if isinstance(image, Image.Image):
+        image = image.convert("RGBA") if image.mode != "RGBA" else image
+    return [np.asarray(image, dtype=np.uint8)]
+
+
+def _check_format(fmt, container):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown texture format {fmt!r}, expected one of {tuple(FORMATS)}")
+    texture_format = FORMATS[fmt]
+    if container == "pkm" and texture_format.pkm is None:
+        raise ValueError(f"PKM cannot hold {fmt}")
+    if container == "ktx2" and texture_format.vk is None:
+        raise ValueError(f"KTX2 has no Vulkan format for {fmt}, use etc2_rgb8 or KTX1")
+    return texture_format
+
+
+# ---- 写入 ----
+
+@profiling.instrument("pkm.write")
+def write_pkm(file_path, image, fmt="etc1"):
+    """
+    写入 PKM 文件 (单层). etc1 写为 PKM 1.0, etc2_rgb8 / etc2_rgba8 写为 PKM 2.0.
+    """
+    version, data_type = _check_format(fmt, "pkm").pkm
+    rgba = _levels(image, False, None)[0]
+    height, width = rgba.shape[:2]
+    header = PKM_MAGIC + version + struct.pack(">HHHHH", data_type, (width + 3) // 4 * 4, (height + 3) // 4 * 4,
+                                               width, height)
+    with open(file_path, 'wb') as f:
+        f.write(header)
+        f.write(_encode_level(fmt, rgba))
+
+
+@profiling.instrument("ktx.write")
+def write_ktx(file_path, image, fmt, mips=False, mip_filter="box"):
+    """
+    写入 KTX 1.1 文件 (小端). mips=True 时写入完整的 mipmap 链, 见 mipmap.build_mip_chain.
+    """
+    gl_type, gl_type_size, gl_format, gl_internal, gl_base = _check_format(fmt, "ktx").gl
+    levels = _levels(image, mips, mip_filter)
+    height, width = levels[0].shape[:2]
+    header = KTX1_IDENTIFIER + struct.pack("<13I", KTX1_ENDIANNESS, gl_type, gl_type_size, gl_format, gl_internal,
+                                           gl_base, width, height, 0, 0, 1, len(levels), 0)
+    with open(file_path, 'wb') as f:
+        f.write(header)
+        for level in levels:
+            data = _encode_level(fmt, level)
+            f.write(struct.pack("<I", len(data)))
+            f.write(data)
+            # mipPadding: 每层对齐到 4 字节
+            f.write(b"\x00" * (-len(data) % 4))
+
+
+def _ktx2_dfd(texture_format):
+    """
+    生成 KTX2 的 Basic Data Format Descriptor (含开头的总长度字段).
+    """
+    model, samples = texture_format.dfd
+    if texture_format.block is None:
+        dimensions, plane_bytes = 0, 4
+        upper = 255
+    else:
+        dimensions, plane_bytes = 3 | (3 << 8), texture_format.block
+        upper = 0xFFFFFFFF
+    block_size = 24 + 16 * len(samples)
+    body = struct.pack("<IIIIII", 0, 2 | (block_size << 16),
+                       model | (KHR_DF_PRIMARIES_BT709 << 8) | (KHR_DF_TRANSFER_LINEAR << 16),
+                       dimensions, plane_bytes, 0)
+    for offset, length, channel in samples:
+        body += struct.pack("<IIII", offset | ((length - 1) << 16) | (channel << 24), 0, 0, upper)
+    return struct.pack("<I", 4 + len(body)) + body
+
+
+@profiling.instrument("ktx2.write")
+def write_ktx2(file_path, image, fmt, mips=False, mip_filter="box"):
+    """
+    写入 KTX 2.0 文件 (无超压缩). 按规范, 层数据从最小的层开始存放, 每层对齐到 lcm(块字节数, 4).
+    """
+    texture_format = _check_format(fmt, "ktx2")
+    levels = _levels(image, mips, mip_filter)
+    height, width = levels[0].shape[:2]
+    data = [_encode_level(fmt, level) for level in levels]
+    dfd = _ktx2_dfd(texture_format)
+    alignment = texture_format.block or 4
+
+    dfd_offset = 80 + 24 * len(levels)
+    offset = dfd_offset + len(dfd)
+    offsets = [0] * len(levels)
+    for index in reversed(range(len(levels))):
+        offset += -offset % alignment
+        offsets[index] = offset
+        offset += len(data[index])
+
+    header = KTX2_IDENTIFIER + struct.pack("<9I", texture_format.vk, 1, width, height, 0, 0, 1, len(levels), 0)
+    header += struct.pack("<4I2Q", dfd_offset, len(dfd), 0, 0, 0, 0)
+    header += b"".join(struct.pack("<3Q", offsets[i], len(data[i]), len(data[i])) for i in range(len(levels)))
+    with open(file_path, 'wb') as f:
+        f.write(header + dfd)
+        position = len(header) + len(dfd)
+        for index in reversed(range(len(levels))):
+            f.write(b"\x00" * (offsets[index] - position))
+            f.write(data[index])
+            position = offsets[index] + len(data[index])
+
+
+# ---- 读取 ----
+
+def _read_pkm_info(f):
+    header = f.read(16)
+    if len(header) < 16:
+        raise EOFError("Truncated PKM header")
+    version = header[4:6]
+    data_type, _, _, width, height = struct.unpack(">HHHHH", header[6:16])
+    for texture_format in FORMATS.values():
+        if texture_format.pkm == (version, data_type) or (version == b"20" and data_type == 0
+                                                          and texture_format.name == "etc1"):
+            fmt = texture_format.name
+            break
+    else:
+        raise ValueError(f"Unsupported PKM version {version!r} / data type {data_type}")
+    return TextureInfo("pkm", fmt, width, height, [MipLevel(width, height, 16, level_size(fmt, width, height))])
+
+
+def _format_from(index, value):
+    for texture_format in FORMATS.values():
+        key = texture_format.gl[3] if index == "gl" else texture_format.vk
+        if key == value:
+            return texture_format.name
+    raise ValueError(f"Unsupported {'glInternalFormat' if index == 'gl' else 'vkFormat'} 0x{value:X}")
+
+
+def _read_ktx1_info(f):
+    header = f.read(64)
+    if len(header) < 64:
+        raise EOFError("Truncated KTX header")
+    order = "<" if struct.unpack_from("<I", header, 12)[0] == KTX1_ENDIANNESS else ">"
+    fields = struct.unpack_from(order + "13I", header, 12)
+    gl_internal, width, height = fields[4], fields[6], fields[7]
+    level_count, kv_bytes = max(1, fields[11]), fields[12]
+    fmt = _format_from("gl", gl_internal)
+
+    # 只读取每层开头的 imageSize, 跳过像素数据
+    offset = 64 + kv_bytes
+    levels = []
+    for index in range(level_count):
+        f.seek(offset)
+        size_bytes = f.read(4)
+        if len(size_bytes) < 4:
+            raise EOFError(f"Truncated KTX mip level {index}")
+        size = struct.unpack(order + "I", size_bytes)[0]
+        levels.append(MipLevel(max(1, width >> index), max(1, height >> index), offset + 4, size))
+        offset += 4 + size + (-size % 4)
+    return TextureInfo("ktx", fmt, width, height, levels)
+
+
+def _read_ktx2_info(f):
+    header = f.read(80)
+    if len(header) < 80:
+        raise EOFError("Truncated KTX2 header")
+    vk_format, _, width, height, _, _, _, level_count, scheme = struct.unpack_from("<9I", header, 12)
+    if scheme != 0:
+        raise ValueError(f"KTX2 supercompression scheme {scheme} is not supported")
+    fmt = _format_from("vk", vk_format)
+    level_count = max(1, level_count)
+    table = f.read(24 * level_count)
+    if len(table) < 24 * level_count:
+        raise EOFError("Truncated KTX2 level index")
+    levels = []
+    for index in range(level_count):
+        offset, size, _ = struct.unpack_from("<3Q", table, index * 24)
+        levels.append(MipLevel(max(1, width >> index), max(1, height >> index), offset, size))
+    return TextureInfo("ktx2", fmt, width, height, levels)
+
+
+def read_info(file_path):
+    """
+    只解析文件头, 返回 TextureInfo (容器类型, 格式名, 宽, 高, 各层 MipLevel), 不读取像素数据.
+    支持 PKM、KTX1、KTX2 与 mipmap 容器.
+    """
+    with open(file_path, 'rb') as f:
+        magic = f.read(12)
+        f.seek(0)
+        if magic.startswith(PKM_MAGIC):
+            return _read_pkm_info(f)
+        if magic == KTX1_IDENTIFIER:
+            return _read_ktx1_info(f)
+        if magic == KTX2_IDENTIFIER:
+            return _read_ktx2_info(f)
+    if magic.startswith(mipmap.MIP_MAGIC):
+        fmt, levels = mipmap.read_mip_header(file_path)
+        return TextureInfo("mips", fmt, levels[0].width, levels[0].height, levels)
+    raise ValueError(f"{file_path}: not a PKM, KTX, KTX2 or mipmap container")
+
+
+@profiling.instrument("container.read")
+def read_texture(file_path, level=0):
+    """
+    解码容器中的一层, 返回 PIL 图像.
+    """
+    info = read_info(file_path)
+    if info.container == "mips":
+        if info.format not in DECODERS:
+            raise ValueError(f"{file_path}: unknown format {info.format!r} in mipmap container")
+        return mipmap.read_mips(file_path, DECODERS[info.format], [level])[0]
+    entry = info.levels[level]
+    with open(file_path, 'rb') as f:
+        f.seek(entry.offset)
+        data = f.read(entry.size)
+    if len(data) < entry.size:
+        raise EOFError(f"{file_path}: mip level {level} extends past the end of the file")
+    return _decode_level(info.format, data, entry.width, entry.height)
+
+
+# ---- 无文件头 PTX 的推测 ----
+
+RawCandidate = namedtuple("RawCandidate", ["format", "width", "height", "score"])
+
+# mobiletexture 格式名 -> 文件大小 (宽, 高)
+RAW_SIZES = {
+    "etc1_rgb_a8": lambda w, h: ((w + 3) // 4) * ((h + 3) // 4) * 8 + w * h,
+    "etc1_rgb_etc1a": lambda w, h: ((w + 3) // 4) * ((h + 3) // 4) * 16,
+    "etc1_rgb": lambda w, h: ((w + 3) // 4) * ((h + 3) // 4) * 8,
+    "etc2_rgba8": lambda w, h: ((w + 3) // 4) * ((h + 3) // 4) * 16,
+    "etc2_rgb8": lambda w, h: ((w + 3) // 4) * ((h + 3) // 4) * 8,
+    "argb8888": lambda w, h: w * h * 4,
+    "abgr8888": lambda w, h: w * h * 4,
+    **{fmt: (lambda w, h: w * h * 2) for fmt in PACKED16_FORMATS},
+}
+
+
+def _raw_dimensions(size, fmt, max_aspect):
+    """
+    枚举文件大小恰好为 size 的宽高 (宽高都是 4 的倍数, 长宽比不超过 max_aspect).
+    """
+    per_block = RAW_SIZES[fmt](4, 4)
+    if size % per_block:
+        return []
+    blocks = size // per_block
+    result = []
+    for blocks_x in range(1, int(blocks ** 0.5 * max_aspect ** 0.5) + 2):
+        if blocks % blocks_x == 0:
+            blocks_y = blocks // blocks_x
+            if max(blocks_x, blocks_y) <= max_aspect * min(blocks_x, blocks_y):
+                result.append((blocks_x * 4, blocks_y * 4))
+    return result
+
+
+# 块格式 -> (每块字节数, 颜色块在块内的偏移)
+_BLOCK_LAYOUTS = {"etc1_rgb_etc1a": (8, 0), "etc1_rgb": (8, 0), "etc2_rgb8": (8, 0), "etc2_rgba8": (16, 8)}
+
+
+def _block_roughness(file_path, fmt, width, height):
+    """
+    上下相邻两个块的颜色块前 3 字节 (基色所在的位) 的平均绝对差, 只看前 16 个块行, 不解码.
+    """
+    block_bytes, offset = _BLOCK_LAYOUTS[fmt]
+    blocks_x = (width + 3) // 4
+    rows = min((height + 3) // 4, 16)
+    if rows < 2:
+        return None
+    data = np.fromfile(file_path, dtype=np.uint8, count=rows * blocks_x * block_bytes)
+    data = data.reshape(rows, blocks_x, block_bytes)[..., offset:offset + 3].astype(np.int16)
+    return float(np.abs(np.diff(data, axis=0)).mean())
+
+
+def _row_roughness(file_path, fmt, width, height):
+    """
+    相邻两行的平均绝对差. 宽度猜错时图像按错误的步长折行, 相邻行不再相关, 差值明显变大.
+    只看 A8 平面、8888 或 16 位像素的前若干行; ETC 块格式改为比较上下相邻块的基色字节, 不解码.
+    """
+    if fmt in _BLOCK_LAYOUTS:
+        return _block_roughness(file_path, fmt, width, height)
+    if fmt == "etc1_rgb_a8":
+        offset = ((width + 3) // 4) * ((height + 3) // 4) * 8
+        row_bytes = width
+    elif fmt in ("argb8888", "abgr8888"):
+        offset = 0
+        row_bytes = width * 4
+    elif fmt in PACKED16_FORMATS:
+        offset = 0
+        row_bytes = width * 2
+    else:
+        return None
+    rows = min(height, 64)
+    data = np.fromfile(file_path, dtype=np.uint8, count=rows * row_bytes, offset=offset)
+    data = data.reshape(rows, row_bytes).astype(np.int16)
+    if rows < 2:
+        return None
+    return float(np.abs(np.diff(data, axis=0)).mean())
+
+
+def detect_raw_ptx(file_path, formats=None, max_aspect=8, limit=10):
+    """
+    按文件长度推测无文件头 PTX 的格式与宽高, 返回按可能性排序的 RawCandidate 列表.
+
+    ETC1_RGB_A8 的长度为 padded_w * padded_h / 2 + w * h, 8888 格式为 w * h * 4 (ARGB 与 ABGR 无法区分),
+    16 位格式为 w * h * 2 (六种 16 位格式之间无法区分).
+    对 A8 平面、8888 与 16 位像素还会比较相邻行的差值, 对 ETC 块比较上下相邻块的基色字节 (score, 越小越可能);
+    score 相同时优先 2 的幂与接近方形的尺寸.
+    非 4 的倍数的宽高无法仅凭长度区分, 不在推测范围内.
+    """
+    size = os.path.getsize(file_path)
+    candidates = []
+    for fmt in formats or RAW_SIZES:
+        for width, height in _raw_dimensions(size, fmt, max_aspect):
+            score = _row_roughness(file_path, fmt, width, height)
+            candidates.append(RawCandidate(fmt, width, height, score))
+
+    def rank(candidate):
+        power_of_two = (candidate.width & (candidate.width - 1)) == 0 and (candidate.height & (candidate.height - 1)) == 0
+        aspect = max(candidate.width, candidate.height) / min(candidate.width, candidate.height)
+        return (candidate.score is None, candidate.score or 0, not power_of_two, aspect)
+
+    return sorted(candidates, key=rank)[:limit]
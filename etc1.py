@@ -1,8 +1,66 @@
+import os
+import warnings
+from collections import OrderedDict
+
+import profiling
+
+try:
+    import numpy as np
+except ImportError:  # 没有 NumPy 时只能使用标量接口与纯 Python 的回退路径
+    np = None
+
+# 差分模式下 5 位基色加 3 位有符号差值可能超出 0..31 (-4..34), 扩展后的基色落在 -25..272.
+# 标量解码一直按整数运算容忍这种越界, 所以查找表的下标统一加上 LUT_OFFSET 以覆盖这些值.
+LUT_OFFSET = 32
+
+# 快速模式逐块编码的实现, 三者的输出逐位相同 (benchmarks/check_backends.py 校验):
+#   python  逐块调用标量的 gen_etc1, 作为参考实现
+#   numpy   向量化的 _gen_fast_blocks, 默认
+#   numba   etc1_numba 中由 Numba 编译的标量内核, 需要安装 Numba
+BACKENDS = ("python", "numpy", "numba")
+# 选择后端的环境变量, 在子进程中同样生效
+BACKEND_ENV = "MOBILETEXTURE_BACKEND"
+
+
+def resolve_backend(name=None):
+    """
+    返回实际使用的后端. name 为 None 时读取环境变量 MOBILETEXTURE_BACKEND, 未设置时为 numpy;
+    请求 numba 但没有安装 Numba 时给出警告并回退到 numpy.
+    """
+    name = name or os.environ.get(BACKEND_ENV) or "numpy"
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown ETC1 backend {name!r}, expected one of {BACKENDS}")
+    if name == "numba":
+        import etc1_numba
+        if not etc1_numba.available():
+            warnings.warn("Numba is not installed, falling back to the numpy ETC1 backend", RuntimeWarning,
+                          stacklevel=2)
+            return "numpy"
+    return name
+
+
+def _expand5(c):
+    return (c << 3) | ((c & 0x1C) >> 2)
+
+
+def _build_color_lut(modifiers):
+    """
+    生成 [扩展后的通道值 + LUT_OFFSET][修正表][2 位选择子] -> 截断到 0..255 的颜色值.
+    选择子为 (符号位 << 1) | 表值位, 依次对应 +小, +大, -小, -大.
+    """
+    return [[[max(0, min(255, value + add)) for add in (small, big, -small, -big)]
+             for small, big in modifiers]
+            for value in range(-LUT_OFFSET, 256 + LUT_OFFSET)]
+
+
 class Color:
     """
     一个简单的颜色类.
     假设 ARGB.
+    ETC1 的编码热路径以 (r, g, b, a) 元组或 RGBA uint8 数组表示像素, Color 只作为兼容接口保留.
     """
+    __slots__ = ("Alpha", "Red", "Green", "Blue")
+
     def __init__(self, a, r, g, b):
         self.Alpha = a
         self.Red = r
@@ -22,15 +80,21 @@ class Color:
 
     @property
     def White(self):
-        return Color(255, 255, 255, 255)
+        """共享的白色实例, 请勿修改."""
+        return _WHITE
 
     @property
     def Black(self):
-        return Color(255, 0, 0, 0)
+        """共享的黑色实例, 请勿修改."""
+        return _BLACK
 
     def __repr__(self):
         return f"Color(Alpha={self.Alpha}, Red={self.Red}, Green={self.Green}, Blue={self.Blue})"
 
+
+_WHITE = Color(255, 255, 255, 255)
+_BLACK = Color(255, 0, 0, 0)
+
 class ETC1:
     ETC1Modifiers = [	
         [2, 8],
@@ -43,17 +107,60 @@ class ETC1:
         [47, 183]
     ]
 
+    # 解码查找表, 标量与批量解码共用
+    ETC1ColorLUT = _build_color_lut(ETC1Modifiers)
+    # 4 位基色 -> 8 位
+    ETC1Expand4 = [c * 0x11 for c in range(16)]
+    # 5 位基色 -> 8 位
+    ETC1Expand5 = [_expand5(c) for c in range(32)]
+    # [5 位基色][3 位差值的原始位] -> 第二个子块的 8 位基色
+    ETC1Expand5Delta = [[_expand5(c + (d - 8 if d & 0x4 else d)) for d in range(8)] for c in range(32)]
+
+    # 高质量编码在量化基色附近沿灰度方向尝试的偏移
+    HighQualityOffsets = (-1, 0, 1)
+
+    if np is not None:
+        ETC1ColorLUTArray = np.array(ETC1ColorLUT, dtype=np.uint8)
+        ETC1Expand4Array = np.array(ETC1Expand4, dtype=np.int16)
+        ETC1Expand5Array = np.array(ETC1Expand5, dtype=np.int16)
+        ETC1Expand5DeltaArray = np.array(ETC1Expand5Delta, dtype=np.int16)
+        ETC1ModifiersArray = np.array(ETC1Modifiers, dtype=np.int16)
+
+    @staticmethod
+    def _as_pixels(colors):
+        """
+        把一个块的 16 个像素统一为按行排列的 (r, g, b, a) 元组列表, 这是标量编码路径的内部表示.
+        接受 Color 列表、打包的 32 位 ARGB 整数序列 (同 Color.to_argb)、(r, g, b, a) 元组或列表等长度为 4 的序列,
+        或 (16, 4) / (4, 4, 4) 的 RGBA uint8 数组 (同 image_to_blocks 的单个块).
+        """
+        if np is not None and isinstance(colors, np.ndarray):
+            return [tuple(pixel) for pixel in colors.reshape(16, 4).tolist()]
+        pixels = []
+        for c in colors:
+            if isinstance(c, Color):
+                pixels.append((c.Red, c.Green, c.Blue, c.Alpha))
+            elif isinstance(c, tuple):
+                pixels.append(c)
+            elif isinstance(c, int) or (np is not None and isinstance(c, np.integer)):
+                c = int(c)
+                pixels.append(((c >> 16) & 0xFF, (c >> 8) & 0xFF, c & 0xFF, (c >> 24) & 0xFF))
+            elif hasattr(c, "__len__") and len(c) == 4:
+                pixels.append(tuple(c))
+            else:
+                raise ValueError(f"Expected a Color, a packed ARGB int or an (r, g, b, a) sequence, got {c!r}")
+        return pixels
+
     @staticmethod
     def _gen_modifier(pixels):
-        max_color = Color(0, 0, 0, 0).White # Initialize with a white color
-        min_color = Color(0, 0, 0, 0).Black # Initialize with a black color
+        max_color = (255, 255, 255) # Initialize with a white color
+        min_color = (0, 0, 0) # Initialize with a black color
         min_y = float('inf')
         max_y = float('-inf')
 
         for pixel in pixels:
-            if pixel.Alpha == 0:
+            if pixel[3] == 0:
                 continue
-            y = (pixel.Red + pixel.Green + pixel.Blue) // 3
+            y = (pixel[0] + pixel[1] + pixel[2]) // 3
             if y > max_y:
                 max_y = y
                 max_color = pixel
@@ -61,7 +168,7 @@ class ETC1:
                 min_y = y
                 min_color = pixel
 
-        diff_mean = ((max_color.Red - min_color.Red) + (max_color.Green - min_color.Green) + (max_color.Blue - min_color.Blue)) // 3
+        diff_mean = ((max_color[0] - min_color[0]) + (max_color[1] - min_color[1]) + (max_color[2] - min_color[2])) // 3
 
         mod_diff = float('inf')
         modifier = -1
@@ -92,15 +199,13 @@ class ETC1:
         if mode == 1:
             div1 = float(ETC1.ETC1Modifiers[modifier][0]) / float(ETC1.ETC1Modifiers[modifier][1])
             div2 = 1.0 - div1
-            base_color = Color(255, 
-                               int(min_color.Red * div1 + max_color.Red * div2), 
-                               int(min_color.Green * div1 + max_color.Green * div2), 
-                               int(min_color.Blue * div1 + max_color.Blue * div2))
+            base_color = (int(min_color[0] * div1 + max_color[0] * div2),
+                          int(min_color[1] * div1 + max_color[1] * div2),
+                          int(min_color[2] * div1 + max_color[2] * div2))
         else:
-            base_color = Color(255, 
-                               (min_color.Red + max_color.Red) // 2, 
-                               (min_color.Green + max_color.Green) // 2, 
-                               (min_color.Blue + max_color.Blue) // 2)
+            base_color = ((min_color[0] + max_color[0]) // 2,
+                          (min_color[1] + max_color[1]) // 2,
+                          (min_color[2] + max_color[2]) // 2)
         
         return base_color, modifier
 
@@ -146,30 +251,63 @@ class ETC1:
 
     @staticmethod
     def _get_score(original, encode):
+        original = ETC1._as_pixels(original)
+        encode = ETC1._as_pixels(encode)
         diff = 0
         for i in range(4 * 4):
-            diff += abs(encode[i].Red - original[i].Red)
-            diff += abs(encode[i].Green - original[i].Green)
-            diff += abs(encode[i].Blue - original[i].Blue)
+            diff += abs(encode[i][0] - original[i][0])
+            diff += abs(encode[i][1] - original[i][1])
+            diff += abs(encode[i][2] - original[i][2])
+        return diff
+
+    @staticmethod
+    def _get_block_score(original, data):
+        """
+        直接由块的基色、修正表与选择子计算与原始像素的绝对误差和,
+        结果等于 _get_score(original, decode_etc1(data)), 但不生成任何解码像素.
+        decode_etc1 + _get_score 只保留用于调试.
+        """
+        flip_bit = (data >> 32) & 1
+        base1, base2 = ETC1._decode_bases(data)
+        lut = ETC1.ETC1ColorLUT
+        table1 = (data >> 37) & 0x7
+        table2 = (data >> 34) & 0x7
+        r1, g1, b1 = (lut[c + LUT_OFFSET][table1] for c in base1)
+        r2, g2, b2 = (lut[c + LUT_OFFSET][table2] for c in base2)
+
+        diff = 0
+        for i in range(4 * 4):
+            y3, x3 = divmod(i, 4)
+            shift = x3 * 4 + y3
+            selector = ((data >> shift) & 0x1) | (((data >> (shift + 16)) & 0x1) << 1)
+            pixel = original[i]
+            if (y3 >= 2) if flip_bit else (x3 >= 2):
+                diff += abs(r2[selector] - pixel[0]) + abs(g2[selector] - pixel[1]) + abs(b2[selector] - pixel[2])
+            else:
+                diff += abs(r1[selector] - pixel[0]) + abs(g1[selector] - pixel[1]) + abs(b1[selector] - pixel[2])
         return diff
 
     @staticmethod
     def gen_etc1(colors):
+        """
+        编码一个 4x4 块. colors 可以是 Color 列表、ARGB 整数、(r, g, b, a) 元组或 RGBA 数组, 见 _as_pixels.
+        """
+        colors = ETC1._as_pixels(colors)
         horizontal = ETC1._gen_horizontal(colors)
         vertical = ETC1._gen_vertical(colors)
         
-        horizontal_score = ETC1._get_score(colors, ETC1.decode_etc1(horizontal))
-        vertical_score = ETC1._get_score(colors, ETC1.decode_etc1(vertical))
+        horizontal_score = ETC1._get_block_score(colors, horizontal)
+        vertical_score = ETC1._get_block_score(colors, vertical)
         
         return horizontal if horizontal_score < vertical_score else vertical
 
     @staticmethod
     def _gen_pix_diff(data, pixels, base_color, modifier, x_offs, x_end, y_offs, y_end):
-        base_mean = (base_color.Red + base_color.Green + base_color.Blue) // 3
+        base_mean = (base_color[0] + base_color[1] + base_color[2]) // 3
         i = 0
         for yy in range(y_offs, y_end):
             for xx in range(x_offs, x_end):
-                diff = ((pixels[i].Red + pixels[i].Green + pixels[i].Blue) // 3) - base_mean
+                diff = ((pixels[i][0] + pixels[i][1] + pixels[i][2]) // 3) - base_mean
 
                 if diff < 0:
                     data |= (1 << (xx * 4 + yy + 16))
@@ -240,12 +378,8 @@ class ETC1:
 
     @staticmethod
     def _set_base_colors(data, color1, color2):
-        r1 = color1.Red
-        g1 = color1.Green
-        b1 = color1.Blue
-        r2 = color2.Red
-        g2 = color2.Green
-        b2 = color2.Blue
+        r1, g1, b1 = color1[:3]
+        r2, g2, b2 = color2[:3]
 
         r_diff = (r2 - r1) // 8
         g_diff = (g2 - g1) // 8
@@ -274,68 +408,637 @@ class ETC1:
         return data
 
     @staticmethod
-    def decode_etc1(data, alpha=~0):
-        result = [None] * (4 * 4)
-        diff_bit = ((data >> 33) & 1) == 1
-        flip_bit = ((data >> 32) & 1) == 1
-
-        if diff_bit:
+    def _decode_bases(data):
+        """
+        返回两个子块扩展后的基色 ((r1, g1, b1), (r2, g2, b2)).
+        """
+        if (data >> 33) & 1:
             r = (data >> 59) & 0x1F
             g = (data >> 51) & 0x1F
             b = (data >> 43) & 0x1F
-            r1 = (r << 3) | ((r & 0x1C) >> 2)
-            g1 = (g << 3) | ((g & 0x1C) >> 2)
-            b1 = (b << 3) | ((b & 0x1C) >> 2)
-
-            # Python handles negative shifts differently, explicitly sign extend for 3-bit signed
-            r_diff_raw = (data >> 56) & 0x7
-            g_diff_raw = (data >> 48) & 0x7
-            b_diff_raw = (data >> 40) & 0x7
-
-            # Sign extension for 3-bit value
-            r_diff = r_diff_raw - 8 if r_diff_raw & 0x4 else r_diff_raw
-            g_diff = g_diff_raw - 8 if g_diff_raw & 0x4 else g_diff_raw
-            b_diff = b_diff_raw - 8 if b_diff_raw & 0x4 else b_diff_raw
-
-            r += r_diff
-            g += g_diff
-            b += b_diff
-            r2 = (r << 3) | ((r & 0x1C) >> 2)
-            g2 = (g << 3) | ((g & 0x1C) >> 2)
-            b2 = (b << 3) | ((b & 0x1C) >> 2)
-        else:
-            r1 = ((data >> 60) & 0xF) * 0x11
-            g1 = ((data >> 52) & 0xF) * 0x11
-            b1 = ((data >> 44) & 0xF) * 0x11
-            r2 = ((data >> 56) & 0xF) * 0x11
-            g2 = ((data >> 48) & 0xF) * 0x11
-            b2 = ((data >> 40) & 0xF) * 0x11
-        
+            expand5 = ETC1.ETC1Expand5
+            delta = ETC1.ETC1Expand5Delta
+            return ((expand5[r], expand5[g], expand5[b]),
+                    (delta[r][(data >> 56) & 0x7], delta[g][(data >> 48) & 0x7], delta[b][(data >> 40) & 0x7]))
+        expand4 = ETC1.ETC1Expand4
+        return ((expand4[(data >> 60) & 0xF], expand4[(data >> 52) & 0xF], expand4[(data >> 44) & 0xF]),
+                (expand4[(data >> 56) & 0xF], expand4[(data >> 48) & 0xF], expand4[(data >> 40) & 0xF]))
+
+    @staticmethod
+    def decode_etc1_rgb(data):
+        """
+        decode_etc1 的轻量版本, 只查表, 不分支也不创建 Color.
+        返回按行排列的 16 个 (r, g, b) 元组.
+        """
+        flip_bit = (data >> 32) & 1
+        base1, base2 = ETC1._decode_bases(data)
+        lut = ETC1.ETC1ColorLUT
         table1 = (data >> 37) & 0x7
         table2 = (data >> 34) & 0x7
+        # 每个子块 4 种选择子对应的 4 个颜色
+        colors1 = list(zip(*(lut[c + LUT_OFFSET][table1] for c in base1)))
+        colors2 = list(zip(*(lut[c + LUT_OFFSET][table2] for c in base2)))
 
+        result = [None] * (4 * 4)
         for y3 in range(4):
             for x3 in range(4):
-                val = (data >> (x3 * 4 + y3)) & 0x1
-                neg = ((data >> (x3 * 4 + y3 + 16)) & 0x1) == 1
-                
-                a = ((alpha >> ((x3 * 4 + y3) * 4)) & 0xF) * 0x11
-
-                if (flip_bit and y3 < 2) or (not flip_bit and x3 < 2):
-                    add = ETC1.ETC1Modifiers[table1][val] * (-1 if neg else 1)
-                    r_val = ETC1._color_clamp(r1 + add)
-                    g_val = ETC1._color_clamp(g1 + add)
-                    b_val = ETC1._color_clamp(b1 + add)
-                else:
-                    add = ETC1.ETC1Modifiers[table2][val] * (-1 if neg else 1)
-                    r_val = ETC1._color_clamp(r2 + add)
-                    g_val = ETC1._color_clamp(g2 + add)
-                    b_val = ETC1._color_clamp(b2 + add)
-                
-                result[y3 * 4 + x3] = Color(a, r_val, g_val, b_val)
+                shift = x3 * 4 + y3
+                selector = ((data >> shift) & 0x1) | (((data >> (shift + 16)) & 0x1) << 1)
+                second = y3 >= 2 if flip_bit else x3 >= 2
+                result[y3 * 4 + x3] = (colors2 if second else colors1)[selector]
+        return result
+
+    @staticmethod
+    def decode_etc1(data, alpha=~0):
+        result = [None] * (4 * 4)
+        for i, (r_val, g_val, b_val) in enumerate(ETC1.decode_etc1_rgb(data)):
+            x3 = i % 4
+            y3 = i // 4
+            a = ((alpha >> ((x3 * 4 + y3) * 4)) & 0xF) * 0x11
+            result[i] = Color(a, r_val, g_val, b_val)
         return result
 
     @staticmethod
     def _color_clamp(color_val):
         return max(0, min(255, color_val))
 
+    @staticmethod
+    @profiling.instrument("etc1.decode_blocks")
+    def _decode_blocks(blocks):
+        """
+        批量解码 ETC1 块.
+        blocks 为 N 个 64 位块值 (uint64), 返回 (N, 4, 4, 3) 的 uint8 RGB 数组, 下标为 [块, y, x, 通道].
+        结果与逐块调用 decode_etc1 完全一致.
+        """
+        blocks = np.asarray(blocks, dtype=np.uint64).reshape(-1)
+
+        def field(shift, mask):
+            return ((blocks >> np.uint64(shift)) & np.uint64(mask)).astype(np.int16)
+
+        diff_bit = field(33, 0x1) == 1
+        flip_bit = field(32, 0x1) == 1
+
+        # Differential mode: 5-bit base + signed 3-bit delta, expanded through the lookup tables
+        c5 = np.stack([field(59, 0x1F), field(51, 0x1F), field(43, 0x1F)], axis=-1)
+        delta = np.stack([field(56, 0x7), field(48, 0x7), field(40, 0x7)], axis=-1)
+        diff_c1 = ETC1.ETC1Expand5Array[c5]
+        diff_c2 = ETC1.ETC1Expand5DeltaArray[c5, delta]
+
+        # Individual mode: two 4-bit bases
+        ind_c1 = ETC1.ETC1Expand4Array[np.stack([field(60, 0xF), field(52, 0xF), field(44, 0xF)], axis=-1)]
+        ind_c2 = ETC1.ETC1Expand4Array[np.stack([field(56, 0xF), field(48, 0xF), field(40, 0xF)], axis=-1)]
+
+        base1 = np.where(diff_bit[:, None], diff_c1, ind_c1) + LUT_OFFSET
+        base2 = np.where(diff_bit[:, None], diff_c2, ind_c2) + LUT_OFFSET
+        table1 = field(37, 0x7)
+        table2 = field(34, 0x7)
+
+        # Pixel (x, y) uses bit x * 4 + y for the table value and bit x * 4 + y + 16 for the sign
+        ys, xs = np.mgrid[0:4, 0:4]
+        shifts = (xs * 4 + ys).astype(np.uint64)
+        selector = ((blocks[:, None, None] >> shifts) & np.uint64(1)).astype(np.intp)
+        selector |= (((blocks[:, None, None] >> (shifts + np.uint64(16))) & np.uint64(1)) << np.uint64(1)).astype(np.intp)
+
+        second = np.where(flip_bit[:, None, None], ys >= 2, xs >= 2)
+        table = np.where(second, table2[:, None, None], table1[:, None, None])
+        base = np.where(second[..., None], base2[:, None, None, :], base1[:, None, None, :])
+        return ETC1.ETC1ColorLUTArray[base, table[..., None], selector[..., None]]
+
+    @staticmethod
+    @profiling.instrument("etc1.image_to_blocks")
+    def image_to_blocks(rgba):
+        """
+        把 (H, W, 4) 的 RGBA 数组按 4 对齐补零后切成 (N, 4, 4, 4) 的块, 块按行排列.
+        补出来的像素为透明黑色, 与 write_etc1_rgb_a8 的标量实现一致.
+        """
+        rgba = np.asarray(rgba, dtype=np.uint8)
+        height, width = rgba.shape[:2]
+        padded_width = (width + 3) // 4 * 4
+        padded_height = (height + 3) // 4 * 4
+        if (padded_width, padded_height) != (width, height):
+            padded = np.zeros((padded_height, padded_width, 4), dtype=np.uint8)
+            padded[:height, :width] = rgba
+            rgba = padded
+        blocks = rgba.reshape(padded_height // 4, 4, padded_width // 4, 4, 4).transpose(0, 2, 1, 3, 4)
+        return blocks.reshape(-1, 4, 4, 4)
+
+    @staticmethod
+    def _gen_modifier_blocks(pixels):
+        """
+        _gen_modifier 的批量版本.
+        pixels 为 (N, 8, 4) 的 RGBA 子块, 返回 (N, 3) 的基色与 (N,) 的修正表下标.
+        """
+        rgb = pixels[..., :3].astype(np.int32)
+        luma = rgb.sum(axis=-1) // 3
+        opaque = pixels[..., 3] != 0
+
+        # argmax/argmin return the first extreme, matching the strict comparisons of the scalar loop
+        max_idx = np.argmax(np.where(opaque, luma, -1), axis=1)
+        min_idx = np.argmin(np.where(opaque, luma, 256), axis=1)
+        any_opaque = opaque.any(axis=1)[:, None]
+        max_color = np.where(any_opaque, np.take_along_axis(rgb, max_idx[:, None, None], axis=1)[:, 0], 255)
+        min_color = np.where(any_opaque, np.take_along_axis(rgb, min_idx[:, None, None], axis=1)[:, 0], 0)
+
+        diff_mean = (max_color - min_color).sum(axis=-1) // 3
+
+        mods = np.array(ETC1.ETC1Modifiers, dtype=np.int32)
+        candidates = np.minimum(np.stack([mods[:, 0] * 2, mods[:, 0] + mods[:, 1], mods[:, 1] * 2], axis=1), 255)
+        choice = np.argmin(np.abs(diff_mean[:, None] - candidates.reshape(1, -1)), axis=1)
+        modifier = choice // 3
+        mode = choice % 3
+
+        div1 = mods[modifier, 0] / mods[modifier, 1]
+        div2 = 1.0 - div1
+        weighted = (min_color * div1[:, None] + max_color * div2[:, None]).astype(np.int32)
+        base_color = np.where((mode == 1)[:, None], weighted, (min_color + max_color) // 2)
+        return base_color, modifier
+
+    @staticmethod
+    def _gen_pix_diff_blocks(pixels, base_color, modifier):
+        """
+        _gen_pix_diff 的批量版本, 返回每个像素的 (表值位, 符号位), 形状均为 (N, 8).
+        """
+        luma = pixels[..., :3].astype(np.int32).sum(axis=-1) // 3
+        base_mean = base_color.sum(axis=-1) // 3
+        diff = luma - base_mean[:, None]
+
+        mods = np.array(ETC1.ETC1Modifiers, dtype=np.int32)[modifier]
+        abs_diff = np.abs(diff)
+        val = np.abs(abs_diff - mods[:, 1:2]) < np.abs(abs_diff - mods[:, 0:1])
+        return val, diff < 0
+
+    @staticmethod
+    def _set_base_colors_blocks(color1, color2):
+        """
+        _set_base_colors 的批量版本.
+        返回只含差分位与基色位的 (N,) uint64, 以及解码器将重建出的两个 (N, 3) 基色.
+        """
+        color1 = color1.astype(np.int64)
+        color2 = color2.astype(np.int64)
+        delta = (color2 - color1) // 8
+        diff_mode = ((delta > -4) & (delta < 3)).all(axis=-1)
+
+        def pack(values, shifts):
+            return values.astype(np.uint64) << np.array(shifts, dtype=np.uint64)
+
+        diff_data = pack(color1 // 8, [59, 51, 43]) | pack(delta & 0x7, [56, 48, 40])
+        ind_data = pack(color1 // 0x11, [60, 52, 44]) | pack(color2 // 0x11, [56, 48, 40])
+        data = np.where(diff_mode[:, None], diff_data, ind_data)
+        data = np.bitwise_or.reduce(data, axis=-1)
+        data |= diff_mode.astype(np.uint64) << np.uint64(33)
+
+        expanded1 = np.where(diff_mode[:, None], ETC1.ETC1Expand5Array[color1 // 8],
+                             ETC1.ETC1Expand4Array[color1 // 0x11])
+        expanded2 = np.where(diff_mode[:, None], ETC1.ETC1Expand5DeltaArray[color1 // 8, delta & 0x7],
+                             ETC1.ETC1Expand4Array[color2 // 0x11])
+        return data, expanded1, expanded2
+
+    @staticmethod
+    @profiling.instrument("etc1.mode_select")
+    def _gen_candidate_blocks(blocks, flip):
+        """
+        批量生成水平 (flip=False) 或垂直 (flip=True) 划分的候选块, 对应 _gen_horizontal / _gen_vertical.
+        返回 (块值 (N,) uint64, (基色1, 基色2, 表1, 表2, 选择子)), 后者可直接交给 _candidate_errors.
+        """
+        if flip:
+            halves = (np.s_[:, 0:2, :], np.s_[:, 2:4, :])
+        else:
+            halves = (np.s_[:, :, 0:2], np.s_[:, :, 2:4])
+
+        count = blocks.shape[0]
+        val = np.zeros((count, 4, 4), dtype=bool)
+        neg = np.zeros((count, 4, 4), dtype=bool)
+        bases = []
+        tables = []
+        for half in halves:
+            sub_shape = blocks[half].shape[:3]
+            pixels = blocks[half].reshape(count, 8, 4)
+            base_color, modifier = ETC1._gen_modifier_blocks(pixels)
+            sub_val, sub_neg = ETC1._gen_pix_diff_blocks(pixels, base_color, modifier)
+            val[half] = sub_val.reshape(sub_shape)
+            neg[half] = sub_neg.reshape(sub_shape)
+            bases.append(base_color)
+            tables.append(modifier)
+
+        ys, xs = np.mgrid[0:4, 0:4]
+        bit = np.uint64(1) << (xs * 4 + ys).astype(np.uint64)
+        data, base1, base2 = ETC1._set_base_colors_blocks(bases[0], bases[1])
+        data |= (val * bit).sum(axis=(1, 2), dtype=np.uint64)
+        data |= (neg * (bit << np.uint64(16))).sum(axis=(1, 2), dtype=np.uint64)
+        data |= tables[0].astype(np.uint64) << np.uint64(37)
+        data |= tables[1].astype(np.uint64) << np.uint64(34)
+        data |= np.uint64(1 if flip else 0) << np.uint64(32)
+        selector = val.astype(np.intp) | (neg.astype(np.intp) << 1)
+        return data, (base1, base2, tables[0], tables[1], selector)
+
+    @staticmethod
+    @profiling.instrument("etc1.score_blocks")
+    def _candidate_errors(pixels, flip, base1, base2, table1, table2, selector, weight=None, squared=False):
+        """
+        直接由候选块的参数计算重建误差, 不打包也不解码块.
+        pixels 为 (N, 4, 4, 3) 的原始 RGB; base1/base2 为解码器将重建出的 (N, 3) 基色 (8 位扩展值);
+        table1/table2 为 (N,) 修正表下标; selector 为 (N, 4, 4) 的 2 位选择子 ((符号位 << 1) | 表值位).
+        默认返回 (N,) 的绝对误差和, 与 _get_score 一致; squared=True 时返回平方误差和.
+        weight 为可选的 (N, 4, 4) 像素权重.
+        """
+        count = pixels.shape[0]
+        ys, xs = np.mgrid[0:4, 0:4]
+        second = np.where(np.asarray(flip, dtype=bool).reshape(-1, 1, 1), ys >= 2, xs >= 2)
+        second = np.broadcast_to(second, (count, 4, 4)).astype(np.intp)
+
+        lut = ETC1.ETC1ColorLUTArray
+        # (N, 子块, 通道, 选择子)
+        colors = np.stack([lut[base1 + LUT_OFFSET, np.asarray(table1)[:, None]],
+                           lut[base2 + LUT_OFFSET, np.asarray(table2)[:, None]]], axis=1)
+        recon = colors[np.arange(count)[:, None, None], second, :, selector]
+
+        diff = recon.astype(np.int32) - pixels
+        error = diff * diff if squared else np.abs(diff)
+        if weight is not None:
+            error = error * weight[..., None]
+        return error.sum(axis=(1, 2, 3), dtype=np.int64)
+
+    @staticmethod
+    def _gen_fast_blocks(blocks):
+        """
+        快速模式: 与 gen_etc1 相同的启发式, 水平与垂直两种划分按绝对误差和取优.
+        """
+        original = blocks[..., :3].astype(np.int32)
+        horizontal, horizontal_parts = ETC1._gen_candidate_blocks(blocks, False)
+        vertical, vertical_parts = ETC1._gen_candidate_blocks(blocks, True)
+        horizontal_score = ETC1._candidate_errors(original, False, *horizontal_parts)
+        vertical_score = ETC1._candidate_errors(original, True, *vertical_parts)
+        return np.where(horizontal_score < vertical_score, horizontal, vertical)
+
+    @staticmethod
+    def _gen_python_blocks(blocks):
+        """
+        python 后端: 逐块调用 gen_etc1.
+        """
+        return np.fromiter((ETC1.gen_etc1(block) for block in blocks), dtype=np.uint64, count=blocks.shape[0])
+
+    @staticmethod
+    def _gen_numba_blocks(blocks):
+        """
+        numba 后端: 逐块执行 gen_etc1 的编译版本, 见 etc1_numba.py.
+        """
+        import etc1_numba
+        return etc1_numba.gen_fast_blocks(blocks.reshape(-1, 16, 4), ETC1.ETC1ModifiersArray, ETC1.ETC1ColorLUTArray,
+                                          ETC1.ETC1Expand4Array, ETC1.ETC1Expand5Array, ETC1.ETC1Expand5DeltaArray,
+                                          LUT_OFFSET)
+
+    @staticmethod
+    def _subblock_errors(recon, pixels, weight):
+        """
+        recon 为 (M, C, 4, 3) 的候选重建色 (C 个候选各 4 个选择子), pixels 为 (M, P, 3), weight 为 (M, P).
+        每个像素取平方误差最小的选择子, 返回各候选的加权 RGB 平方误差 (M, C).
+        """
+        count, candidates = recon.shape[:2]
+        # |r - p|^2 = |r|^2 - 2 r.p + |p|^2, 点积用批量矩阵乘一次算出 (数值都是小整数, float32 精确)
+        error = np.matmul(recon.reshape(count, -1, 3) * -2, pixels.transpose(0, 2, 1))
+        error = error.reshape(count, candidates, 4, pixels.shape[1])
+        error += (recon[..., 0] ** 2 + recon[..., 1] ** 2 + recon[..., 2] ** 2)[..., None]
+        # 逐元素取最小比在长度为 4 的轴上做归约快得多
+        pixel_error = np.minimum(np.minimum(error[:, :, 0], error[:, :, 1]),
+                                 np.minimum(error[:, :, 2], error[:, :, 3]))
+        pixel_error += (pixels[..., 0] ** 2 + pixels[..., 1] ** 2 + pixels[..., 2] ** 2)[:, None, :]
+        # 按像素权重求和同样写成批量矩阵乘
+        return np.matmul(pixel_error, weight[:, :, None])[..., 0].astype(np.int64)
+
+    @staticmethod
+    def _search_subblocks(pixels, weight, bits):
+        """
+        高质量模式的子块搜索.
+        pixels 为 (M, 8, 3) 的 RGB 子块, weight 为 (M, 8) 的像素权重.
+        先在量化到 bits 位的加权均值上穷举 8 个修正表, 再用选中的表沿灰度方向尝试 HighQualityOffsets 个邻近基色.
+        返回 (量化基色 (M, K, 3), 加权误差 (M, K), 修正表下标 (M, K)).
+        """
+        levels = (1 << bits) - 1
+        expand = ETC1.ETC1Expand5Array if bits == 5 else ETC1.ETC1Expand4Array
+        lut = ETC1.ETC1ColorLUTArray
+        pixels = pixels.astype(np.float32)
+        weight = weight.astype(np.float32)
+
+        mean = (pixels * weight[..., None]).sum(axis=1) / weight.sum(axis=1)[:, None]
+        center = np.rint(mean * levels / 255).astype(np.int32)
+
+        # (M, table, selector, 3)
+        recon = lut[expand[center] + LUT_OFFSET].transpose(0, 2, 3, 1).astype(np.float32)
+        table = ETC1._subblock_errors(recon, pixels, weight).argmin(axis=-1)
+
+        offsets = np.array(ETC1.HighQualityOffsets, dtype=np.int32)
+        quantized = np.clip(center[:, None, :] + offsets[None, :, None], 0, levels)
+        # (M, K, selector, 3)
+        recon = lut[expand[quantized] + LUT_OFFSET, table[:, None, None]].transpose(0, 1, 3, 2).astype(np.float32)
+        error = ETC1._subblock_errors(recon, pixels, weight)
+        return quantized, error, np.broadcast_to(table[:, None], error.shape)
+
+    @staticmethod
+    @profiling.instrument("etc1.search")
+    def _gen_high_quality_candidate(blocks, flip):
+        """
+        高质量模式下某一种划分的最优块, 返回 (块值 (N,) uint64, 加权平方误差 (N,)).
+        """
+        if flip:
+            halves = (np.s_[:, 0:2, :], np.s_[:, 2:4, :])
+        else:
+            halves = (np.s_[:, :, 0:2], np.s_[:, :, 2:4])
+        count = blocks.shape[0]
+        rows = np.arange(count)
+
+        sub = np.concatenate([blocks[half].reshape(count, 8, 4) for half in halves])
+        rgb = sub[..., :3].astype(np.int32)
+        # 透明像素的颜色不可见, 不计入误差; 整个子块都透明时退化为等权
+        weight = (sub[..., 3] != 0).astype(np.int32)
+        weight[weight.sum(axis=1) == 0] = 1
+
+        q4, e4, t4 = ETC1._search_subblocks(rgb, weight, 4)
+        q5, e5, t5 = ETC1._search_subblocks(rgb, weight, 5)
+
+        # Individual mode: each subblock picks its own best 444 base
+        k1 = e4[:count].argmin(axis=1)
+        k2 = e4[count:].argmin(axis=1)
+        ind_error = e4[:count][rows, k1].astype(np.int64) + e4[count:][rows, k2]
+
+        # Differential mode: best pair of 555 bases whose delta fits in 3 signed bits
+        candidates = q5.shape[1]
+        delta = q5[count:, None, :, :] - q5[:count, :, None, :]
+        valid = ((delta >= -4) & (delta <= 3)).all(axis=-1)
+        pair_error = np.where(valid, e5[:count, :, None].astype(np.int64) + e5[count:, None, :], np.iinfo(np.int64).max)
+        best_pair = pair_error.reshape(count, -1).argmin(axis=1)
+        d1 = best_pair // candidates
+        d2 = best_pair % candidates
+        diff_error = pair_error.reshape(count, -1)[rows, best_pair]
+        use_diff = diff_error <= ind_error
+
+        base1 = np.where(use_diff[:, None], ETC1.ETC1Expand5Array[q5[:count][rows, d1]],
+                         ETC1.ETC1Expand4Array[q4[:count][rows, k1]])
+        base2 = np.where(use_diff[:, None], ETC1.ETC1Expand5Array[q5[count:][rows, d2]],
+                         ETC1.ETC1Expand4Array[q4[count:][rows, k2]])
+        table1 = np.where(use_diff, t5[:count][rows, d1], t4[:count][rows, k1])
+        table2 = np.where(use_diff, t5[count:][rows, d2], t4[count:][rows, k2])
+
+        # Per-pixel selectors for the chosen base/table of each subblock
+        selector = np.zeros((count, 4, 4), dtype=np.intp)
+        block_weight = np.zeros((count, 4, 4), dtype=np.int32)
+        for i, (half, base, table) in enumerate(zip(halves, (base1, base2), (table1, table2))):
+            pixels = rgb[i * count:(i + 1) * count]
+            recon = ETC1.ETC1ColorLUTArray[base + LUT_OFFSET, table[:, None]]
+            d = recon[:, None, :, :].astype(np.int32) - pixels[:, :, :, None]
+            selector[half] = (d * d).sum(axis=2).argmin(axis=-1).reshape(blocks[half].shape[:3])
+            block_weight[half] = weight[i * count:(i + 1) * count].reshape(blocks[half].shape[:3])
+        error = ETC1._candidate_errors(blocks[..., :3].astype(np.int32), flip, base1, base2, table1, table2,
+                                       selector, weight=block_weight, squared=True)
+
+        def pack(values, shifts):
+            return values.astype(np.uint64) << np.array(shifts, dtype=np.uint64)
+
+        q1 = q5[:count][rows, d1]
+        diff_bits = pack(q1, [59, 51, 43]) | pack((q5[count:][rows, d2] - q1) & 0x7, [56, 48, 40])
+        ind_bits = pack(q4[:count][rows, k1], [60, 52, 44]) | pack(q4[count:][rows, k2], [56, 48, 40])
+        data = np.bitwise_or.reduce(np.where(use_diff[:, None], diff_bits, ind_bits), axis=-1)
+        data |= use_diff.astype(np.uint64) << np.uint64(33)
+        data |= np.uint64(1 if flip else 0) << np.uint64(32)
+        data |= table1.astype(np.uint64) << np.uint64(37)
+        data |= table2.astype(np.uint64) << np.uint64(34)
+
+        ys, xs = np.mgrid[0:4, 0:4]
+        shifts = (xs * 4 + ys).astype(np.uint64)
+        selector = selector.astype(np.uint64)
+        data |= ((selector & np.uint64(1)) << shifts).sum(axis=(1, 2), dtype=np.uint64)
+        data |= ((selector >> np.uint64(1)) << (shifts + np.uint64(16))).sum(axis=(1, 2), dtype=np.uint64)
+        return data, error
+
+    @staticmethod
+    def _gen_high_quality_blocks(blocks):
+        """
+        高质量模式: 两种划分 x 个别/差分两种基色模式, 取加权 RGB 平方误差最小者.
+        """
+        horizontal, horizontal_error = ETC1._gen_high_quality_candidate(blocks, False)
+        vertical, vertical_error = ETC1._gen_high_quality_candidate(blocks, True)
+        return np.where(horizontal_error < vertical_error, horizontal, vertical)
+
+    @staticmethod
+    def _gen_uniform_blocks(colors):
+        """
+        单色且不透明的块在快速模式下的编码, 不经过修正表搜索.
+        _gen_modifier 对相同的像素选出表 0 且基色就是该颜色, 两种划分得分相同时取垂直划分,
+        所以结果总是差分模式、翻转位为 1、差值为 0、选择子全为 0, 基色为各通道的高 5 位.
+        colors 为 (N, 4) 的 RGBA, 返回 (N,) 的 uint64.
+        """
+        c5 = colors[:, :3].astype(np.uint64) >> np.uint64(3)
+        return ((c5[:, 0] << np.uint64(59)) | (c5[:, 1] << np.uint64(51)) | (c5[:, 2] << np.uint64(43))
+                | np.uint64(0b11 << 32))
+
+    @staticmethod
+    def gen_etc1_blocks(blocks, chunk_size=None, quality="fast", cache=None, backend=None):
+        """
+        批量编码 ETC1 块.
+        blocks 为 (N, 4, 4, 4) 的 RGBA uint8 数组 (可由 image_to_blocks 得到), 返回 (N,) 的 uint64 块值.
+
+        quality="fast" 时每个块的结果与 gen_etc1 对同样 16 个像素的输出逐位相同.
+        quality="high" 时对每个子块在个别 (444) 与差分 (555) 两种模式下搜索量化基色邻域与全部 8 个修正表,
+        逐像素按 RGB 平方误差选择子, 透明像素不计入误差.
+        chunk_size 限制一次处理的块数, 以控制中间数组的内存占用, 默认按模式选取.
+
+        内容完全相同的块 (纯色区域、重复的留白与补齐的透明块) 只编码一次; 快速模式下单色不透明块直接由
+        _gen_uniform_blocks 得出. cache 为可选的 ETC1EncodeCache, 在多次调用之间复用编码结果并累计命中统计.
+        这些都不改变输出.
+
+        backend 选择快速模式逐块编码的实现 (python / numpy / numba, 见 BACKENDS), 默认由环境变量
+        MOBILETEXTURE_BACKEND 决定; 各后端的输出逐位相同. 高质量模式只有 NumPy 实现.
+        """
+        if quality == "fast":
+            encode = {"python": ETC1._gen_python_blocks, "numpy": ETC1._gen_fast_blocks,
+                      "numba": ETC1._gen_numba_blocks}[resolve_backend(backend)]
+            chunk_size = chunk_size or 65536
+        elif quality == "high":
+            encode = ETC1._gen_high_quality_blocks
+            chunk_size = chunk_size or 4096
+        else:
+            raise ValueError(f"Unknown ETC1 quality {quality!r}, expected 'fast' or 'high'")
+
+        blocks = np.ascontiguousarray(blocks, dtype=np.uint8).reshape(-1, 4, 4, 4)
+        count = blocks.shape[0]
+        if count == 0:
+            return np.empty(0, dtype=np.uint64)
+
+        # 以 64 字节的原始 RGBA 内容为键去重
+        with profiling.stage("etc1.dedup", blocks=count):
+            keys = blocks.reshape(count, 64).view(np.dtype((np.void, 64))).reshape(-1)
+            keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+            unique = blocks[first]
+        encoded = np.empty(unique.shape[0], dtype=np.uint64)
+        pending = np.ones(unique.shape[0], dtype=bool)
+
+        uniform_count = 0
+        if quality == "fast":
+            uniform = (unique == unique[:, :1, :1]).all(axis=(1, 2, 3)) & (unique[:, 0, 0, 3] != 0)
+            encoded[uniform] = ETC1._gen_uniform_blocks(unique[uniform, 0, 0])
+            pending &= ~uniform
+            uniform_count = int(np.count_nonzero(uniform))
+
+        hit_count = 0
+        if cache is not None:
+            pending_indices = np.flatnonzero(pending)
+            hits = cache._lookup(quality, keys[pending_indices])
+            for index, value in zip(pending_indices, hits):
+                if value is not None:
+                    encoded[index] = value
+                    pending[index] = False
+                    hit_count += 1
+
+        pending_indices = np.flatnonzero(pending)
+        for start in range(0, pending_indices.size, chunk_size):
+            indices = pending_indices[start:start + chunk_size]
+            with profiling.stage(f"etc1.encode_{quality}", blocks=indices.size):
+                encoded[indices] = encode(unique[indices])
+        if cache is not None:
+            cache._store(quality, keys[pending_indices], encoded[pending_indices])
+            cache._count(count, count - unique.shape[0], uniform_count, hit_count, pending_indices.size)
+        return encoded[inverse.reshape(-1)]
+
+    @staticmethod
+    def _diff_overflow(data):
+        """
+        返回差分模式中 5 位基色加 3 位差值超出 0..31 的块的布尔掩码 (N,).
+        OES_compressed_ETC1 没有定义这些块的解码结果, ETC2 硬件把它们解释为 T / H / 平面模式.
+        """
+        data = np.asarray(data, dtype=np.uint64).reshape(-1)
+        overflow = np.zeros(data.shape, dtype=bool)
+        for shift in (59, 51, 43):
+            base = ((data >> np.uint64(shift)) & np.uint64(0x1F)).astype(np.int16)
+            delta = ((data >> np.uint64(shift - 3)) & np.uint64(0x7)).astype(np.int16)
+            value = base + np.where(delta & 0x4, delta - 8, delta)
+            overflow |= (value < 0) | (value > 31)
+        return overflow & (((data >> np.uint64(33)) & np.uint64(1)) == 1)
+
+    @staticmethod
+    def gen_portable_etc1_blocks(blocks, quality="fast", cache=None, backend=None):
+        """
+        同 gen_etc1_blocks, 但保证输出是标准的 ETC1 块, 在任何 ETC1 / ETC2 解码器上结果相同.
+        快速模式偶尔产生差分溢出的块 (见 _diff_overflow), 本仓库的解码器按扩展值解码, 设备上则未定义;
+        这些块改用高质量模式重新编码, 高质量模式只在不溢出的差分候选中搜索.
+        """
+        data = ETC1.gen_etc1_blocks(blocks, quality=quality, cache=cache, backend=backend)
+        overflow = ETC1._diff_overflow(data)
+        if overflow.any():
+            data[overflow] = ETC1.gen_etc1_blocks(blocks[overflow], quality="high")
+        return data
+
+    @staticmethod
+    def decode_etc1_blocks(data, width, height):
+        """
+        解码整张纹理的 ETC1 块数据.
+        data 为按行排列的大端 64 位块 (bytes 或 '>u8' 数组), 块数按 4 对齐后的宽高计算.
+        返回 (height, width, 3) 的 uint8 RGB 数组.
+        没有 NumPy 时改用查找表逐块解码, 返回同样按行排列的 RGB bytearray.
+        """
+        padded_width = (width + 3) // 4 * 4
+        padded_height = (height + 3) // 4 * 4
+        blocks_x = padded_width // 4
+        blocks_y = padded_height // 4
+
+        block_count = blocks_x * blocks_y
+        if np is None:
+            return ETC1._decode_etc1_blocks_python(data, width, height, blocks_x, blocks_y)
+        if isinstance(data, np.ndarray):
+            blocks = data.reshape(-1)[:block_count]
+        else:
+            if len(data) < block_count * 8:
+                raise EOFError(f"Expected {block_count * 8} bytes of ETC1 data, got {len(data)}")
+            blocks = np.frombuffer(data, dtype='>u8', count=block_count)
+        if blocks.size < block_count:
+            raise EOFError(f"Expected {block_count} ETC1 blocks, got {blocks.size}")
+        with profiling.stage("etc1.decode", blocks=block_count):
+            pixels = ETC1._decode_blocks(blocks)
+
+        image = pixels.reshape(blocks_y, blocks_x, 4, 4, 3).transpose(0, 2, 1, 3, 4)
+        image = image.reshape(padded_height, padded_width, 3)
+        return np.ascontiguousarray(image[:height, :width])
+
+
+    @staticmethod
+    def _decode_etc1_blocks_python(data, width, height, blocks_x, blocks_y):
+        """
+        decode_etc1_blocks 的纯 Python 回退实现.
+        """
+        if len(data) < blocks_x * blocks_y * 8:
+            raise EOFError(f"Expected {blocks_x * blocks_y * 8} bytes of ETC1 data, got {len(data)}")
+        data = memoryview(data).cast('B')
+        result = bytearray(width * height * 3)
+        row_stride = width * 3
+        offset = 0
+        for by in range(0, blocks_y * 4, 4):
+            for bx in range(0, blocks_x * 4, 4):
+                pixels = ETC1.decode_etc1_rgb(int.from_bytes(data[offset:offset + 8], 'big'))
+                offset += 8
+                for y3 in range(min(4, height - by)):
+                    columns = min(4, width - bx)
+                    start = (by + y3) * row_stride + bx * 3
+                    result[start:start + columns * 3] = bytes(
+                        channel for pixel in pixels[y3 * 4:y3 * 4 + columns] for channel in pixel)
+        return result
+
+
+class ETC1EncodeCache:
+    """
+    ETC1.gen_etc1_blocks 的跨调用编码缓存, 以 (质量, 块的 64 字节 RGBA 内容) 为键, 最多保留 max_blocks 个结果,
+    超出时淘汰最久未用的. 同一个缓存可以在多张纹理、多个 mipmap 层之间共用, 只在当前进程内有效.
+
+    stats() 返回累计的统计: blocks 为请求编码的块数, duplicates 为同一次调用中重复的块,
+    uniform 为走单色快速路径的块 (去重后), hits 为缓存命中, encoded 为实际搜索编码的块,
+    hit_rate 为没有经过搜索的块所占比例.
+    """
+
+    def __init__(self, max_blocks=1 << 16):
+        self.max_blocks = max_blocks
+        self._entries = OrderedDict()
+        self._stats = dict.fromkeys(("blocks", "duplicates", "uniform", "hits", "encoded"), 0)
+
+    def _lookup(self, quality, keys):
+        entries = self._entries
+        result = []
+        for key in keys:
+            key = (quality, key.tobytes())
+            value = entries.get(key)
+            if value is not None:
+                entries.move_to_end(key)
+            result.append(value)
+        return result
+
+    def _store(self, quality, keys, values):
+        entries = self._entries
+        for key, value in zip(keys, values.tolist()):
+            entries[(quality, key.tobytes())] = value
+        while len(entries) > self.max_blocks:
+            entries.popitem(last=False)
+
+    def _count(self, blocks, duplicates, uniform, hits, encoded):
+        stats = self._stats
+        stats["blocks"] += blocks
+        stats["duplicates"] += duplicates
+        stats["uniform"] += uniform
+        stats["hits"] += hits
+        stats["encoded"] += encoded
+
+    def stats(self):
+        stats = dict(self._stats, size=len(self._entries), max_blocks=self.max_blocks)
+        stats["hit_rate"] = 1 - stats["encoded"] / stats["blocks"] if stats["blocks"] else 0.0
+        return stats
+
+    def clear(self):
+        self._entries.clear()
+        for key in self._stats:
+            self._stats[key] = 0
+
+
+# 标量编码的各步骤每个块都要调用多次, 常驻的计时包装会拖慢编码, 只在 profiling.profile() 期间才换上
+profiling.hook(ETC1, "gen_etc1", "etc1.gen_etc1", blocks=1)
+profiling.hook(ETC1, "decode_etc1", "etc1.decode_etc1", blocks=1)
+for _attribute, _stage in (("_get_left_colors", "etc1.extract"), ("_get_right_colors", "etc1.extract"),
+                           ("_get_top_colors", "etc1.extract"), ("_get_bottom_colors", "etc1.extract"),
+                           ("_gen_modifier", "etc1.modifier"), ("_gen_pix_diff", "etc1.selectors"),
+                           ("_set_base_colors", "etc1.pack"), ("_get_block_score", "etc1.score")):
+    profiling.hook(ETC1, _attribute, _stage)
+del _attribute, _stage
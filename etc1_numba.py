@@ -0,0 +1,200 @@
+"""
+ETC1 快速模式的 Numba 内核.
+
+ETC1.gen_etc1 中不便向量化的标量步骤: _gen_modifier 依赖数据的亮度极值搜索, _gen_pix_diff 的逐像素选择子打包,
+_set_base_colors / _set_table1 / _set_table2 的位操作与 _get_block_score 的打分, 在这里写成对 uint8 数组的循环,
+由 Numba 编译为机器码. 每个块的结果与 gen_etc1 逐位相同, 由 benchmarks/check_backends.py 校验.
+
+Numba 是可选依赖, 未安装时 available() 为 False, ETC1 不会选择这个后端 (见 etc1.resolve_backend).
+块值在内核中以 int64 运算, 第 63 位会回绕为负数, 写入 uint64 输出时按位保留; 读取位域时总是先移位再取掩码.
+像素与查找表的值先显式转为 int64 再参与运算: Numba 中 int() 作用于无符号整数仍是无符号的, 相减会回绕.
+"""
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def available():
+    return numba is not None
+
+
+def _jit(function):
+    if numba is None:
+        return function
+    return numba.njit(cache=True, nogil=True)(function)
+
+
+@_jit
+def _gen_modifier(pixels, x_offs, x_end, y_offs, y_end, modifiers):
+    """
+    _gen_modifier: 返回子块的基色 (r, g, b) 与修正表.
+    pixels 为 (16, 4) 的块, 子块为 x_offs..x_end, y_offs..y_end.
+    """
+    max_r, max_g, max_b = 255, 255, 255
+    min_r, min_g, min_b = 0, 0, 0
+    # 亮度在 0..255 之内, 初值与 gen_etc1 的 -inf / inf 等价
+    max_y = -1
+    min_y = 256
+    for y in range(y_offs, y_end):
+        for x in range(x_offs, x_end):
+            i = y * 4 + x
+            if pixels[i, 3] == 0:
+                continue
+            r = np.int64(pixels[i, 0])
+            g = np.int64(pixels[i, 1])
+            b = np.int64(pixels[i, 2])
+            luma = (r + g + b) // 3
+            if luma > max_y:
+                max_y = luma
+                max_r, max_g, max_b = r, g, b
+            if luma < min_y:
+                min_y = luma
+                min_r, min_g, min_b = r, g, b
+
+    diff_mean = ((max_r - min_r) + (max_g - min_g) + (max_b - min_b)) // 3
+
+    mod_diff = 1 << 30
+    modifier = -1
+    mode = -1
+    for i in range(8):
+        small = np.int64(modifiers[i, 0])
+        big = np.int64(modifiers[i, 1])
+        ss = min(small * 2, 255)
+        sb = min(small + big, 255)
+        bb = min(big * 2, 255)
+        if abs(diff_mean - ss) < mod_diff:
+            mod_diff = abs(diff_mean - ss)
+            modifier = i
+            mode = 0
+        if abs(diff_mean - sb) < mod_diff:
+            mod_diff = abs(diff_mean - sb)
+            modifier = i
+            mode = 1
+        if abs(diff_mean - bb) < mod_diff:
+            mod_diff = abs(diff_mean - bb)
+            modifier = i
+            mode = 2
+
+    if mode == 1:
+        div1 = float(modifiers[modifier, 0]) / float(modifiers[modifier, 1])
+        div2 = 1.0 - div1
+        return (np.int64(min_r * div1 + max_r * div2), np.int64(min_g * div1 + max_g * div2),
+                np.int64(min_b * div1 + max_b * div2), modifier)
+    return (min_r + max_r) // 2, (min_g + max_g) // 2, (min_b + max_b) // 2, modifier
+
+
+@_jit
+def _gen_pix_diff(data, pixels, base_r, base_g, base_b, modifier, x_offs, x_end, y_offs, y_end, modifiers):
+    base_mean = (base_r + base_g + base_b) // 3
+    small = np.int64(modifiers[modifier, 0])
+    big = np.int64(modifiers[modifier, 1])
+    for y in range(y_offs, y_end):
+        for x in range(x_offs, x_end):
+            i = y * 4 + x
+            diff = (np.int64(pixels[i, 0]) + np.int64(pixels[i, 1]) + np.int64(pixels[i, 2])) // 3 - base_mean
+            if diff < 0:
+                data |= 1 << (x * 4 + y + 16)
+            if abs(abs(diff) - big) < abs(abs(diff) - small):
+                data |= 1 << (x * 4 + y)
+    return data
+
+
+@_jit
+def _set_base_colors(data, r1, g1, b1, r2, g2, b2):
+    r_diff = (r2 - r1) // 8
+    g_diff = (g2 - g1) // 8
+    b_diff = (b2 - b1) // 8
+    if -4 < r_diff < 3 and -4 < g_diff < 3 and -4 < b_diff < 3:
+        data |= 1 << 33
+        data |= (r1 // 8) << 59
+        data |= (g1 // 8) << 51
+        data |= (b1 // 8) << 43
+        data |= (r_diff & 0x7) << 56
+        data |= (g_diff & 0x7) << 48
+        data |= (b_diff & 0x7) << 40
+    else:
+        data |= (r1 // 0x11) << 60
+        data |= (g1 // 0x11) << 52
+        data |= (b1 // 0x11) << 44
+        data |= (r2 // 0x11) << 56
+        data |= (g2 // 0x11) << 48
+        data |= (b2 // 0x11) << 40
+    return data
+
+
+@_jit
+def _gen_partition(pixels, flip, modifiers):
+    """
+    _gen_horizontal (flip=False) 或 _gen_vertical (flip=True).
+    """
+    if flip:
+        data = 1 << 32
+        first = (0, 4, 0, 2)
+        second = (0, 4, 2, 4)
+    else:
+        data = 0
+        first = (0, 2, 0, 4)
+        second = (2, 4, 0, 4)
+    r1, g1, b1, table1 = _gen_modifier(pixels, first[0], first[1], first[2], first[3], modifiers)
+    data |= (table1 & 0x7) << 37
+    data = _gen_pix_diff(data, pixels, r1, g1, b1, table1, first[0], first[1], first[2], first[3], modifiers)
+    r2, g2, b2, table2 = _gen_modifier(pixels, second[0], second[1], second[2], second[3], modifiers)
+    data |= (table2 & 0x7) << 34
+    data = _gen_pix_diff(data, pixels, r2, g2, b2, table2, second[0], second[1], second[2], second[3], modifiers)
+    return _set_base_colors(data, r1, g1, b1, r2, g2, b2)
+
+
+@_jit
+def _block_score(pixels, data, lut, expand4, expand5, delta, lut_offset):
+    """
+    _get_block_score: 块的解码结果与原始像素的 RGB 绝对误差和.
+    """
+    if (data >> 33) & 1:
+        r = (data >> 59) & 0x1F
+        g = (data >> 51) & 0x1F
+        b = (data >> 43) & 0x1F
+        base1 = (np.int64(expand5[r]), np.int64(expand5[g]), np.int64(expand5[b]))
+        base2 = (np.int64(delta[r, (data >> 56) & 0x7]), np.int64(delta[g, (data >> 48) & 0x7]),
+                 np.int64(delta[b, (data >> 40) & 0x7]))
+    else:
+        base1 = (np.int64(expand4[(data >> 60) & 0xF]), np.int64(expand4[(data >> 52) & 0xF]),
+                 np.int64(expand4[(data >> 44) & 0xF]))
+        base2 = (np.int64(expand4[(data >> 56) & 0xF]), np.int64(expand4[(data >> 48) & 0xF]),
+                 np.int64(expand4[(data >> 40) & 0xF]))
+    flip = (data >> 32) & 1
+    table1 = (data >> 37) & 0x7
+    table2 = (data >> 34) & 0x7
+
+    score = 0
+    for i in range(16):
+        y = i // 4
+        x = i % 4
+        shift = x * 4 + y
+        selector = ((data >> shift) & 0x1) | (((data >> (shift + 16)) & 0x1) << 1)
+        if (y >= 2) if flip else (x >= 2):
+            base, table = base2, table2
+        else:
+            base, table = base1, table1
+        for c in range(3):
+            score += abs(np.int64(lut[base[c] + lut_offset, table, selector]) - np.int64(pixels[i, c]))
+    return score
+
+
+@_jit
+def gen_fast_blocks(pixels, modifiers, lut, expand4, expand5, delta, lut_offset):
+    """
+    逐块执行 gen_etc1. pixels 为 (N, 16, 4) 的 RGBA uint8 数组, 返回 (N,) 的 uint64 块值.
+    其余参数为 ETC1 的修正表与解码查找表的数组形式.
+    """
+    out = np.empty(pixels.shape[0], dtype=np.uint64)
+    for k in range(pixels.shape[0]):
+        block = pixels[k]
+        horizontal = _gen_partition(block, False, modifiers)
+        vertical = _gen_partition(block, True, modifiers)
+        horizontal_score = _block_score(block, horizontal, lut, expand4, expand5, delta, lut_offset)
+        vertical_score = _block_score(block, vertical, lut, expand4, expand5, delta, lut_offset)
+        out[k] = horizontal if horizontal_score < vertical_score else vertical
+    return out
@@ -0,0 +1,494 @@
+"""
+ETC2 RGB8 与 RGBA8 (EAC) 编解码.
+
+ETC2 RGB 块与 ETC1 共用 64 位布局: 个别模式与不溢出的差分模式就是 ETC1 块, 解码直接走 ETC1 的查找表;
+差分模式下 R / G / B 基色加差值溢出 5 位时分别解释为 T / H / 平面 (planar) 模式.
+ETC2 RGBA8 的每个块为 64 位 EAC alpha 块加 64 位 ETC2 RGB 块, 共 16 字节, 均为大端.
+
+只提供批量接口, 块数组的约定与 ETC1.gen_etc1_blocks / ETC1.decode_etc1_blocks 相同.
+"""
+import numpy as np
+
+import profiling
+from etc1 import ETC1
+
+
+def _field(blocks, shift, mask):
+    return ((blocks >> np.uint64(shift)) & np.uint64(mask)).astype(np.int32)
+
+
+def _pack(values, shift):
+    return np.asarray(values).astype(np.uint64) << np.uint64(shift)
+
+
+def _signed3(value):
+    return (value ^ 4) - 4
+
+
+def _selectors(blocks):
+    """
+    返回 (N, 4, 4) 的 2 位像素下标 ((高位 << 1) | 低位), 像素 (x, y) 的低位在 x * 4 + y 位, 高位再加 16.
+    """
+    ys, xs = np.mgrid[0:4, 0:4]
+    shifts = (xs * 4 + ys).astype(np.uint64)
+    lsb = (blocks[:, None, None] >> shifts) & np.uint64(1)
+    msb = (blocks[:, None, None] >> (shifts + np.uint64(16))) & np.uint64(1)
+    return (lsb | (msb << np.uint64(1))).astype(np.intp)
+
+
+def _pack_selectors(selector):
+    ys, xs = np.mgrid[0:4, 0:4]
+    shifts = (xs * 4 + ys).astype(np.uint64)
+    selector = selector.astype(np.uint64)
+    data = ((selector & np.uint64(1)) << shifts).sum(axis=(1, 2), dtype=np.uint64)
+    data |= ((selector >> np.uint64(1)) << (shifts + np.uint64(16))).sum(axis=(1, 2), dtype=np.uint64)
+    return data
+
+
+def _force_overflow(data, shift):
+    """
+    设置 5 位基色 (位于 shift..shift+4) 的高 3 位与其后 3 位差值的符号位, 使基色加差值超出 0..31.
+    基色低 2 位与差值低 2 位已由 T / H / 平面模式的数据占用, 两种取法中总有一种溢出.
+    """
+    base = (data >> np.uint64(shift)) & np.uint64(0x3)
+    delta = (data >> np.uint64(shift - 3)) & np.uint64(0x3)
+    # base + delta > 3 时取 28 + base 加正差值, 否则取 base 加负差值
+    high = base + delta > np.uint64(3)
+    bits = np.where(high, np.uint64(0x7) << np.uint64(shift + 2), np.uint64(1) << np.uint64(shift - 1))
+    return data | bits
+
+
+def _avoid_overflow(data, shift):
+    """
+    根据 5 位基色的低 4 位与 3 位差值选择最高位 (shift + 4), 使基色加差值落在 0..31 之内.
+    """
+    base = _field(data, shift, 0xF)
+    delta = _signed3(_field(data, shift - 3, 0x7))
+    return data | _pack(base + delta < 0, shift + 4)
+
+
+class ETC2:
+    # T / H 模式的距离表
+    ETC2Distances = [3, 6, 11, 16, 23, 32, 41, 64]
+
+    # EAC alpha 修正表 [表][下标]
+    EACModifiers = [
+        [-3, -6, -9, -15, 2, 5, 8, 14],
+        [-3, -7, -10, -13, 2, 6, 9, 12],
+        [-2, -5, -8, -13, 1, 4, 7, 12],
+        [-2, -4, -6, -13, 1, 3, 5, 12],
+        [-3, -6, -8, -12, 2, 5, 7, 11],
+        [-3, -7, -9, -11, 2, 6, 8, 10],
+        [-4, -7, -8, -11, 3, 6, 7, 10],
+        [-3, -5, -8, -11, 2, 4, 7, 10],
+        [-2, -6, -8, -10, 1, 5, 7, 9],
+        [-2, -5, -8, -10, 1, 4, 7, 9],
+        [-2, -4, -8, -10, 1, 3, 7, 9],
+        [-2, -5, -7, -10, 1, 4, 6, 9],
+        [-3, -4, -7, -10, 2, 3, 6, 9],
+        [-1, -2, -3, -10, 0, 1, 2, 9],
+        [-4, -6, -8, -9, 3, 5, 7, 8],
+        [-3, -5, -7, -9, 2, 4, 6, 8],
+    ]
+
+    ETC2DistancesArray = np.array(ETC2Distances, dtype=np.int32)
+    EACModifiersArray = np.array(EACModifiers, dtype=np.int32)
+
+    # ---- 解码 ----
+
+    @staticmethod
+    def _t_paints(blocks):
+        """
+        T 模式的 4 个颜色 (M, 4, 3): 基色 1, 基色 2 + d, 基色 2, 基色 2 - d.
+        """
+        c1 = np.stack([(_field(blocks, 59, 0x3) << 2) | _field(blocks, 56, 0x3),
+                       _field(blocks, 52, 0xF), _field(blocks, 48, 0xF)], axis=-1) * 0x11
+        c2 = np.stack([_field(blocks, 44, 0xF), _field(blocks, 40, 0xF), _field(blocks, 36, 0xF)], axis=-1) * 0x11
+        d = ETC2.ETC2DistancesArray[(_field(blocks, 34, 0x3) << 1) | _field(blocks, 32, 0x1)][:, None]
+        return np.clip(np.stack([c1, c2 + d, c2, c2 - d], axis=1), 0, 255)
+
+    @staticmethod
+    def _h_paints(blocks):
+        """
+        H 模式的 4 个颜色 (M, 4, 3): 基色 1 ± d, 基色 2 ± d.
+        距离下标的最低位由两个 444 基色的大小关系隐含.
+        """
+        c1 = np.stack([_field(blocks, 59, 0xF),
+                       (_field(blocks, 56, 0x7) << 1) | _field(blocks, 52, 0x1),
+                       (_field(blocks, 51, 0x1) << 3) | _field(blocks, 47, 0x7)], axis=-1)
+        c2 = np.stack([_field(blocks, 43, 0xF), _field(blocks, 39, 0xF), _field(blocks, 35, 0xF)], axis=-1)
+        key1 = (c1[:, 0] << 8) | (c1[:, 1] << 4) | c1[:, 2]
+        key2 = (c2[:, 0] << 8) | (c2[:, 1] << 4) | c2[:, 2]
+        index = (_field(blocks, 34, 0x1) << 2) | (_field(blocks, 32, 0x1) << 1) | (key1 >= key2)
+        d = ETC2.ETC2DistancesArray[index][:, None]
+        c1 = c1 * 0x11
+        c2 = c2 * 0x11
+        return np.clip(np.stack([c1 + d, c1 - d, c2 + d, c2 - d], axis=1), 0, 255)
+
+    @staticmethod
+    def _planar_colors(origin, horizontal, vertical):
+        """
+        平面模式的重建: origin / horizontal / vertical 为 (M, 3) 的 8 位颜色, 返回 (M, 4, 4, 3).
+        """
+        ys, xs = np.mgrid[0:4, 0:4]
+        origin = origin[:, None, None, :]
+        value = (xs[..., None] * (horizontal[:, None, None, :] - origin)
+                 + ys[..., None] * (vertical[:, None, None, :] - origin) + 4 * origin + 2) >> 2
+        return np.clip(value, 0, 255)
+
+    @staticmethod
+    def _planar_endpoints(blocks):
+        def expand6(c):
+            return (c << 2) | (c >> 4)
+
+        def expand7(c):
+            return (c << 1) | (c >> 6)
+
+        origin = np.stack([expand6(_field(blocks, 57, 0x3F)),
+                           expand7((_field(blocks, 56, 0x1) << 6) | _field(blocks, 49, 0x3F)),
+                           expand6((_field(blocks, 48, 0x1) << 5) | (_field(blocks, 43, 0x3) << 3)
+                                   | _field(blocks, 39, 0x7))], axis=-1)
+        horizontal = np.stack([expand6((_field(blocks, 34, 0x1F) << 1) | _field(blocks, 32, 0x1)),
+                               expand7(_field(blocks, 25, 0x7F)), expand6(_field(blocks, 19, 0x3F))], axis=-1)
+        vertical = np.stack([expand6(_field(blocks, 13, 0x3F)), expand7(_field(blocks, 6, 0x7F)),
+                             expand6(_field(blocks, 0, 0x3F))], axis=-1)
+        return origin, horizontal, vertical
+
+    @staticmethod
+    def _modes(blocks):
+        """
+        返回 T / H / 平面模式的布尔掩码 (N,), 其余块按 ETC1 解码.
+        """
+        diff = _field(blocks, 33, 0x1) == 1
+
+        def overflow(shift):
+            value = _field(blocks, shift, 0x1F) + _signed3(_field(blocks, shift - 3, 0x7))
+            return (value < 0) | (value > 31)
+
+        t_mode = diff & overflow(59)
+        h_mode = diff & ~t_mode & overflow(51)
+        planar = diff & ~t_mode & ~h_mode & overflow(43)
+        return t_mode, h_mode, planar
+
+    @staticmethod
+    def _decode_rgb_blocks(blocks):
+        """
+        批量解码 ETC2 RGB 块, blocks 为 (N,) uint64, 返回 (N, 4, 4, 3) 的 uint8 RGB 数组.
+        """
+        blocks = np.asarray(blocks, dtype=np.uint64).reshape(-1)
+        pixels = ETC1._decode_blocks(blocks)
+        t_mode, h_mode, planar = ETC2._modes(blocks)
+
+        for mask, paints in ((t_mode, ETC2._t_paints), (h_mode, ETC2._h_paints)):
+            if mask.any():
+                subset = blocks[mask]
+                colors = paints(subset)
+                pixels[mask] = colors[np.arange(subset.size)[:, None, None], _selectors(subset)]
+        if planar.any():
+            pixels[planar] = ETC2._planar_colors(*ETC2._planar_endpoints(blocks[planar]))
+        return pixels
+
+    @staticmethod
+    def _decode_eac_blocks(blocks):
+        """
+        批量解码 EAC alpha 块, blocks 为 (N,) uint64, 返回 (N, 4, 4) 的 uint8 alpha, 下标为 [块, y, x].
+        """
+        blocks = np.asarray(blocks, dtype=np.uint64).reshape(-1)
+        base = _field(blocks, 56, 0xFF)
+        multiplier = _field(blocks, 52, 0xF)
+        table = _field(blocks, 48, 0xF)
+        # 第 i 个 3 位下标对应像素 (x = i / 4, y = i % 4)
+        shifts = np.arange(45, -1, -3, dtype=np.uint64)
+        index = ((blocks[:, None] >> shifts) & np.uint64(0x7)).astype(np.intp)
+        value = base[:, None] + ETC2.EACModifiersArray[table[:, None], index] * multiplier[:, None]
+        return np.clip(value, 0, 255).astype(np.uint8).reshape(-1, 4, 4).transpose(0, 2, 1)
+
+    @staticmethod
+    def _blocks_to_image(pixels, width, height):
+        blocks_x = (width + 3) // 4
+        blocks_y = (height + 3) // 4
+        channels = pixels.shape[3:]
+        image = pixels.reshape((blocks_y, blocks_x, 4, 4) + channels).swapaxes(1, 2)
+        image = image.reshape((blocks_y * 4, blocks_x * 4) + channels)
+        return np.ascontiguousarray(image[:height, :width])
+
+    @staticmethod
+    def _read_blocks(data, count, words):
+        if isinstance(data, np.ndarray):
+            blocks = data.reshape(-1)[:count * words]
+        else:
+            if len(data) < count * words * 8:
+                raise EOFError(f"Expected {count * words * 8} bytes of ETC2 data, got {len(data)}")
+            blocks = np.frombuffer(data, dtype='>u8', count=count * words)
+        if blocks.size < count * words:
+            raise EOFError(f"Expected {count} ETC2 blocks, got {blocks.size // words}")
+        return blocks.reshape(count, words) if words > 1 else blocks
+
+    @staticmethod
+    def decode_etc2_blocks(data, width, height):
+        """
+        解码整张 ETC2 RGB8 纹理.
+        data 为按行排列的大端 64 位块 (bytes 或 '>u8' 数组), 返回 (height, width, 3) 的 uint8 RGB 数组.
+        """
+        count = ((width + 3) // 4) * ((height + 3) // 4)
+        blocks = ETC2._read_blocks(data, count, 1)
+        with profiling.stage("etc2.decode", blocks=count):
+            return ETC2._blocks_to_image(ETC2._decode_rgb_blocks(blocks), width, height)
+
+    @staticmethod
+    def decode_etc2_rgba8_blocks(data, width, height):
+        """
+        解码整张 ETC2 RGBA8 纹理.
+        data 为按行排列的 128 位块 (EAC alpha 块在前, 均为大端), 返回 (height, width, 4) 的 uint8 RGBA 数组.
+        """
+        count = ((width + 3) // 4) * ((height + 3) // 4)
+        blocks = ETC2._read_blocks(data, count, 2)
+        pixels = np.empty((count, 4, 4, 4), dtype=np.uint8)
+        with profiling.stage("eac.decode", blocks=count):
+            pixels[..., 3] = ETC2._decode_eac_blocks(blocks[:, 0])
+        with profiling.stage("etc2.decode", blocks=count):
+            pixels[..., :3] = ETC2._decode_rgb_blocks(blocks[:, 1])
+        return ETC2._blocks_to_image(pixels, width, height)
+
+    # ---- 编码 ----
+
+    @staticmethod
+    def _two_colors(pixels, weight):
+        """
+        沿加权主成分方向把块内像素分成两组, 返回两组的加权均值 (M, 3), (M, 3).
+        T / H 模式的两个基色由此量化得到.
+        """
+        total = weight.sum(axis=1)[:, None]
+        mean = (pixels * weight[..., None]).sum(axis=1) / total
+        centered = pixels - mean[:, None, :]
+        covariance = np.matmul((centered * weight[..., None]).transpose(0, 2, 1), centered)
+        axis = np.ones((pixels.shape[0], 3), dtype=np.float32)
+        for _ in range(4):
+            axis = np.matmul(covariance, axis[..., None])[..., 0]
+            axis /= np.maximum(np.abs(axis).max(axis=1, keepdims=True), 1e-6)
+        second = ((centered * axis[:, None, :]).sum(axis=-1) > 0) & (weight > 0)
+        first = ~second & (weight > 0)
+
+        def group_mean(group):
+            w = weight * group
+            count = w.sum(axis=1)[:, None]
+            return np.where(count > 0, (pixels * w[..., None]).sum(axis=1) / np.maximum(count, 1e-6), mean)
+
+        return group_mean(first), group_mean(second)
+
+    @staticmethod
+    def _best_paints(paints, pixels, weight, valid=None):
+        """
+        paints 为 (M, C, 4, 3) 的候选颜色组, 返回最优候选下标 (M,) 与加权平方误差 (M,).
+        """
+        error = ETC1._subblock_errors(paints.astype(np.float32), pixels, weight)
+        if valid is not None:
+            error = np.where(valid, error, np.iinfo(np.int64).max)
+        best = error.argmin(axis=1)
+        return best, error[np.arange(error.shape[0]), best]
+
+    @staticmethod
+    def _paint_selectors(paints, pixels):
+        """
+        paints 为 (M, 4, 3), pixels 为 (M, 16, 3), 返回每个像素平方误差最小的颜色下标 (M, 4, 4).
+        """
+        d = paints[:, None, :, :].astype(np.float32) - pixels[:, :, None, :]
+        return (d * d).sum(axis=-1).argmin(axis=-1).reshape(-1, 4, 4)
+
+    @staticmethod
+    def _gen_t_h_candidates(pixels, weight):
+        """
+        T 与 H 模式的候选块, 返回 ((T 块, T 误差), (H 块, H 误差)).
+        """
+        count = pixels.shape[0]
+        rows = np.arange(count)
+        mean_a, mean_b = ETC2._two_colors(pixels, weight)
+        qa = np.clip(np.rint(mean_a * 15 / 255), 0, 15).astype(np.int32)
+        qb = np.clip(np.rint(mean_b * 15 / 255), 0, 15).astype(np.int32)
+        d = ETC2.ETC2DistancesArray[None, :, None]
+
+        # T: 两种顺序 (哪一组作为单独的基色 1) x 8 个距离
+        c1 = np.concatenate([np.repeat(qa[:, None], 8, axis=1), np.repeat(qb[:, None], 8, axis=1)], axis=1)
+        c2 = np.concatenate([np.repeat(qb[:, None], 8, axis=1), np.repeat(qa[:, None], 8, axis=1)], axis=1)
+        dist = np.tile(d, (1, 2, 1))
+        paints = np.clip(np.stack([c1 * 0x11, c2 * 0x11 + dist, c2 * 0x11, c2 * 0x11 - dist], axis=2), 0, 255)
+        best, t_error = ETC2._best_paints(paints, pixels, weight)
+        t1 = c1[rows, best]
+        t2 = c2[rows, best]
+        t_index = best % 8
+        selector = ETC2._paint_selectors(paints[rows, best], pixels)
+        t_data = (_pack(t1[:, 0] >> 2, 59) | _pack(t1[:, 0] & 0x3, 56) | _pack(t1[:, 1], 52) | _pack(t1[:, 2], 48)
+                  | _pack(t2[:, 0], 44) | _pack(t2[:, 1], 40) | _pack(t2[:, 2], 36)
+                  | _pack(t_index >> 1, 34) | _pack(t_index & 0x1, 32) | np.uint64(1 << 33))
+        t_data = _force_overflow(t_data, 59) | _pack_selectors(selector)
+
+        # H: 距离下标的最低位由基色顺序隐含, 两个基色相同时只能取奇数下标
+        key_a = (qa[:, 0] << 8) | (qa[:, 1] << 4) | qa[:, 2]
+        key_b = (qb[:, 0] << 8) | (qb[:, 1] << 4) | qb[:, 2]
+        index = np.arange(8)
+        a_first = ((key_a >= key_b)[:, None] == (index & 1).astype(bool)[None, :])
+        c1 = np.where(a_first[..., None], qa[:, None, :], qb[:, None, :])
+        c2 = np.where(a_first[..., None], qb[:, None, :], qa[:, None, :])
+        valid = (key_a != key_b)[:, None] | (index & 1).astype(bool)[None, :]
+        paints = np.clip(np.stack([c1 * 0x11 + d, c1 * 0x11 - d, c2 * 0x11 + d, c2 * 0x11 - d], axis=2), 0, 255)
+        h_index, h_error = ETC2._best_paints(paints, pixels, weight, valid)
+        h1 = c1[rows, h_index]
+        h2 = c2[rows, h_index]
+        selector = ETC2._paint_selectors(paints[rows, h_index], pixels)
+        h_data = (_pack(h1[:, 0], 59) | _pack(h1[:, 1] >> 1, 56) | _pack(h1[:, 1] & 0x1, 52)
+                  | _pack(h1[:, 2] >> 3, 51) | _pack(h1[:, 2] & 0x7, 47)
+                  | _pack(h2[:, 0], 43) | _pack(h2[:, 1], 39) | _pack(h2[:, 2], 35)
+                  | _pack(h_index >> 2, 34) | _pack((h_index >> 1) & 0x1, 32) | np.uint64(1 << 33))
+        h_data = _force_overflow(_avoid_overflow(h_data, 59), 51) | _pack_selectors(selector)
+        return (t_data, t_error), (h_data, h_error)
+
+    @staticmethod
+    def _gen_planar_candidate(pixels, weight):
+        """
+        平面模式的候选块: 对每个通道做 c = O + x (H - O) / 4 + y (V - O) / 4 的最小二乘拟合后量化为 676 位.
+        返回 (块值 (M,), 加权平方误差 (M,)).
+        """
+        ys, xs = np.mgrid[0:4, 0:4]
+        xs = xs.reshape(16, 1) - 1.5
+        ys = ys.reshape(16, 1) - 1.5
+        # 4x4 网格上 sum((x - 1.5)^2) = 20
+        mean = pixels.mean(axis=1)
+        slope_x = (pixels * xs).sum(axis=1) / 20
+        slope_y = (pixels * ys).sum(axis=1) / 20
+        origin = mean - 1.5 * slope_x - 1.5 * slope_y
+        levels = np.array([63, 127, 63], dtype=np.float32)
+
+        def quantize(color):
+            return np.clip(np.rint(color * levels / 255), 0, levels).astype(np.int32)
+
+        qo = quantize(origin)
+        qh = quantize(origin + 4 * slope_x)
+        qv = quantize(origin + 4 * slope_y)
+
+        def expand(q):
+            return np.stack([(q[:, 0] << 2) | (q[:, 0] >> 4), (q[:, 1] << 1) | (q[:, 1] >> 6),
+                             (q[:, 2] << 2) | (q[:, 2] >> 4)], axis=-1)
+
+        recon = ETC2._planar_colors(expand(qo), expand(qh), expand(qv)).reshape(-1, 16, 3)
+        diff = recon - pixels
+        error = ((diff * diff).sum(axis=-1) * weight).sum(axis=1).astype(np.int64)
+
+        data = (_pack(qo[:, 0], 57) | _pack(qo[:, 1] >> 6, 56) | _pack(qo[:, 1] & 0x3F, 49)
+                | _pack(qo[:, 2] >> 5, 48) | _pack((qo[:, 2] >> 3) & 0x3, 43) | _pack(qo[:, 2] & 0x7, 39)
+                | _pack(qh[:, 0] >> 1, 34) | _pack(qh[:, 0] & 0x1, 32) | _pack(qh[:, 1], 25) | _pack(qh[:, 2], 19)
+                | _pack(qv[:, 0], 13) | _pack(qv[:, 1], 6) | _pack(qv[:, 2], 0) | np.uint64(1 << 33))
+        data = _force_overflow(_avoid_overflow(_avoid_overflow(data, 59), 51), 43)
+        return data, error
+
+    @staticmethod
+    def _gen_rgb_blocks(blocks):
+        """
+        对每个块分别生成 ETC1 (高质量模式的两种划分)、T、H 与平面模式的候选, 取加权 RGB 平方误差最小者.
+        ETC1 高质量模式只产生不溢出的差分块, 在 ETC2 解码器下含义不变.
+        """
+        pixels = blocks[..., :3].reshape(-1, 16, 3).astype(np.float32)
+        # 与 ETC1 高质量模式相同: 透明像素不计入误差, 整块透明时等权
+        weight = (blocks[..., 3] != 0).reshape(-1, 16).astype(np.float32)
+        weight[weight.sum(axis=1) == 0] = 1
+
+        candidates = [ETC1._gen_high_quality_candidate(blocks, False),
+                      ETC1._gen_high_quality_candidate(blocks, True)]
+        candidates.extend(ETC2._gen_t_h_candidates(pixels, weight))
+        candidates.append(ETC2._gen_planar_candidate(pixels, weight))
+        data = np.stack([c[0] for c in candidates])
+        error = np.stack([c[1] for c in candidates])
+        return data[error.argmin(axis=0), np.arange(blocks.shape[0])]
+
+    @staticmethod
+    def _gen_eac(alpha):
+        """
+        alpha 为 (M, 4, 4) 的 uint8, 返回 (M,) 的 EAC 块.
+        alpha 恒定的块直接用修正值为 0 的下标精确表示; 其余块对 16 个修正表各取覆盖 [min, max] 的乘数及其 ±1,
+        基值取两端的中点, 按平方误差选择.
+        """
+        count = alpha.shape[0]
+        # EAC 的像素顺序为按列: 第 i 个下标对应 (x = i / 4, y = i % 4)
+        values = alpha.transpose(0, 2, 1).reshape(count, 16).astype(np.int16)
+        low = values.min(axis=1).astype(np.int32)
+        high = values.max(axis=1).astype(np.int32)
+
+        # 表 13 的下标 4 的修正值为 0
+        base = low.copy()
+        multiplier = np.ones(count, dtype=np.int32)
+        table = np.full(count, 13, dtype=np.int32)
+        index = np.full((count, 16), 4, dtype=np.intp)
+
+        varying = np.flatnonzero(low != high)
+        if varying.size:
+            base[varying], multiplier[varying], table[varying], index[varying] = ETC2._search_eac(
+                values[varying], low[varying], high[varying])
+
+        data = _pack(base, 56) | _pack(multiplier, 52) | _pack(table, 48)
+        data |= (index.astype(np.uint64) << np.arange(45, -1, -3, dtype=np.uint64)).sum(axis=1, dtype=np.uint64)
+        return data
+
+    @staticmethod
+    def _search_eac(values, low, high):
+        """
+        返回 (基值, 乘数, 修正表, 下标 (M, 16)).
+        """
+        count = values.shape[0]
+        rows = np.arange(count)
+        mods = ETC2.EACModifiersArray
+        span = mods.max(axis=1) - mods.min(axis=1)
+        multiplier = np.rint((high - low)[:, None] / span[None, :]).astype(np.int32)
+        # (M, 表 * 3)
+        multiplier = np.clip(multiplier[..., None] + np.array([-1, 0, 1]), 1, 15).reshape(count, -1)
+        table = np.repeat(np.arange(16), 3)
+        center = (low + high)[:, None] - (mods.min(axis=1) + mods.max(axis=1))[table] * multiplier
+        base = np.clip((center + 1) // 2, 0, 255)
+
+        # (M, 候选, 8), 误差不超过 255^2, 用 uint16 计算以减少内存带宽
+        recon = np.clip(base[..., None] + mods[table][None] * multiplier[..., None], 0, 255).astype(np.int16)
+        error = None
+        for k in range(8):
+            d = (recon[..., k, None] - values[:, None, :]).view(np.uint16)
+            d *= d
+            error = d if error is None else np.minimum(error, d, out=error)
+        best = error.sum(axis=-1, dtype=np.int32).argmin(axis=1)
+
+        chosen = recon[rows, best].astype(np.int32)
+        d = chosen[:, None, :] - values[:, :, None]
+        index = (d * d).argmin(axis=-1)
+        return base[rows, best], multiplier[rows, best], table[best], index
+
+    @staticmethod
+    def _encode_chunks(encode, blocks, chunk_size, shape, stage):
+        result = np.empty((blocks.shape[0],) + shape, dtype=np.uint64)
+        for start in range(0, blocks.shape[0], chunk_size):
+            chunk = blocks[start:start + chunk_size]
+            with profiling.stage(stage, blocks=chunk.shape[0]):
+                result[start:start + chunk_size] = encode(chunk)
+        return result
+
+    @staticmethod
+    def gen_etc2_blocks(blocks, chunk_size=2048):
+        """
+        批量编码 ETC2 RGB8 块.
+        blocks 为 (N, 4, 4, 4) 的 RGBA uint8 数组 (可由 ETC1.image_to_blocks 得到), 返回 (N,) 的 uint64 块值.
+        alpha 只用作误差权重, 透明像素的颜色不计入误差.
+        """
+        blocks = np.asarray(blocks, dtype=np.uint8).reshape(-1, 4, 4, 4)
+        return ETC2._encode_chunks(ETC2._gen_rgb_blocks, blocks, chunk_size, (), "etc2.encode")
+
+    @staticmethod
+    def gen_eac_blocks(alpha, chunk_size=8192):
+        """
+        批量编码 EAC alpha 块. alpha 为 (N, 4, 4) 的 uint8 数组, 返回 (N,) 的 uint64 块值.
+        """
+        alpha = np.asarray(alpha, dtype=np.uint8).reshape(-1, 4, 4)
+        return ETC2._encode_chunks(ETC2._gen_eac, alpha, chunk_size, (), "eac.encode")
+
+    @staticmethod
+    def gen_etc2_rgba8_blocks(blocks, chunk_size=2048):
+        """
+        批量编码 ETC2 RGBA8 块, 返回 (N, 2) 的 uint64: 每行依次为 EAC alpha 块与 ETC2 RGB 块,
+        按 '>u8' 序列化即为文件中的块顺序.
+        """
+        blocks = np.asarray(blocks, dtype=np.uint8).reshape(-1, 4, 4, 4)
+        return np.stack([ETC2.gen_eac_blocks(blocks[..., 3]), ETC2.gen_etc2_blocks(blocks, chunk_size)], axis=1)
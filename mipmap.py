@@ -0,0 +1,144 @@
+"""
+Mipmap 链的生成与单文件容器.
+
+一张图像只加载一次, 在内存中逐级缩小到 1x1, 各层交给进程池并行编码后写入同一个文件.
+容器布局 (小端):
+    magic   8s   MIP_MAGIC
+    format  16s  格式名 (与 mobiletexture --format 相同), 以 \\0 补齐
+    count   I    层数
+    count 个层记录 (width I, height I, offset Q, size Q), offset 从文件开头算起
+    各层的编码数据按层号顺序紧随其后, 每层的字节与同尺寸的无 mipmap 文件完全相同
+"""
+import os
+import struct
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+MIP_MAGIC = b"MTMIPS\x00\x01"
+MIP_HEADER = struct.Struct("<8s16sI")
+MIP_LEVEL = struct.Struct("<IIQQ")
+
+# box 每层由上一层 2x2 平均得到; lanczos 每层都从第 0 层直接缩小, 更锐利但更慢
+MIP_FILTERS = {"box": Image.BOX, "lanczos": Image.LANCZOS}
+
+MipLevel = namedtuple("MipLevel", ["width", "height", "offset", "size"])
+
+
+def mip_sizes(width, height):
+    """
+    返回从 (width, height) 逐级减半直到 1x1 的各层尺寸.
+    """
+    sizes = [(width, height)]
+    while width > 1 or height > 1:
+        width = max(1, width // 2)
+        height = max(1, height // 2)
+        sizes.append((width, height))
+    return sizes
+
+
+def build_mip_chain(image, filter="box"):
+    """
+    由一张 RGBA 图像生成完整的 mipmap 链, 返回各层的 (height, width, 4) uint8 数组, 第 0 层为原图.
+    PIL 在缩放 RGBA 时按预乘 alpha 过滤, 透明像素的颜色不会渗入边缘.
+    """
+    if filter not in MIP_FILTERS:
+        raise ValueError(f"Unknown mip filter {filter!r}, expected one of {tuple(MIP_FILTERS)}")
+    if not isinstance(image, Image.Image):
+        image = Image.fromarray(np.asarray(image, dtype=np.uint8), "RGBA")
+    elif image.mode != "RGBA":
+        image = image.convert("RGBA")
+
+    resample = MIP_FILTERS[filter]
+    levels = [image]
+    for size in mip_sizes(*image.size)[1:]:
+        source = levels[-1] if filter == "box" else image
+        levels.append(source.resize(size, resample))
+    return [np.asarray(level) for level in levels]
+
+
+def write_mips(file_path, fmt, image, encode, workers=1, filter="box"):
+    """
+    生成 image 的 mipmap 链, 用 encode 编码每一层并写成一个容器文件, 返回各层的 MipLevel.
+
+    参数：
+        file_path：输出文件路径或已打开的二进制文件对象。
+        fmt (str)：写入文件头的格式名。
+        encode：可 pickle 的函数，接受 (height, width, 4) 的 RGBA 数组，返回该层的编码字节。
+        workers (int)：并行编码各层的进程数，None 表示使用全部 CPU 核心。
+        filter (str)："box" 或 "lanczos"。
+    """
+    fmt_bytes = fmt.encode("ascii")
+    if len(fmt_bytes) > 16:
+        raise ValueError(f"Format name {fmt!r} is longer than 16 bytes")
+    chain = build_mip_chain(image, filter)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers > 1 and len(chain) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chain))) as executor:
+            data = list(executor.map(encode, chain))
+    else:
+        data = [encode(level) for level in chain]
+
+    offset = MIP_HEADER.size + MIP_LEVEL.size * len(chain)
+    levels = []
+    for level, encoded in zip(chain, data):
+        levels.append(MipLevel(level.shape[1], level.shape[0], offset, len(encoded)))
+        offset += len(encoded)
+
+    header = MIP_HEADER.pack(MIP_MAGIC, fmt_bytes, len(levels))
+    table = b"".join(MIP_LEVEL.pack(*level) for level in levels)
+    if hasattr(file_path, 'write'):
+        file_path.write(header + table)
+        for encoded in data:
+            file_path.write(encoded)
+    else:
+        with open(file_path, 'wb') as f:
+            f.write(header + table)
+            for encoded in data:
+                f.write(encoded)
+    return levels
+
+
+def is_mip_file(file_path):
+    with open(file_path, 'rb') as f:
+        return f.read(len(MIP_MAGIC)) == MIP_MAGIC
+
+
+def read_mip_header(file_path):
+    """
+    只读取文件头与层表, 返回 (格式名, [MipLevel, ...]), 不读取任何像素数据.
+    """
+    with open(file_path, 'rb') as f:
+        header = f.read(MIP_HEADER.size)
+        if len(header) < MIP_HEADER.size:
+            raise EOFError(f"{file_path}: truncated mipmap header")
+        magic, fmt, count = MIP_HEADER.unpack(header)
+        if magic != MIP_MAGIC:
+            raise ValueError(f"{file_path}: not a mipmap container")
+        table = f.read(MIP_LEVEL.size * count)
+        if len(table) < MIP_LEVEL.size * count:
+            raise EOFError(f"{file_path}: truncated mipmap level table")
+    levels = [MipLevel(*MIP_LEVEL.unpack_from(table, i * MIP_LEVEL.size)) for i in range(count)]
+    return fmt.rstrip(b"\x00").decode("ascii"), levels
+
+
+def read_mips(file_path, decode, levels=None):
+    """
+    解码容器中的各层, 返回 decode 的结果列表.
+    decode 接受 (数据, width, height), 数据为只读 memoryview; levels 为要解码的层号, 默认全部.
+    """
+    _, table = read_mip_header(file_path)
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    view = memoryview(data)
+    result = []
+    for index in (range(len(table)) if levels is None else levels):
+        level = table[index]
+        if level.offset + level.size > len(data):
+            raise EOFError(f"{file_path}: mip level {index} extends past the end of the file")
+        result.append(decode(view[level.offset:level.offset + level.size], level.width, level.height))
+    return result
@@ -0,0 +1,571 @@
+"""
+MobileTexture 命令行工具.
+
+在仓库根目录运行:
+    python mobiletexture.py convert SRC DST --format etc1_rgb_a8|etc1_rgb_etc1a|etc1_rgb|etc2_rgba8|etc2_rgb8|argb8888|abgr8888 [-j N]
+
+16 位格式 rgb565 / rgba4444 / rgba5551 各有 _le 与 _be 两种字节序 (见 RGBAd32x8888eB/Packed16.py),
+编码时可用 --dither ordered|diffusion 抖动以避免色带.
+
+SRC 可以是单个文件或目录. .png 文件按 --format 编码为 .ptx, 其余 (.ptx) 文件按 --format 解码为 .png.
+没有给出 --width/--height 时按文件长度推测尺寸 (见 containers.detect_raw_ptx) 并打印推测结果, 无法区分时报错.
+.pkm / .ktx / .ktx2 文件自带格式与尺寸, 直接解码为 .png. 目录会被递归遍历, 输出保持相同的相对路径.
+--mips 把完整的 mipmap 链编码进一个带层表的容器 (见 mipmap.py); 解码容器时尺寸取自文件头, 只导出第 0 层.
+
+DST 目录下的 .mobiletexture-cache.json 记录每个输入的内容哈希与编码参数,
+未变化的输入直接跳过, 不会被读取或解码.
+
+    python mobiletexture.py info FILE [FILE ...]
+
+只读文件头打印容器的格式、尺寸与各层偏移; 无文件头的 PTX 打印按长度推测的候选格式与尺寸.
+
+convert 加上 --pipeline 时读取、转换与写出三段重叠执行 (见 pipeline.py), 读取最多领先 --prefetch 个文件,
+结束后打印各阶段的处理量、利用率与队列深度.
+解码得到的 PNG 由 pngexport.py 按行带并行压缩写出, --png-level / --png-filter 选择压缩级别与行滤波,
+--png-preview 写出不压缩的预览图; 原始 PTX 边解码边写出, 不在内存中持有整张图像.
+--format auto 按误差预算为每张 PNG 选择最小的格式 (见 autoformat.py, 阈值为 --min-psnr / --max-error),
+并在输出旁写出 <输出>.json 报告, 记录所选格式、尺寸与各候选的误差; 以 --format auto 解码时从这份报告读取格式与尺寸.
+convert 加上 --profile 时在当前进程中逐个转换 (忽略 -j), 结束后打印各阶段的耗时汇总,
+--trace FILE 另外写出 Chrome trace, 见 profiling.py.
+"""
+import argparse
+import functools
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+
+from PIL import Image
+
+from RGBAd32x8888eB.ABGR8888 import ABGR8888
+from RGBAd32x8888eB.ARGB8888 import ARGB8888
+import autoformat
+import containers
+import mipmap
+import pngexport
+import profiling
+from etc1 import ETC1EncodeCache
+from pipeline import PipelineStats, run_pipeline
+from RGBAd32x8888eB.ETC1_RGB_A8 import ALPHA_ETC1, ALPHA_NONE, read_etc1_rgb_a8, read_etc1_rgb_a8_mips, write_etc1_rgb_a8
+from RGBAd32x8888eB.ETC2_RGBA8 import (read_etc2_mips, read_etc2_rgb8, read_etc2_rgba8, write_etc2_rgb8,
+                                       write_etc2_rgba8)
+from RGBAd32x8888eB.Packed16 import DITHER_MODES, PACKED16_FORMATS
+
+# 编码器输出发生变化时递增, 使旧缓存全部失效
+CACHE_VERSION = 2
+CACHE_FILE = ".mobiletexture-cache.json"
+INPUT_SUFFIXES = (".png", ".ptx", ".pkm", ".ktx", ".ktx2")
+CONTAINER_SUFFIXES = (".pkm", ".ktx", ".ktx2")
+
+
+# 当前进程的 ETC1 编码缓存, 见 _encode_cache
+_ENCODE_CACHE = None
+
+
+def _encode_cache(max_blocks):
+    """
+    返回当前进程的 ETC1EncodeCache, max_blocks 为 0 时不使用缓存.
+    进程池中的每个进程各有一个缓存, 在该进程转换的各个文件之间共用.
+    """
+    global _ENCODE_CACHE
+    if not max_blocks:
+        return None
+    if _ENCODE_CACHE is None or _ENCODE_CACHE.max_blocks != max_blocks:
+        _ENCODE_CACHE = ETC1EncodeCache(max_blocks)
+    return _ENCODE_CACHE
+
+
+def _write_etc1_rgb_a8(file_path, image, quality="fast", encode_cache=0, **mip_options):
+    write_etc1_rgb_a8(file_path, image.width, image.height, image, quality=quality,
+                      cache=_encode_cache(encode_cache), **mip_options)
+
+
+def _write_etc1_rgb_etc1a(file_path, image, quality="fast", encode_cache=0, **mip_options):
+    write_etc1_rgb_a8(file_path, image.width, image.height, image, quality=quality, alpha_format=ALPHA_ETC1,
+                      cache=_encode_cache(encode_cache), **mip_options)
+
+
+def _write_etc1_rgb(file_path, image, quality="fast", encode_cache=0, **mip_options):
+    write_etc1_rgb_a8(file_path, image.width, image.height, image, quality=quality, alpha_format=ALPHA_NONE,
+                      cache=_encode_cache(encode_cache), **mip_options)
+
+
+def _write_etc2_rgba8(file_path, image, **mip_options):
+    write_etc2_rgba8(file_path, image.width, image.height, image, **mip_options)
+
+
+def _write_etc2_rgb8(file_path, image, **mip_options):
+    write_etc2_rgb8(file_path, image.width, image.height, image, **mip_options)
+
+
+def _write_argb8888(file_path, image, **mip_options):
+    ARGB8888.write(image, file_path, **mip_options)
+
+
+def _write_abgr8888(file_path, image, **mip_options):
+    ABGR8888.write(image, file_path, **mip_options)
+
+
+def _write_packed16(fmt, file_path, image, dither="none", **mip_options):
+    PACKED16_FORMATS[fmt].write(image, file_path, dither=dither, **mip_options)
+
+
+# 格式名 -> (写入函数 (file_path, image, **编码参数), 读取函数 (file_path, width, height),
+#           mipmap 容器读取函数 (file_path, levels))
+FORMATS = {
+    "etc1_rgb_a8": (_write_etc1_rgb_a8, read_etc1_rgb_a8, read_etc1_rgb_a8_mips),
+    "etc1_rgb_etc1a": (_write_etc1_rgb_etc1a, functools.partial(read_etc1_rgb_a8, alpha_format=ALPHA_ETC1),
+                       read_etc1_rgb_a8_mips),
+    "etc1_rgb": (_write_etc1_rgb, functools.partial(read_etc1_rgb_a8, alpha_format=ALPHA_NONE),
+                 read_etc1_rgb_a8_mips),
+    "etc2_rgba8": (_write_etc2_rgba8, read_etc2_rgba8, read_etc2_mips),
+    "etc2_rgb8": (_write_etc2_rgb8, read_etc2_rgb8, read_etc2_mips),
+    "argb8888": (_write_argb8888, ARGB8888.read, ARGB8888.read_mips),
+    "abgr8888": (_write_abgr8888, ABGR8888.read, ABGR8888.read_mips),
+    **{fmt: (functools.partial(_write_packed16, fmt), packed.read, packed.read_mips)
+       for fmt, packed in PACKED16_FORMATS.items()},
+}
+# 格式名 -> 从内存解码的函数 (buffer, width, height), 供 --pipeline 使用
+DECODERS = containers.DECODERS
+# 接受 --quality 与 --encode-cache 的有损格式
+QUALITY_FORMATS = {"etc1_rgb_a8", "etc1_rgb_etc1a", "etc1_rgb"}
+# 接受 --dither 的 16 位格式
+DITHER_FORMATS = set(PACKED16_FORMATS)
+# 按误差预算逐个文件选择格式, 见 autoformat.py
+AUTO = "auto"
+# 自动选择的报告写在输出文件名后加这个后缀的文件中
+REPORT_SUFFIX = ".json"
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _output_name(rel_path):
+    stem, suffix = os.path.splitext(rel_path)
+    return stem + (".ptx" if suffix.lower() == ".png" else ".png")
+
+
+def _collect_jobs(src, dst):
+    """
+    返回 (输入路径, 输出路径, 缓存条目名) 列表, 按路径排序.
+    """
+    if os.path.isdir(src):
+        jobs = []
+        for root, dirs, files in os.walk(src):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(INPUT_SUFFIXES):
+                    rel_path = os.path.relpath(os.path.join(root, name), src)
+                    out_rel = _output_name(rel_path)
+                    jobs.append((os.path.join(root, name), os.path.join(dst, out_rel), out_rel))
+        return jobs
+
+    if os.path.isdir(dst) or dst.endswith(os.sep):
+        out_rel = _output_name(os.path.basename(src))
+        return [(src, os.path.join(dst, out_rel), out_rel)]
+    return [(src, dst, os.path.basename(dst))]
+
+
+def convert_file(src_path, dst_path, fmt, width=None, height=None, options=None, png_options=None):
+    """
+    转换单个文件: .png 编码为 fmt 格式的 PTX, 其余按 fmt 格式解码为 PNG.
+    options 为传给写入函数的编码参数, png_options 为传给 pngexport.write_png_rows 的参数. 返回输出文件大小.
+    fmt 为 AUTO 时 options 中还带有 select_format 的阈值, 编码时写出选择报告, 解码时从报告读取格式与尺寸.
+    """
+    os.makedirs(os.path.dirname(dst_path) or ".", exist_ok=True)
+    if src_path.lower().endswith(".png"):
+        with profiling.stage("png.read", bytes=os.path.getsize(src_path)):
+            image = Image.open(src_path).convert("RGBA")
+        options = dict(options or {})
+        if fmt == AUTO:
+            fmt = _select_format(image, dst_path, options)
+        FORMATS[fmt][0](dst_path, image, **options)
+    else:
+        alpha_value = None
+        if fmt == AUTO:
+            fmt, width, height, alpha_value = _read_report(src_path)
+        _export_png(src_path, dst_path, fmt, width, height, png_options or {}, alpha_value)
+    return os.path.getsize(dst_path)
+
+
+def _select_format(image, dst_path, options):
+    """
+    按 options 中的阈值选择格式并在输出旁写出报告; 从 options 中取走阈值, 并去掉所选格式不接受的编码参数.
+    """
+    with profiling.stage("auto.select"):
+        selection = autoformat.select_format(image, min_psnr=options.pop("min_psnr"),
+                                             max_error=options.pop("max_error"),
+                                             formats=options.pop("auto_formats"))
+    if selection.format not in QUALITY_FORMATS:
+        options.pop("quality", None)
+        options.pop("encode_cache", None)
+    if selection.format not in DITHER_FORMATS:
+        options.pop("dither", None)
+    with open(dst_path + REPORT_SUFFIX, 'w', encoding='utf-8') as f:
+        json.dump(selection.to_report(), f, indent=1)
+    return selection.format
+
+
+def _read_report(src_path):
+    """
+    从自动选择的报告中读取 (格式, 宽, 高, alpha_value); alpha_value 见 autoformat.Selection.
+    """
+    try:
+        with open(src_path + REPORT_SUFFIX, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    except OSError:
+        raise ValueError(f"{src_path}: 找不到 {REPORT_SUFFIX} 报告，--format auto 只能解码自动选择的输出")
+    return report["format"], report["width"], report["height"], report.get("alpha_value")
+
+
+def _is_raw_ptx(src_path):
+    return not src_path.lower().endswith(CONTAINER_SUFFIXES) and not mipmap.is_mip_file(src_path)
+
+
+def _raw_size(src_path, fmt, width, height):
+    """
+    返回原始 PTX 的尺寸, 没有给出时按文件长度推测并打印推测结果.
+    前两个候选的 score 相同 (包括都无法打分) 时无法区分, 报错而不是猜一个.
+    """
+    if width is None or height is None:
+        candidates = containers.detect_raw_ptx(src_path, formats=[fmt], limit=2)
+        if not candidates:
+            raise ValueError(f"{src_path}: 文件长度不符合任何 {fmt} 尺寸，请指定 --width 和 --height")
+        if len(candidates) > 1 and candidates[0].score == candidates[1].score:
+            sizes = "、".join(f"{c.width}x{c.height}" for c in candidates)
+            raise ValueError(f"{src_path}: 无法从文件长度区分尺寸 {sizes}，请指定 --width 和 --height")
+        width, height = candidates[0].width, candidates[0].height
+        print(f"{src_path}: 未指定尺寸，按文件长度推测为 {width}x{height}")
+    return width, height
+
+
+def _read_texture(src_path, fmt, width, height):
+    """
+    按路径读取 PTX、容器或 mipmap 容器 (取第 0 层), 返回 PIL 图像.
+    """
+    reader, mips_reader = FORMATS[fmt][1:]
+    if src_path.lower().endswith(CONTAINER_SUFFIXES):
+        return containers.read_texture(src_path)
+    if mipmap.is_mip_file(src_path):
+        return mips_reader(src_path, levels=[0])[0]
+    return reader(src_path, *_raw_size(src_path, fmt, width, height))
+
+
+def _export_png(src_path, dst_path, fmt, width, height, png_options, alpha_value=None):
+    """
+    把 PTX 解码写成 PNG; 支持流式解码的原始 PTX 按行带边解码边写出, 其余先解码出整张图像.
+    alpha_value 不为 None 时用它替换解码出的 alpha (自动选择了不存储 alpha 的格式).
+    """
+    with profiling.stage("png.write") as stage:
+        if alpha_value is None and fmt in pngexport.STREAMING_FORMATS and _is_raw_ptx(src_path):
+            width, height = _raw_size(src_path, fmt, width, height)
+            size = pngexport.export_png(src_path, dst_path, fmt, width, height, **png_options)
+        else:
+            image = _read_texture(src_path, fmt, width, height)
+            if alpha_value is not None:
+                image.putalpha(alpha_value)
+            size = pngexport.write_png(dst_path, image, **png_options)
+        stage.add(bytes=size)
+
+
+def transcode(src_path, data, fmt, width=None, height=None, options=None, png_options=None):
+    """
+    与 convert_file 相同的转换, 但输入与输出都在内存中: data 为 src_path 的内容, 返回输出文件的字节.
+    容器、mipmap 容器与需要按长度推测尺寸的 PTX 仍按路径读取.
+    """
+    output = io.BytesIO()
+    if src_path.lower().endswith(".png"):
+        image = Image.open(io.BytesIO(data)).convert("RGBA")
+        FORMATS[fmt][0](output, image, **(options or {}))
+        return output.getvalue()
+    if (width is None or height is None or src_path.lower().endswith(CONTAINER_SUFFIXES)
+            or data[:len(mipmap.MIP_MAGIC)] == mipmap.MIP_MAGIC):
+        image = _read_texture(src_path, fmt, width, height)
+    else:
+        image = DECODERS[fmt](data, width, height)
+    pngexport.write_png(output, image, **(png_options or {}))
+    return output.getvalue()
+
+
+def _run_inline(function, *args):
+    """
+    在当前进程中执行并返回已完成的 Future, 与 executor.submit 的结果用法相同.
+    """
+    future = Future()
+    try:
+        future.set_result(function(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+class ConvertCache:
+    """
+    转换缓存, 以 JSON 保存在输出目录中.
+    每个条目记录输入的大小/修改时间/内容哈希、编码参数与输出大小.
+    输入的大小和修改时间未变时直接复用记录的哈希, 不再读取文件内容.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") == CACHE_VERSION:
+                    self.entries = data.get("entries", {})
+            except (OSError, ValueError):
+                self.entries = {}
+
+    @staticmethod
+    def settings_key(src_hash, settings):
+        payload = json.dumps(settings, sort_keys=True)
+        return hashlib.sha256(f"{src_hash}:{payload}".encode()).hexdigest()
+
+    def content_hash(self, name, src_path):
+        """
+        返回输入的内容哈希, 大小和修改时间与缓存一致时不读取文件.
+        """
+        stat = os.stat(src_path)
+        entry = self.entries.get(name)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["hash"]
+        return _file_hash(src_path)
+
+    def is_fresh(self, name, src_hash, settings, dst_path):
+        entry = self.entries.get(name)
+        if not entry or entry["key"] != self.settings_key(src_hash, settings):
+            return False
+        try:
+            return os.path.getsize(dst_path) == entry["output_size"]
+        except OSError:
+            return False
+
+    def record(self, name, src_path, src_hash, settings, output_size):
+        stat = os.stat(src_path)
+        self.entries[name] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": src_hash,
+            "key": self.settings_key(src_hash, settings),
+            "output_size": output_size,
+        }
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": CACHE_VERSION, "entries": self.entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def convert(src, dst, fmt, width=None, height=None, jobs=None, use_cache=True, force=False, quality="fast",
+            mips=False, mip_filter="box", pipeline=False, prefetch=4, stats=None, png_level=pngexport.DEFAULT_LEVEL,
+            png_filter=pngexport.DEFAULT_FILTER, png_preview=False, min_psnr=35.0, max_error=None, auto_formats=autoformat.AUTO_FORMATS, dither="none",
+            encode_cache=0):
+    """
+    批量转换 src 到 dst, 返回 (转换数, 跳过数, 失败列表).
+    png_level / png_filter / png_preview 为解码输出 PNG 的压缩级别、行滤波与不压缩预览, 见 pngexport.py.
+    fmt 为 AUTO 时按 min_psnr / max_error 在 auto_formats 中为每个文件选择格式, 见 autoformat.select_format.
+    dither 为 16 位格式编码时的抖动方式, 见 RGBAd32x8888eB/Packed16.py.
+    encode_cache 为 ETC1 编码缓存的块数 (见 etc1.ETC1EncodeCache), 每个转换进程一个, 0 为不使用.
+    pipeline=True 时读取、转换与写出分成三段重叠执行 (见 pipeline.py), 读取最多领先 prefetch 个文件,
+    各阶段的统计累加到 stats (PipelineStats) 中.
+    """
+    if fmt not in FORMATS and fmt != AUTO:
+        raise ValueError(f"未知格式: {fmt}")
+    if fmt == AUTO and pipeline:
+        raise ValueError("--format auto 需要在输出旁写出报告，不能与 --pipeline 同时使用")
+    tasks = _collect_jobs(src, dst)
+    if not tasks:
+        return 0, 0, []
+    # 缓存放在输出目录中；单文件转换时放在输出文件旁边
+    cache_dir = dst if os.path.isdir(src) else os.path.dirname(tasks[0][1])
+    cache = ConvertCache(os.path.join(cache_dir, CACHE_FILE) if use_cache else None)
+    options = {"quality": quality} if fmt in QUALITY_FORMATS or fmt == AUTO else {}
+    if fmt in DITHER_FORMATS or fmt == AUTO:
+        options["dither"] = dither
+    if fmt == AUTO:
+        options.update(min_psnr=min_psnr, max_error=max_error, auto_formats=list(auto_formats))
+    if mips:
+        options.update(mips=True, mip_filter=mip_filter)
+    settings = {"format": fmt, "width": width, "height": height, "version": CACHE_VERSION, **options}
+    # 编码缓存只影响速度, 输出不变, 不计入转换缓存的参数
+    if encode_cache and (fmt in QUALITY_FORMATS or fmt == AUTO):
+        options = {**options, "encode_cache": encode_cache}
+    png_options = {"level": png_level, "filter": png_filter, "preview": png_preview}
+    # PNG 的压缩参数只影响解码输出, 改变它们不应使编码结果的缓存失效
+    png_settings = {**settings, "png": png_options}
+    # 多个进程并行转换时每个进程只用一个压缩线程, 避免线程数超过 CPU 核心数
+    png_options = {**png_options, "workers": None if jobs == 1 or profiling.enabled() else 1}
+
+    def task_settings(src_path):
+        return settings if src_path.lower().endswith(".png") else png_settings
+
+    pending = []
+    skipped = 0
+    for src_path, dst_path, name in tasks:
+        src_hash = cache.content_hash(name, src_path)
+        if not force and cache.is_fresh(name, src_hash, task_settings(src_path), dst_path):
+            skipped += 1
+            continue
+        pending.append((src_path, dst_path, name, src_hash))
+
+    converted = 0
+    failures = []
+
+    def record(task, result):
+        nonlocal converted
+        src_path, _, name, src_hash = task
+        if isinstance(result, Exception):
+            failures.append((src_path, result))
+            print(f"失败: {src_path}: {result}", file=sys.stderr)
+            return
+        cache.record(name, src_path, src_hash, task_settings(src_path), result)
+        converted += 1
+
+    if pipeline:
+        try:
+            run_pipeline(pending, transcode, (fmt, width, height, options, png_options), jobs=jobs,
+                         prefetch=prefetch, stats=stats, on_result=record)
+        finally:
+            cache.save()
+        return converted, skipped, failures
+
+    # 子进程中的阶段记录不到, 打开计时时在当前进程中逐个转换
+    executor = nullcontext() if profiling.enabled() else ProcessPoolExecutor(max_workers=jobs)
+    submit = _run_inline if profiling.enabled() else executor.submit
+    try:
+        with executor:
+            futures = {submit(convert_file, task[0], task[1], fmt, width, height, options, png_options): task
+                       for task in pending}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = e
+                record(futures[future], result)
+    finally:
+        cache.save()
+    return converted, skipped, failures
+
+
+def info(paths):
+    for path in paths:
+        try:
+            texture = containers.read_info(path)
+        except ValueError:
+            candidates = containers.detect_raw_ptx(path, limit=5)
+            print(f"{path}: 无文件头，按长度推测：")
+            for candidate in candidates:
+                score = "" if candidate.score is None else f"  行差 {candidate.score:.2f}"
+                print(f"  {candidate.format:<16} {candidate.width}x{candidate.height}{score}")
+            if not candidates:
+                print("  无匹配的格式")
+            continue
+        print(f"{path}: {texture.container} {texture.format} {texture.width}x{texture.height}，"
+              f"{len(texture.levels)} 层")
+        for index, level in enumerate(texture.levels):
+            print(f"  {index:>2}: {level.width}x{level.height} 偏移 {level.offset} 大小 {level.size}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="mobiletexture", description="移动端纹理格式转换工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = subparsers.add_parser("convert", help="批量转换 PNG 与 PTX")
+    convert_parser.add_argument("src", help="输入文件或目录")
+    convert_parser.add_argument("dst", help="输出文件或目录")
+    convert_parser.add_argument("--format", required=True, choices=sorted(FORMATS) + [AUTO],
+                                help="PTX 格式，auto 为按误差预算逐个文件选择")
+    convert_parser.add_argument("--width", type=int, help="解码 PTX 时的图像宽度")
+    convert_parser.add_argument("--height", type=int, help="解码 PTX 时的图像高度")
+    convert_parser.add_argument("--quality", choices=("fast", "high"), default="fast",
+                                help="有损格式的编码质量，high 误差更小但更慢")
+    convert_parser.add_argument("--encode-cache", type=int, default=0, metavar="BLOCKS",
+                                help="ETC1 编码缓存的块数，在同一进程转换的文件之间复用相同块的编码结果，"
+                                     "命中统计在 --profile 时打印；0 为不使用")
+    convert_parser.add_argument("--min-psnr", type=float, default=35.0,
+                                help="--format auto 时可接受的最低 PSNR (dB)")
+    convert_parser.add_argument("--max-error", type=int, default=None,
+                                help="--format auto 时单个通道可接受的最大误差，默认不限制")
+    convert_parser.add_argument("--auto-formats", default=",".join(autoformat.AUTO_FORMATS),
+                                help="--format auto 的候选格式，逗号分隔；面向 GLES2 设备时去掉 etc2 格式")
+    convert_parser.add_argument("--dither", choices=DITHER_MODES, default="none",
+                                help="16 位格式编码时的抖动：ordered 为 8x8 Bayer，diffusion 为 Floyd-Steinberg")
+    convert_parser.add_argument("--mips", action="store_true", help="编码完整的 mipmap 链，写成单个容器文件")
+    convert_parser.add_argument("--mip-filter", choices=sorted(mipmap.MIP_FILTERS), default="box",
+                                help="mipmap 缩小滤波器")
+    convert_parser.add_argument("--png-level", type=int, choices=range(10), default=pngexport.DEFAULT_LEVEL,
+                                metavar="0-9",
+                                help="解码输出 PNG 的 zlib 压缩级别")
+    convert_parser.add_argument("--png-filter", choices=sorted(pngexport.PNG_FILTERS),
+                                default=pngexport.DEFAULT_FILTER,
+                                help="解码输出 PNG 的行滤波")
+    convert_parser.add_argument("--png-preview", action="store_true",
+                                help="解码输出不压缩、不滤波的 PNG，写出最快但文件最大")
+    convert_parser.add_argument("-j", "--jobs", type=int, default=None, help="并行进程数，默认使用全部 CPU 核心")
+    convert_parser.add_argument("--no-cache", action="store_true", help="不读写转换缓存")
+    convert_parser.add_argument("--force", action="store_true", help="忽略缓存，全部重新转换")
+    convert_parser.add_argument("--pipeline", action="store_true",
+                                help="读取、转换与写出重叠执行，适合网络存储等 I/O 较慢的场合")
+    convert_parser.add_argument("--prefetch", type=int, default=4, help="--pipeline 时最多预读的文件数")
+    convert_parser.add_argument("--profile", action="store_true",
+                                help="记录各阶段耗时并在结束时打印汇总，此时在当前进程中逐个转换")
+    convert_parser.add_argument("--trace", metavar="FILE", help="把各阶段写成 Chrome trace JSON（隐含 --profile）")
+
+    info_parser = subparsers.add_parser("info", help="读取容器文件头或推测 PTX 的格式与尺寸")
+    info_parser.add_argument("files", nargs="+", help="纹理文件")
+
+    args = parser.parse_args(argv)
+    if args.command == "info":
+        return info(args.files)
+
+    if args.format == AUTO and args.pipeline:
+        parser.error("--format auto 需要在输出旁写出报告，不能与 --pipeline 同时使用")
+
+    start = time.perf_counter()
+    stats = PipelineStats()
+    with profiling.profile() if args.profile or args.trace else nullcontext() as profiler:
+        converted, skipped, failures = convert(args.src, args.dst, args.format, args.width, args.height,
+                                               jobs=args.jobs, use_cache=not args.no_cache, force=args.force,
+                                               quality=args.quality, mips=args.mips, mip_filter=args.mip_filter,
+                                               pipeline=args.pipeline, prefetch=args.prefetch, stats=stats,
+                                               png_level=args.png_level, png_filter=args.png_filter,
+                                               png_preview=args.png_preview, min_psnr=args.min_psnr,
+                                               max_error=args.max_error,
+                                               auto_formats=args.auto_formats.split(","), dither=args.dither,
+                                               encode_cache=args.encode_cache)
+    print(f"转换 {converted} 个，跳过 {skipped} 个未变化文件，失败 {len(failures)} 个，"
+          f"用时 {time.perf_counter() - start:.2f}s")
+    if args.pipeline:
+        print(stats.summary())
+    if profiler is not None:
+        print(profiler.summary())
+        if args.trace:
+            profiler.write_chrome_trace(args.trace)
+            print(f"Chrome trace 已写入：{args.trace}")
+    if profiler is not None and args.encode_cache:
+        # --profile 时在当前进程中转换, 缓存的统计就在这里
+        cache = _encode_cache(args.encode_cache)
+        stats = cache.stats()
+        print(f"ETC1 编码缓存：{stats['blocks']} 块，批内重复 {stats['duplicates']}，单色 {stats['uniform']}，"
+              f"缓存命中 {stats['hits']}，实际编码 {stats['encoded']}，免于搜索 {stats['hit_rate']:.1%}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""
+读取 / 转换 / 写出三段重叠执行的批量流水线.
+
+    读取 (线程池, 预读 prefetch 个输入) -> 有界队列 -> 转换 (进程池) -> 有界队列 -> 写出 (线程池)
+
+asyncio 协调三个阶段: 读取在转换队列满时停下, 转换在进程池中已有 2 * jobs 个任务时停下,
+写出队列满时转换结果也会等待, 所以任何时刻内存中最多只有 prefetch + 2 * jobs + 写出队列长度 个文件.
+I/O 与计算重叠后, 总吞吐量取决于较慢的一方, 而不是两者之和.
+
+transform 在子进程中执行, 必须可以 pickle; 它接受 (src_path, 输入字节, *args), 返回要写出的字节.
+各阶段的处理数、字节数、忙碌时间与队列深度记录在 PipelineStats 中.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# 放进队列表示上游已经结束
+_DONE = object()
+
+
+class StageStats:
+    """
+    一个阶段的统计. depth 为该阶段输入队列的长度, 每次向队列放入时采样; 读取阶段没有输入队列.
+    """
+    __slots__ = ("name", "items", "bytes", "busy", "max_depth", "depth_total", "samples")
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.bytes = 0
+        self.busy = 0.0
+        self.max_depth = 0
+        self.depth_total = 0
+        self.samples = 0
+
+    def sample(self, depth):
+        self.max_depth = max(self.max_depth, depth)
+        self.depth_total += depth
+        self.samples += 1
+
+    @property
+    def mean_depth(self):
+        return self.depth_total / self.samples if self.samples else 0.0
+
+
+class PipelineStats:
+    """
+    流水线的统计: read / transform / write 三个阶段与总耗时.
+    """
+
+    def __init__(self):
+        self.read = StageStats("read")
+        self.transform = StageStats("transform")
+        self.write = StageStats("write")
+        self.wall = 0.0
+        self.jobs = 1
+
+    @property
+    def stages(self):
+        return self.read, self.transform, self.write
+
+    def summary(self):
+        lines = [f"{'stage':<10} {'items':>6} {'MiB':>9} {'busy s':>8} {'util':>6} {'depth max':>10} {'depth mean':>11}"]
+        for stage in self.stages:
+            # 转换阶段的忙碌时间是各进程实际计算时间之和, 按进程数折算利用率
+            capacity = self.wall * (self.jobs if stage is self.transform else 1)
+            utilization = stage.busy / capacity if capacity else 0.0
+            lines.append(f"{stage.name:<10} {stage.items:>6} {stage.bytes / (1 << 20):>9.2f} {stage.busy:>8.2f} "
+                         f"{utilization:>6.0%} {stage.max_depth:>10} {stage.mean_depth:>11.2f}")
+        lines.append(f"wall {self.wall:.2f}s")
+        return "\n".join(lines)
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _write_file(path, data):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+
+def _call_timed(function, *args):
+    """
+    在子进程中执行并返回 (结果, 耗时), 不把在进程池中排队的时间算作忙碌.
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+async def _timed(stage, loop, executor, function, *args):
+    start = time.perf_counter()
+    try:
+        return await loop.run_in_executor(executor, function, *args)
+    finally:
+        stage.busy += time.perf_counter() - start
+
+
+async def _run(tasks, transform, args, jobs, prefetch, io_threads, stats, on_result):
+    loop = asyncio.get_running_loop()
+    read_queue = asyncio.Queue(maxsize=prefetch)
+    write_queue = asyncio.Queue(maxsize=jobs)
+    in_flight = asyncio.Semaphore(2 * jobs)
+
+    with ThreadPoolExecutor(max_workers=io_threads) as io_pool, ProcessPoolExecutor(max_workers=jobs) as cpu_pool:
+
+        async def read_stage():
+            for task in tasks:
+                try:
+                    data = await _timed(stats.read, loop, io_pool, _read_file, task[0])
+                except OSError as e:
+                    on_result(task, e)
+                    continue
+                stats.read.items += 1
+                stats.read.bytes += len(data)
+                await read_queue.put((task, data))
+                stats.transform.sample(read_queue.qsize())
+            await read_queue.put(_DONE)
+
+        async def transform_one(task, data):
+            try:
+                result, elapsed = await loop.run_in_executor(cpu_pool, _call_timed, transform, task[0], data, *args)
+            except Exception as e:
+                on_result(task, e)
+            else:
+                stats.transform.items += 1
+                stats.transform.bytes += len(data)
+                stats.transform.busy += elapsed
+                await write_queue.put((task, result))
+                stats.write.sample(write_queue.qsize())
+            finally:
+                in_flight.release()
+
+        async def transform_stage():
+            running = set()
+            while True:
+                item = await read_queue.get()
+                if item is _DONE:
+                    break
+                await in_flight.acquire()
+                job = asyncio.create_task(transform_one(*item))
+                running.add(job)
+                job.add_done_callback(running.discard)
+            if running:
+                await asyncio.gather(*running)
+            await write_queue.put(_DONE)
+
+        async def write_stage():
+            while True:
+                item = await write_queue.get()
+                if item is _DONE:
+                    break
+                task, data = item
+                try:
+                    size = await _timed(stats.write, loop, io_pool, _write_file, task[1], data)
+                except OSError as e:
+                    on_result(task, e)
+                    continue
+                stats.write.items += 1
+                stats.write.bytes += size
+                on_result(task, size)
+
+        await asyncio.gather(read_stage(), transform_stage(), write_stage())
+
+
+def run_pipeline(tasks, transform, args=(), jobs=None, prefetch=4, io_threads=4, stats=None, on_result=None):
+    """
+    对 tasks 中的每个 (src_path, dst_path, ...) 读取 src_path, 在进程池中执行 transform(src_path, 数据, *args),
+    再把结果写到 dst_path. 返回 PipelineStats.
+
+    参数：
+        jobs (int)：转换进程数，None 表示使用全部 CPU 核心。
+        prefetch (int)：读取阶段最多领先转换阶段的输入数。
+        io_threads (int)：读写共用的线程数，网络存储上可以调大。
+        stats (PipelineStats)：可选，统计累加到这个对象中。
+        on_result：每个任务结束时在事件循环中调用 on_result(task, 输出字节数或异常)，完成顺序不保证与输入相同。
+    """
+    stats = stats or PipelineStats()
+    jobs = jobs or os.cpu_count() or 1
+    stats.jobs = jobs
+    if prefetch < 1:
+        raise ValueError("prefetch must be at least 1")
+    start = time.perf_counter()
+    asyncio.run(_run(list(tasks), transform, tuple(args), jobs, prefetch, io_threads, stats,
+                     on_result or (lambda task, result: None)))
+    stats.wall += time.perf_counter() - start
+    return stats
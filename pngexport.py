@@ -0,0 +1,264 @@
+"""
+并行、可调压缩参数的 PNG 导出.
+
+图像按行带 (band_rows 行) 切分, 每个行带独立做 PNG 行滤波并压缩为原始 deflate 数据,
+非最后的行带以 Z_SYNC_FLUSH 结束 (按字节对齐, 不带结束标记), 所以各段直接拼接就是一个完整的 deflate 流;
+zlib 头写在第一段之前, 整个流的 Adler-32 由各段的校验和合并得到. 每个行带写成一个 IDAT 块.
+zlib 压缩与 NumPy 运算都会释放 GIL, 行带用线程池并行处理, 不需要进程间拷贝.
+
+输入可以是整张数组 (write_png), 也可以是按顺序给出的行带迭代器 (write_png_rows);
+后者与 iter_etc1_rgb_a8_rows / ARGB8888.iter_rows 配合时, 导出全程只持有 workers 个左右的行带 (export_png).
+
+filter 为 PNG 行滤波: none / sub / up / average / paeth, 或 adaptive (逐行取绝对值和最小者, 与 libpng 的启发式相同).
+strategy 为 zlib 策略: default / filtered / rle / huffman. preview=True 等价于 level=0, filter="none",
+只按存储块写出, 几乎不耗 CPU, 适合大批量预览图.
+"""
+import os
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import profiling
+from RGBAd32x8888eB.Packed16 import PACKED16_FORMATS
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_FILTERS = {"none": 0, "sub": 1, "up": 2, "average": 3, "paeth": 4, "adaptive": None}
+ZLIB_STRATEGIES = {"default": zlib.Z_DEFAULT_STRATEGY, "filtered": zlib.Z_FILTERED, "rle": zlib.Z_RLE,
+                   "huffman": zlib.Z_HUFFMAN_ONLY}
+# write_png_rows 与 mobiletexture convert 共用的默认压缩级别与行滤波
+DEFAULT_LEVEL = 6
+DEFAULT_FILTER = "adaptive"
+# PNG 颜色类型: 通道数 -> color type
+COLOR_TYPES = {3: 2, 4: 6}
+_ADLER_BASE = 65521
+
+
+def _chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(data, zlib.crc32(kind)))
+
+
+def _adler32_combine(adler1, adler2, length2):
+    """
+    由两段数据各自的 Adler-32 与第二段的长度得到拼接后的 Adler-32 (同 zlib 的 adler32_combine).
+    """
+    remainder = length2 % _ADLER_BASE
+    sum1 = adler1 & 0xFFFF
+    sum2 = (remainder * sum1) % _ADLER_BASE
+    sum1 = (sum1 + (adler2 & 0xFFFF) + _ADLER_BASE - 1) % _ADLER_BASE
+    sum2 = (sum2 + (adler1 >> 16) + (adler2 >> 16) + _ADLER_BASE - remainder) % _ADLER_BASE
+    return sum1 | (sum2 << 16)
+
+
+def _filter_rows(rows, prior, filter_type, bpp):
+    """
+    对 (n, stride) 的原始行做 PNG 滤波, prior 为上一行 (第一行之前为全 0).
+    返回 (n, stride + 1) 的 uint8, 每行首字节为滤波类型.
+    """
+    count, stride = rows.shape
+    out = np.empty((count, stride + 1), dtype=np.uint8)
+    raw = rows.astype(np.int16)
+    up = np.empty_like(raw)
+    up[0] = prior
+    up[1:] = raw[:-1]
+    left = np.zeros_like(raw)
+    left[:, bpp:] = raw[:, :-bpp]
+
+    def apply(kind):
+        if kind == 0:
+            return raw
+        if kind == 1:
+            return raw - left
+        if kind == 2:
+            return raw - up
+        if kind == 3:
+            return raw - ((left + up) >> 1)
+        upper_left = np.zeros_like(raw)
+        upper_left[:, bpp:] = up[:, :-bpp]
+        pa = np.abs(up - upper_left)
+        pb = np.abs(left - upper_left)
+        pc = np.abs(left + up - 2 * upper_left)
+        predictor = np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, up, upper_left))
+        return raw - predictor
+
+    if filter_type is not None:
+        out[:, 0] = filter_type
+        out[:, 1:] = apply(filter_type) & 0xFF
+        return out
+
+    # adaptive: 每行取有符号字节绝对值和最小的滤波
+    candidates = np.stack([apply(kind) & 0xFF for kind in range(5)])
+    signed = candidates.astype(np.uint8).view(np.int8)
+    best = np.abs(signed.astype(np.int32)).sum(axis=2).argmin(axis=0)
+    out[:, 0] = best
+    out[:, 1:] = candidates[best, np.arange(count)]
+    return out
+
+
+def _compress_band(rows, prior, filter_type, bpp, level, strategy, last):
+    filtered = _filter_rows(rows, prior, filter_type, bpp)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15, 9, strategy)
+    data = compressor.compress(filtered) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+    return data, zlib.adler32(filtered), filtered.size
+
+
+def _zlib_header(level):
+    # CMF: deflate, 32K 窗口; FLG 的压缩级别字段只是提示, FCHECK 使 (CMF * 256 + FLG) 为 31 的倍数
+    cmf = 0x78
+    flevel = 0 if level < 2 else 1 if level < 6 else 2 if level == 6 else 3
+    flg = flevel << 6
+    flg |= 31 - (cmf * 256 + flg) % 31
+    return bytes((cmf, flg))
+
+
+def _regroup(bands, band_rows):
+    """
+    把任意行数的行带重新分组为每组 band_rows 行, 最后一组可以更少.
+    """
+    pending = []
+    count = 0
+    for band in bands:
+        band = np.asarray(band, dtype=np.uint8)
+        while band.shape[0]:
+            take = min(band_rows - count, band.shape[0])
+            pending.append(band[:take])
+            count += take
+            band = band[take:]
+            if count == band_rows:
+                yield pending[0] if len(pending) == 1 else np.concatenate(pending)
+                pending = []
+                count = 0
+    if pending:
+        yield pending[0] if len(pending) == 1 else np.concatenate(pending)
+
+
+def write_png_rows(file_path, width, height, bands, channels=4, level=DEFAULT_LEVEL, filter=DEFAULT_FILTER,
+                   strategy="default", workers=None, band_rows=256, preview=False):
+    """
+    把按从上到下顺序给出的行带写成 PNG, 返回写入的字节数.
+
+    参数：
+        file_path：输出文件路径，或已打开的二进制文件对象。
+        bands：(rows, width, channels) uint8 数组的迭代器，行数任意，合计 height 行。
+        channels (int)：3 为 RGB，4 为 RGBA。
+        level (int)：zlib 压缩级别 0-9。
+        filter (str)：PNG 行滤波，见模块说明。
+        strategy (str)：zlib 策略，见模块说明。
+        workers (int)：并行压缩的线程数，None 表示使用全部 CPU 核心。
+        band_rows (int)：每个独立压缩的行带的行数，越小并行度越高，压缩率略低。
+        preview (bool)：为 True 时不压缩也不滤波。
+    """
+    if preview:
+        level, filter = 0, "none"
+    if filter not in PNG_FILTERS:
+        raise ValueError(f"Unknown PNG filter {filter!r}, expected one of {tuple(PNG_FILTERS)}")
+    if strategy not in ZLIB_STRATEGIES:
+        raise ValueError(f"Unknown zlib strategy {strategy!r}, expected one of {tuple(ZLIB_STRATEGIES)}")
+    if channels not in COLOR_TYPES:
+        raise ValueError(f"Expected 3 or 4 channels, got {channels}")
+    if band_rows <= 0:
+        raise ValueError(f"band_rows must be positive, got {band_rows}")
+    if width <= 0 or height <= 0:
+        # PNG 不允许宽或高为 0, 读取方会拒绝这样的文件
+        raise ValueError(f"PNG dimensions must be positive, got {width}x{height}")
+    workers = workers or os.cpu_count() or 1
+    filter_type = PNG_FILTERS[filter]
+    stride = width * channels
+
+    header = PNG_SIGNATURE + _chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, COLOR_TYPES[channels],
+                                                          0, 0, 0))
+    close = not hasattr(file_path, 'write')
+    f = open(file_path, 'wb') if close else file_path
+    try:
+        f.write(header)
+        written = len(header)
+        adler = 1
+        rows_done = 0
+        prefix = _zlib_header(level)
+        prior = np.zeros(stride, dtype=np.int16)
+        pending = deque()
+
+        def drain():
+            nonlocal written, adler, prefix
+            data, band_adler, length = pending.popleft().result()
+            adler = _adler32_combine(adler, band_adler, length)
+            chunk = _chunk(b"IDAT", prefix + data)
+            prefix = b""
+            f.write(chunk)
+            written += len(chunk)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor, profiling.stage("png.compress") as stage:
+            for band in _regroup(bands, band_rows):
+                if band.shape[1:] != (width, channels):
+                    raise ValueError(f"Band shape {band.shape} does not match {width}x{channels}")
+                rows = band.reshape(band.shape[0], stride)
+                rows_done += rows.shape[0]
+                if rows_done > height:
+                    raise ValueError(f"Got more than {height} rows")
+                pending.append(executor.submit(_compress_band, rows, prior, filter_type, channels, level,
+                                               ZLIB_STRATEGIES[strategy], rows_done == height))
+                prior = rows[-1].astype(np.int16)
+                stage.add(bytes=rows.nbytes)
+                # 最多 2 * workers 个行带在途, 输出按顺序写出
+                while len(pending) > 2 * workers:
+                    drain()
+            while pending:
+                drain()
+        if rows_done != height:
+            raise ValueError(f"Expected {height} rows, got {rows_done}")
+
+        trailer = _chunk(b"IDAT", struct.pack(">I", adler)) + _chunk(b"IEND", b"")
+        f.write(trailer)
+        written += len(trailer)
+    finally:
+        if close:
+            f.close()
+    return written
+
+
+def write_png(file_path, image, band_rows=256, **options):
+    """
+    把 (height, width, 3 或 4) 的 uint8 数组或 PIL 图像写成 PNG, 参数同 write_png_rows.
+    """
+    if hasattr(image, "mode"):
+        image = image if image.mode in ("RGB", "RGBA") else image.convert("RGBA")
+    pixels = np.asarray(image, dtype=np.uint8)
+    if pixels.ndim != 3:
+        raise ValueError(f"Expected an (height, width, channels) array, got shape {pixels.shape}")
+    height, width, channels = pixels.shape
+    bands = (pixels[y:y + band_rows] for y in range(0, height, band_rows))
+    return write_png_rows(file_path, width, height, bands, channels, band_rows=band_rows, **options)
+
+
+def iter_rows(src_path, fmt, width, height, band_rows=256):
+    """
+    按行带流式解码原始 PTX, 支持 etc1_rgb_a8 / etc1_rgb_etc1a / etc1_rgb / argb8888 / abgr8888 与 16 位格式.
+    """
+    if fmt in ("etc1_rgb_a8", "etc1_rgb_etc1a", "etc1_rgb"):
+        from RGBAd32x8888eB.ETC1_RGB_A8 import ALPHA_A8, ALPHA_ETC1, ALPHA_NONE, iter_etc1_rgb_a8_rows
+        alpha_format = {"etc1_rgb_a8": ALPHA_A8, "etc1_rgb_etc1a": ALPHA_ETC1, "etc1_rgb": ALPHA_NONE}[fmt]
+        # ETC1 的行带必须是 4 的倍数
+        return iter_etc1_rgb_a8_rows(src_path, width, height, band=(band_rows + 3) // 4 * 4,
+                                     alpha_format=alpha_format)
+    if fmt == "argb8888":
+        from RGBAd32x8888eB.ARGB8888 import ARGB8888
+        return ARGB8888.iter_rows(src_path, width, height, band_rows)
+    if fmt == "abgr8888":
+        from RGBAd32x8888eB.ABGR8888 import ABGR8888
+        return ABGR8888.iter_rows(src_path, width, height, band_rows)
+    if fmt in PACKED16_FORMATS:
+        return PACKED16_FORMATS[fmt].iter_rows(src_path, width, height, band_rows)
+    raise ValueError(f"Streaming decode is not available for {fmt!r}")
+
+
+STREAMING_FORMATS = ("etc1_rgb_a8", "etc1_rgb_etc1a", "etc1_rgb", "argb8888", "abgr8888") + tuple(PACKED16_FORMATS)
+
+
+def export_png(src_path, dst_path, fmt, width, height, band_rows=256, **options):
+    """
+    把原始 PTX 边解码边写成 PNG, 全程不持有整张图像, 返回写入的字节数. options 同 write_png_rows.
+    """
+    return write_png_rows(dst_path, width, height, iter_rows(src_path, fmt, width, height, band_rows), 4,
+                          band_rows=band_rows, **options)
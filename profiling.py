@@ -0,0 +1,211 @@
+"""
+可选的分阶段计时.
+
+默认关闭: stage() 返回一个共享的空上下文, instrument() 包装的函数只多一次全局变量判断,
+hook() 登记的逐块调用的函数只在 profile() 期间才被替换为计时包装, 关闭时完全没有额外开销.
+在 profile() 的范围内, 各读写函数与编解码步骤记录每个阶段的墙钟时间、调用次数、
+读写字节数与块数, 之后可以打印汇总表或写出 Chrome trace (chrome://tracing, Perfetto 均可打开).
+
+    with profiling.profile() as profiler:
+        write_etc1_rgb_a8("out.ptx", width, height, image)
+    print(profiler.summary())
+    profiler.write_chrome_trace("trace.json")
+
+只记录当前进程; 在进程池中执行的部分 (workers > 1, mobiletexture -j) 只能看到外层的总耗时.
+阶段可以嵌套, 汇总表中的时间包含子阶段.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# 当前的 Profiler, None 表示关闭
+_active = None
+# hook() 登记的 (所属类或模块, 属性名, 阶段名, 每次调用的块数)
+_hooks = []
+
+
+class _NullStage:
+    """
+    关闭时 stage() 返回的空上下文.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, bytes=0, blocks=0):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "bytes", "blocks", "start")
+
+    def __init__(self, profiler, name, bytes, blocks):
+        self.profiler = profiler
+        self.name = name
+        self.bytes = bytes
+        self.blocks = blocks
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter(), self.bytes, self.blocks)
+        return False
+
+    def add(self, bytes=0, blocks=0):
+        """
+        进入阶段时还不知道的字节数或块数 (例如读到的实际长度) 可以在阶段内补上.
+        """
+        self.bytes += bytes
+        self.blocks += blocks
+
+
+class Profiler:
+    """
+    累积各阶段的统计, 并保留最多 max_events 个事件用于 Chrome trace.
+    """
+
+    def __init__(self, max_events=1_000_000):
+        self.max_events = max_events
+        self.stats = {}  # name -> [calls, seconds, bytes, blocks]
+        self.events = []  # (name, start, duration, thread id, bytes, blocks)
+        self.dropped_events = 0
+        self.origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def stage(self, name, bytes=0, blocks=0):
+        return _Stage(self, name, bytes, blocks)
+
+    def record(self, name, start, end, bytes=0, blocks=0):
+        with self._lock:
+            stat = self.stats.get(name)
+            if stat is None:
+                stat = self.stats[name] = [0, 0.0, 0, 0]
+            stat[0] += 1
+            stat[1] += end - start
+            stat[2] += bytes
+            stat[3] += blocks
+            if len(self.events) < self.max_events:
+                self.events.append((name, start, end - start, threading.get_ident(), bytes, blocks))
+            else:
+                self.dropped_events += 1
+
+    def summary(self):
+        """
+        返回按总耗时降序排列的汇总表.
+        """
+        lines = [f"{'stage':<28} {'calls':>9} {'total s':>10} {'mean ms':>10} {'MiB':>9} {'blocks/s':>12}"]
+        for name, (calls, seconds, size, blocks) in sorted(self.stats.items(), key=lambda item: -item[1][1]):
+            mean = seconds / calls * 1000
+            size = f"{size / (1 << 20):.2f}" if size else "-"
+            rate = f"{blocks / seconds:.0f}" if blocks and seconds else "-"
+            lines.append(f"{name:<28} {calls:>9} {seconds:>10.4f} {mean:>10.4f} {size:>9} {rate:>12}")
+        if self.dropped_events:
+            lines.append(f"({self.dropped_events} events beyond max_events were counted but not traced)")
+        return "\n".join(lines)
+
+    def chrome_trace(self):
+        """
+        返回 Chrome trace 格式 (Trace Event Format 的完整事件 "X") 的字典.
+        """
+        pid = os.getpid()
+        events = []
+        for name, start, duration, tid, size, blocks in self.events:
+            event = {"name": name, "cat": name.split(".", 1)[0], "ph": "X", "pid": pid, "tid": tid,
+                     "ts": (start - self.origin) * 1e6, "dur": duration * 1e6}
+            args = {}
+            if size:
+                args["bytes"] = size
+            if blocks:
+                args["blocks"] = blocks
+            if args:
+                event["args"] = args
+            events.append(event)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, file_path):
+        with open(file_path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+
+def stage(name, bytes=0, blocks=0):
+    """
+    返回记录一个阶段的上下文; 关闭时为共享的空上下文.
+    """
+    profiler = _active
+    if profiler is None:
+        return _NULL_STAGE
+    return _Stage(profiler, name, bytes, blocks)
+
+
+def instrument(name, blocks=0):
+    """
+    把整个函数记录为一个阶段的装饰器, blocks 为每次调用处理的块数.
+    """
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = _active
+            if profiler is None:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profiler.record(name, start, time.perf_counter(), 0, blocks)
+        return wrapper
+    return decorate
+
+
+def hook(owner, attribute, name, blocks=0):
+    """
+    登记 owner 上的函数或 staticmethod, 在 profile() 期间把它替换为计时包装.
+    用于每个块都要调用多次的小函数, 常驻的包装在关闭时也会有可观的开销.
+    """
+    _hooks.append((owner, attribute, name, blocks))
+
+
+def _install_hooks():
+    originals = []
+    for owner, attribute, name, blocks in _hooks:
+        original = vars(owner)[attribute]
+        if isinstance(original, staticmethod):
+            replacement = staticmethod(instrument(name, blocks)(original.__func__))
+        else:
+            replacement = instrument(name, blocks)(original)
+        setattr(owner, attribute, replacement)
+        originals.append((owner, attribute, original))
+    return originals
+
+
+def enabled():
+    return _active is not None
+
+
+@contextmanager
+def profile(max_events=1_000_000):
+    """
+    在 with 范围内打开计时, 返回 Profiler. 可以嵌套, 退出后恢复外层的 Profiler.
+    """
+    global _active
+    previous = _active
+    profiler = Profiler(max_events)
+    originals = _install_hooks() if previous is None else []
+    _active = profiler
+    try:
+        yield profiler
+    finally:
+        _active = previous
+        for owner, attribute, original in reversed(originals):
+            setattr(owner, attribute, original)
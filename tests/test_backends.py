@@ -0,0 +1,68 @@
+"""
+ETC1 快速模式各后端与 python 参考实现逐位相同.
+
+块集合与 benchmarks/check_backends.py 相同 (随机像素、随机像素加全透明、合成纹理、真实纹理与边界情况),
+吞吐量比较仍在 benchmarks 中. 没有安装 Numba 时跳过 numba 后端, 但 etc1_numba 的纯 Python 回退总会被测试.
+"""
+import importlib.util
+import sys
+
+import numpy as np
+import pytest
+
+import etc1_numba
+from benchmarks.check_backends import DEFAULT_IMAGE, block_sets
+from etc1 import ETC1, LUT_OFFSET
+
+BLOCK_COUNT = 4096
+SET_NAMES = ["noise", "noise+transparent", "synthetic", "real", "edge cases"]
+
+
+@pytest.fixture(scope="module")
+def sets():
+    return {name: np.ascontiguousarray(blocks) for name, blocks in block_sets(DEFAULT_IMAGE, BLOCK_COUNT).items()}
+
+
+@pytest.fixture(scope="module")
+def references(sets):
+    return {name: ETC1._gen_python_blocks(blocks) for name, blocks in sets.items()}
+
+
+@pytest.fixture
+def pure_python_kernels(monkeypatch):
+    """在 numba 不可导入的情况下单独加载一份 etc1_numba, 内核都是未编译的 Python 函数."""
+    monkeypatch.setitem(sys.modules, "numba", None)
+    spec = importlib.util.spec_from_file_location("etc1_numba_fallback", etc1_numba.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    assert not module.available()
+    return module
+
+
+@pytest.mark.parametrize("name", SET_NAMES)
+@pytest.mark.parametrize("backend", ["python", "numpy"])
+def test_gen_etc1_blocks_matches_reference(sets, references, name, backend):
+    result = ETC1.gen_etc1_blocks(sets[name], backend=backend)
+    np.testing.assert_array_equal(result, references[name])
+
+
+@pytest.mark.parametrize("name", SET_NAMES)
+def test_numpy_kernel_matches_reference(sets, references, name):
+    np.testing.assert_array_equal(ETC1._gen_fast_blocks(sets[name]), references[name])
+
+
+@pytest.mark.parametrize("name", SET_NAMES)
+def test_numba_backend_matches_reference(sets, references, name):
+    pytest.importorskip("numba")
+    np.testing.assert_array_equal(ETC1._gen_numba_blocks(sets[name]), references[name])
+    np.testing.assert_array_equal(ETC1.gen_etc1_blocks(sets[name], backend="numba"), references[name])
+
+
+@pytest.mark.parametrize("name", SET_NAMES)
+def test_numba_fallback_matches_reference(sets, references, pure_python_kernels, name):
+    # 纯 Python 回退很慢, 每组只取前 256 块
+    blocks = sets[name][:256]
+    result = pure_python_kernels.gen_fast_blocks(blocks.reshape(-1, 16, 4), ETC1.ETC1ModifiersArray,
+                                                 ETC1.ETC1ColorLUTArray, ETC1.ETC1Expand4Array,
+                                                 ETC1.ETC1Expand5Array, ETC1.ETC1Expand5DeltaArray, LUT_OFFSET)
+    np.testing.assert_array_equal(result, references[name][:256])